@@ -0,0 +1,49 @@
+import asyncio
+from typing import Any
+from pymongo import AsyncMongoClient
+from redis_to_mongo.async_redis_api import AsyncRedisHandler
+from redis_to_mongo.config_loader import AsyncMongoConfig, RedisConfig
+from redis_to_mongo.redis_to_mongo_mongo_modules.mongo_models import BaseDocument
+
+
+class AsyncClients:
+    """
+    The asyncio engine's redis.asyncio and AsyncMongoClient clients shared by its syncers, and
+    the slots bounding how many batches the syncers have in flight together.
+    """
+
+    def __init__(
+        self,
+        redis_config: RedisConfig,
+        mongo_config: AsyncMongoConfig,
+        concurrency: int,
+    ):
+        self.redis_handler = AsyncRedisHandler(redis_config)
+        self.mongo_client: AsyncMongoClient = AsyncMongoClient(
+            host=mongo_config.config["mongo_host"],
+            port=mongo_config.config["mongo_port"],
+            **self.credentials(mongo_config),
+        )
+        self.slots = asyncio.Semaphore(concurrency)
+
+    @staticmethod
+    def credentials(mongo_config: AsyncMongoConfig) -> dict[str, Any]:
+        if not mongo_config.config["mongo_db_user"]:
+            return {}
+        return {
+            "username": mongo_config.config["mongo_db_user"],
+            "password": mongo_config.config["mongo_db_password"],
+            "authSource": mongo_config.config["mongo_auth_source"],
+        }
+
+    def collection(self, odm_class: type[BaseDocument]) -> Any:
+        """
+        Returns the ODM's collection on the async client, in the database mongoengine binds it to.
+        """
+        return self.mongo_client[odm_class._get_db().name][
+            odm_class._get_collection_name()
+        ]
+
+    async def close(self) -> None:
+        await self.redis_handler.close()
+        await self.mongo_client.close()
@@ -0,0 +1,258 @@
+import asyncio
+from collections import defaultdict
+from typing import Any, Callable, Coroutine, cast
+import redis.asyncio
+from redis.asyncio.cluster import RedisCluster
+from redis_to_mongo.logger import logger
+from redis_to_mongo.config_loader import RedisConfig
+from redis_to_mongo.redis_api import RedisHandler
+
+
+class AsyncRedisHandler:
+    """
+    The batched reads the syncers' value and stream rounds make through RedisHandler, on a
+    redis.asyncio client. Results come back in the same shape as RedisHandler's.
+    """
+
+    SIZE_COMMANDS = RedisHandler.SIZE_COMMANDS
+
+    def __init__(self, config: RedisConfig):
+        self.config = config
+        self.cluster = config.config["redis_mode"] == "cluster"
+        self.client = self._initialize_redis_client(config)
+        self.round_trips = 0
+
+    def take_round_trips(self) -> int:
+        round_trips, self.round_trips = self.round_trips, 0
+        return round_trips
+
+    def _initialize_redis_client(self, config: RedisConfig) -> redis.asyncio.Redis:
+        try:
+            if self.cluster:
+                # connects to the cluster on its first command
+                return cast(
+                    redis.asyncio.Redis,
+                    RedisCluster(
+                        host=config.config["redis_host"],
+                        port=config.config["redis_port"],
+                        decode_responses=True,
+                    ),
+                )
+            return redis.asyncio.Redis(
+                host=config.config["redis_host"],
+                port=config.config["redis_port"],
+                db=RedisHandler.DB_NUMBER,
+                decode_responses=True,
+            )
+        except Exception as e:
+            logger.error(f"Error initializing async Redis client: {str(e)}")
+            raise e
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+    async def get_types(self, keys: list[str]) -> dict[str, str]:
+        """
+        Returns the Redis type of each key, resolving TYPE_BATCH_SIZE keys per pipeline.
+        """
+        batch_size = self.config.config["type_batch_size"]
+        key_types = {}
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start : start + batch_size]
+            types = await self._pipeline_per_key(
+                batch, lambda pipe, key: pipe.type(key)
+            )
+            key_types.update(zip(batch, types))
+        return key_types
+
+    async def get_strings(self, keys: list[str]) -> list[str | None]:
+        """
+        Returns the string values of the given keys with a single MGET, one per hash slot on a cluster.
+        """
+        return await self._multi_key_command(
+            keys, lambda client, keys: client.mget(keys)
+        )
+
+    async def get_jsons(self, keys: list[str]) -> list[Any]:
+        """
+        Returns the JSON values of the given keys with a single JSON.MGET on the root path,
+        one per hash slot on a cluster.
+        """
+        return await self._multi_key_command(
+            keys, lambda client, keys: client.json().mget(keys, ".")
+        )
+
+    async def get_lists(self, keys: list[str]) -> list[list[str]]:
+        return await self._pipeline_per_key(
+            keys, lambda pipe, key: pipe.lrange(key, 0, -1)
+        )
+
+    async def get_sets(self, keys: list[str]) -> list[list[str]]:
+        set_values = await self._pipeline_per_key(
+            keys, lambda pipe, key: pipe.smembers(key)
+        )
+        return [list(members) for members in set_values]
+
+    async def get_ordered_sets(self, keys: list[str]) -> list[list[dict[str, Any]]]:
+        set_values = await self._pipeline_per_key(
+            keys, lambda pipe, key: pipe.zrange(key, 0, -1, withscores=True)
+        )
+        return [
+            [{"key": member, "score": score} for member, score in members]
+            for members in set_values
+        ]
+
+    async def get_hashes(self, keys: list[str]) -> list[dict[str, str]]:
+        """
+        Returns all fields of the given hashes with pipelined HSCANs of HASH_SCAN_COUNT fields.
+        """
+        count = self.config.config["hash_scan_count"]
+        cursors = dict.fromkeys(keys, 0)
+        values: dict[str, dict[str, str]] = {key: {} for key in keys}
+        while cursors:
+            pending = list(cursors)
+            pages = await self._pipeline_per_key(
+                pending, lambda pipe, key: pipe.hscan(key, cursors[key], count=count)
+            )
+            for key, (cursor, fields) in zip(pending, pages):
+                values[key].update(fields)
+                if cursor == 0:
+                    del cursors[key]
+                else:
+                    cursors[key] = cursor
+        return [values[key] for key in keys]
+
+    async def get_collection_sizes(self, keys: list[str], key_type: str) -> list[int]:
+        command = self.SIZE_COMMANDS[key_type]
+        return await self._pipeline_per_key(
+            keys, lambda pipe, key: getattr(pipe, command)(key)
+        )
+
+    async def read_messages(
+        self, last_read_ids: dict[str, str]
+    ) -> dict[str, list[tuple[str, dict[str, str]]]]:
+        """
+        Reads the messages after each stream's read id without blocking and moves the ids on.
+        """
+        try:
+            messages = await self._read_streams(
+                last_read_ids,
+                lambda client, read_ids: client.xread(
+                    read_ids, count=self.config.config["messages_per_stream"]
+                ),
+            )
+            return RedisHandler.advance_read_ids(last_read_ids, messages)
+        except Exception as e:
+            logger.error(
+                f"Error reading messages from streams {last_read_ids}: {str(e)}"
+            )
+            raise e
+
+    async def read_group_messages(
+        self, streams: list[str], group: str, consumer: str
+    ) -> dict[str, list[tuple[str, dict[str, str]]]]:
+        """
+        Reads messages never delivered to any consumer of the group and assigns them to consumer.
+        """
+        try:
+            messages = await self._read_streams(
+                {stream: ">" for stream in streams},
+                lambda client, read_ids: client.xreadgroup(
+                    group,
+                    consumer,
+                    read_ids,
+                    count=self.config.config["messages_per_stream"],
+                ),
+            )
+            return dict(messages)
+        except Exception as e:
+            logger.error(f"Error reading streams {streams} in group {group}: {str(e)}")
+            raise e
+
+    async def ack_messages(self, group: str, message_ids: dict[str, list[str]]) -> None:
+        streams = [stream for stream, ids in message_ids.items() if ids]
+        await self._pipeline_per_key(
+            streams, lambda pipe, stream: pipe.xack(stream, group, *message_ids[stream])
+        )
+
+    async def claim_pending_messages(
+        self, streams: list[str], group: str, consumer: str, min_idle_ms: int
+    ) -> dict[str, list[tuple[str, dict[str, str]]]]:
+        claims = await self._pipeline_per_key(
+            streams,
+            lambda pipe, stream: pipe.xautoclaim(
+                stream,
+                group,
+                consumer,
+                min_idle_ms,
+                count=self.config.config["messages_per_stream"],
+            ),
+        )
+        return RedisHandler.claimed_messages(streams, claims)
+
+    async def _pipeline_per_key(
+        self, keys: list[str], queue_command: Callable[[Any, str], Any]
+    ) -> list[Any]:
+        """
+        Runs one command per key in a pipeline. On a cluster redis-py splits it per node and
+        sends the node pipelines concurrently.
+        """
+        if not keys:
+            return []
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key in keys:
+                queue_command(pipe, key)
+            self.round_trips += 1
+            return await pipe.execute()
+        except Exception as e:
+            logger.error(f"Error retrieving values for keys: {str(e)}")
+            raise e
+
+    async def _multi_key_command(
+        self, keys: list[str], command: Callable[[Any, list[str]], Coroutine]
+    ) -> list[Any]:
+        """
+        Runs a multi-key read like MGET. Cluster keys in one command must share a hash slot,
+        so there it is split into one command per slot, all of them sent concurrently.
+        """
+        if not keys:
+            return []
+        if not self.cluster:
+            self.round_trips += 1
+            return await command(self.client, keys)
+        slots = defaultdict(list)
+        for key in keys:
+            slots[self.client.keyslot(key)].append(key)  # type: ignore
+        slot_keys = list(slots.values())
+        self.round_trips += len(slot_keys)
+        slot_values = await asyncio.gather(
+            *(command(self.client, same_slot_keys) for same_slot_keys in slot_keys)
+        )
+        values = {}
+        for same_slot_keys, same_slot_values in zip(slot_keys, slot_values):
+            values.update(zip(same_slot_keys, same_slot_values))
+        return [values[key] for key in keys]
+
+    async def _read_streams(
+        self,
+        read_ids: dict[str, str],
+        read: Callable[[Any, dict[str, str]], Coroutine],
+    ) -> list[Any]:
+        """
+        Runs a non-blocking XREAD-like command over the streams, split per hash slot on a
+        cluster with the slots read concurrently.
+        """
+        if not read_ids:
+            return []
+        if not self.cluster:
+            self.round_trips += 1
+            return await read(self.client, read_ids) or []
+        slots: dict[int, dict[str, str]] = defaultdict(dict)
+        for stream, read_id in read_ids.items():
+            slots[self.client.keyslot(stream)][stream] = read_id  # type: ignore
+        self.round_trips += len(slots)
+        responses = await asyncio.gather(
+            *(read(self.client, same_slot_ids) for same_slot_ids in slots.values())
+        )
+        return [stream for response in responses if response for stream in response]
@@ -0,0 +1,97 @@
+import asyncio
+import time
+from datetime import datetime
+
+from redis_to_mongo.async_clients import AsyncClients
+from redis_to_mongo.config_loader import AsyncMongoConfig
+from redis_to_mongo.logger import logger
+from redis_to_mongo.partition import Partition
+from redis_to_mongo.sync_engine import SyncEngine
+from redis_to_mongo.syncers import SyncTypeInterface
+
+
+class AsyncSyncEngine(SyncEngine):
+    """
+    SyncEngine variant running each round's syncers concurrently on an asyncio loop.
+    Value batches, stream pages and their Mongo reads and writes go through redis.asyncio and
+    pymongo's AsyncMongoClient, with at most SYNC_CONCURRENCY batches in flight across syncers.
+    Key scans, appearing and vanished keys, large collections and the chunk store stay on the
+    blocking clients in worker threads.
+    """
+
+    def __init__(self, config_path: str, partition: Partition | None = None):
+        super().__init__(config_path, partition)
+        # the async clients are bound to the loop they first ran on, so every round uses this one
+        self.loop = asyncio.new_event_loop()
+        self.async_clients = AsyncClients(
+            self.redis_config,
+            AsyncMongoConfig(config_path),
+            self.config.config["sync_concurrency"],
+        )
+        for syncer in self.syncers:
+            syncer.async_clients = self.async_clients
+
+    def shutdown(self):
+        if not self.loop.is_running():
+            self.loop.run_until_complete(self.async_clients.close())
+            self.loop.close()
+        super().shutdown()
+
+    def sync(self):
+        self.loop.run_until_complete(self.sync_async())
+
+    async def sync_async(self):
+        syncers, key_types, incremental = await asyncio.to_thread(self.start_round)
+        await asyncio.gather(
+            *(
+                self.sync_syncer_async(syncer, key_types, incremental)
+                for syncer in syncers
+            )
+        )
+
+    async def sync_syncer_async(
+        self, syncer: SyncTypeInterface, key_types: dict[str, str], incremental: bool
+    ):
+        """
+        sync_syncer_isolated on the loop, a failing syncer is logged and retried next round
+        without affecting the others.
+        """
+        try:
+            if incremental:
+                await syncer.sync_keys_async(key_types)
+            else:
+                await syncer.sync_async(key_types)
+        except Exception as e:
+            logger.error(f"Syncer {syncer.TYPE} failed this round: {str(e)}")
+            if incremental:
+                self.force_full_sync = True
+            return
+        self.record_changes(syncer)
+
+    def take_round_trips(self) -> int:
+        return (
+            super().take_round_trips()
+            + self.async_clients.redis_handler.take_round_trips()
+        )
+
+    def run(self) -> None:
+        self.loop.run_until_complete(self.run_async())
+
+    async def run_async(self) -> None:
+        """
+        Run the AsyncSyncEngine indefinitely, synchronizing data between Redis and MongoDB.
+        """
+        start_time = time.time()
+        logger.info(
+            "AsyncSyncEngine started at: %s", datetime.now().astimezone().isoformat()
+        )
+        uptime = 0
+        while True:
+            print("-" * 60)
+            round_start_time = time.time()
+            await self.sync_async()
+            round_elapsed_time = time.time() - round_start_time
+            uptime += time.time() - start_time
+            sleep_time = self.report_round(round_elapsed_time, uptime)
+            await asyncio.sleep(sleep_time)
+            start_time = time.time()
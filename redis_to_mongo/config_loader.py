@@ -1,6 +1,47 @@
+import os
+from typing import Any, Callable
+
+from dotenv import dotenv_values
+
+from redis_to_mongo.key_filter import parse_patterns
 from redis_to_mongo.redis_to_mongo_mongo_modules.config_loader import BaseConfig
 
 
+def load_optional_vars(
+    config_file: str, config_vars: dict[str, tuple[str, Callable[[str], Any], Any]]
+) -> dict[str, Any]:
+    """
+    Maps optional environment variables, falling back to the given default when a
+    variable is missing from both the process environment and the config file.
+    Raises ValueError naming the variable when its value does not parse.
+    """
+    file_values = dotenv_values(config_file) if os.path.exists(config_file) else {}
+    config = {}
+    for name, (env_var, var_type, default) in config_vars.items():
+        raw = os.environ.get(env_var, file_values.get(env_var))
+        if raw is None or raw == "":
+            config[name] = default
+            continue
+        try:
+            config[name] = var_type(raw)
+        except ValueError as e:
+            raise ValueError(f"Invalid {env_var}={raw!r}: {str(e)}") from e
+    return config
+
+
+def one_of(*choices: str) -> Callable[[str], str]:
+    """
+    Returns a parser for a setting that takes one of the given values.
+    """
+
+    def parse(raw: str) -> str:
+        if raw not in choices:
+            raise ValueError(f"expected one of {', '.join(choices)}")
+        return raw
+
+    return parse
+
+
 class RedisConfig(BaseConfig):
     def __init__(self, config_file: str = ".env"):
         super().__init__(config_file)
@@ -9,7 +50,44 @@ class RedisConfig(BaseConfig):
             "redis_port": ("REDIS_PORT", int),
             "messages_per_stream": ("MESSAGES_PER_STREAM", int),
         }
+        self.optional_config_vars = {
+            "type_batch_size": ("TYPE_BATCH_SIZE", int, 1000),
+            "value_batch_size": ("VALUE_BATCH_SIZE", int, 500),
+            # fields per HSCAN page when reading hashes
+            "hash_scan_count": ("HASH_SCAN_COUNT", int, 1000),
+            # lists, sets and zsets above this many members are streamed in chunks, 0 disables it
+            "large_collection_threshold": ("LARGE_COLLECTION_THRESHOLD", int, 0),
+            "collection_chunk_size": ("COLLECTION_CHUNK_SIZE", int, 1000),
+            # unchanged keys are compared every 2, 4, ... up to this many rounds, 1 compares all every round
+            "key_backoff_max_rounds": ("KEY_BACKOFF_MAX_ROUNDS", int, 1),
+            # list, zset and JSON values taking more BSON bytes are kept in chunk documents
+            # of about OFFLOAD_CHUNK_BYTES outside their ODM, 0 disables it
+            "offload_threshold_bytes": (
+                "OFFLOAD_THRESHOLD_BYTES",
+                int,
+                8 * 1024 * 1024,
+            ),
+            "offload_chunk_bytes": ("OFFLOAD_CHUNK_BYTES", int, 1024 * 1024),
+            # per round limits for draining stream backlogs MESSAGES_PER_STREAM at a time
+            "stream_drain_budget_ms": ("STREAM_DRAIN_BUDGET_MS", int, 5000),
+            "stream_drain_max_messages": ("STREAM_DRAIN_MAX_MESSAGES", int, 100000),
+            # consumer group settings for STREAM_MODE=group, the consumer defaults to hostname-pid
+            "stream_consumer_group": ("STREAM_CONSUMER_GROUP", str, "redis_to_mongo"),
+            "stream_consumer_name": ("STREAM_CONSUMER_NAME", str, ""),
+            "stream_claim_min_idle_ms": ("STREAM_CLAIM_MIN_IDLE_MS", int, 60000),
+            # "standalone" or "cluster", cluster keyspaces are scanned on the "primaries" or "replicas"
+            "redis_mode": ("REDIS_MODE", one_of("standalone", "cluster"), "standalone"),
+            "cluster_scan_nodes": (
+                "CLUSTER_SCAN_NODES",
+                one_of("primaries", "replicas"),
+                "primaries",
+            ),
+            # comma separated Redis globs, only keys matching an include and no exclude are synced
+            "key_include_patterns": ("KEY_INCLUDE_PATTERNS", parse_patterns, ["*"]),
+            "key_exclude_patterns": ("KEY_EXCLUDE_PATTERNS", parse_patterns, []),
+        }
         self.config = self.type_check_and_map(self.config_vars)
+        self.config.update(load_optional_vars(config_file, self.optional_config_vars))
 
 
 class SyncerConfig(BaseConfig):
@@ -18,4 +96,59 @@ class SyncerConfig(BaseConfig):
         self.config_vars = {
             "sync_interval_sec": ("SYNC_INTERVAL_SEC", int),
         }
+        self.optional_config_vars = {
+            # "full" scans everything and resolves TYPE per key, "typed" uses SCAN ... TYPE
+            "key_scan_mode": ("KEY_SCAN_MODE", one_of("full", "typed"), "full"),
+            # SCAN time per round, a keyspace that takes longer is walked over several rounds,
+            # 0 scans the whole keyspace every round
+            "key_scan_budget_ms": ("KEY_SCAN_BUDGET_MS", int, 0),
+            # "full" rescans every round, "notify" only syncs keys reported by keyspace notifications
+            "sync_mode": ("SYNC_MODE", one_of("full", "notify"), "full"),
+            # safety net for missed notifications in "notify" mode
+            "full_sync_interval_sec": ("FULL_SYNC_INTERVAL_SEC", int, 300),
+            # "poll" reads streams once per round, "tail" runs a blocking XREAD StreamTailer,
+            # "group" reads through a consumer group shared by several workers
+            "stream_mode": ("STREAM_MODE", one_of("poll", "tail", "group"), "poll"),
+            "stream_block_ms": ("STREAM_BLOCK_MS", int, 1000),
+            "stream_flush_size": ("STREAM_FLUSH_SIZE", int, 500),
+            "stream_flush_interval_ms": ("STREAM_FLUSH_INTERVAL_MS", int, 20),
+            # "sync" runs the syncers one after another, "threads" runs them on a worker pool,
+            # "async" overlaps them on an asyncio loop with SYNC_CONCURRENCY batches in flight
+            "sync_engine": ("SYNC_ENGINE", one_of("sync", "threads", "async"), "sync"),
+            "sync_concurrency": ("SYNC_CONCURRENCY", int, 7),
+            # hash slot partition of the keyspace synced by this process, see supervisor.py
+            "partition_index": ("PARTITION_INDEX", int, 0),
+            "partition_count": ("PARTITION_COUNT", int, 1),
+            # per syncer intervals, SYNC_INTERVAL_SEC for the ones left unset
+            "hash_sync_interval_sec": ("HASH_SYNC_INTERVAL_SEC", float, None),
+            "json_sync_interval_sec": ("JSON_SYNC_INTERVAL_SEC", float, None),
+            "list_sync_interval_sec": ("LIST_SYNC_INTERVAL_SEC", float, None),
+            "set_sync_interval_sec": ("SET_SYNC_INTERVAL_SEC", float, None),
+            "stream_sync_interval_sec": ("STREAM_SYNC_INTERVAL_SEC", float, None),
+            "string_sync_interval_sec": ("STRING_SYNC_INTERVAL_SEC", float, None),
+            "zset_sync_interval_sec": ("ZSET_SYNC_INTERVAL_SEC", float, None),
+        }
+        self.config = self.type_check_and_map(self.config_vars)
+        self.config.update(load_optional_vars(config_file, self.optional_config_vars))
+
+
+class AsyncMongoConfig(BaseConfig):
+    """
+    Connection settings of the asyncio engine's AsyncMongoClient, from the same variables
+    as the mongoengine connection.
+    """
+
+    def __init__(self, config_file: str = ".env"):
+        super().__init__(config_file)
+        self.config_vars = {
+            "mongo_host": ("MONGO_HOST", str),
+            "mongo_port": ("MONGO_PORT", int),
+        }
+        self.optional_config_vars = {
+            "mongo_db_user": ("MONGO_DB_USER", str, None),
+            "mongo_db_password": ("MONGO_DB_PASSWORD", str, None),
+            # database the user is defined in, the compose root user lives in admin
+            "mongo_auth_source": ("MONGO_AUTH_SOURCE", str, "admin"),
+        }
         self.config = self.type_check_and_map(self.config_vars)
+        self.config.update(load_optional_vars(config_file, self.optional_config_vars))
@@ -0,0 +1,101 @@
+import re
+
+
+def parse_patterns(raw: str) -> list[str]:
+    """
+    Splits a comma separated KEY_INCLUDE_PATTERNS / KEY_EXCLUDE_PATTERNS value.
+    """
+    return [pattern.strip() for pattern in raw.split(",") if pattern.strip()]
+
+
+def glob_to_regex(pattern: str) -> str:
+    """
+    Translates a Redis glob (*, ?, [abc], [^a-z], \\ escapes) into an equivalent regular expression.
+    https://redis.io/commands/keys/
+    """
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "*":
+            parts.append(".*")
+        elif char == "?":
+            parts.append(".")
+        elif char == "\\" and i + 1 < len(pattern):
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        elif char == "[":
+            i, char_class = glob_class_to_regex(pattern, i + 1)
+            parts.append(char_class)
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return "".join(parts)
+
+
+def glob_class_to_regex(pattern: str, start: int) -> tuple[int, str]:
+    """
+    Translates the [...] class starting after the "[" at start, returns the index of its "]"
+    and the regex class. Like Redis, a class left open runs to the end of the pattern and
+    reversed ranges (z-a) are accepted.
+    """
+    i = start
+    negate = i < len(pattern) and pattern[i] == "^"
+    if negate:
+        i += 1
+    members = []
+    while i < len(pattern) and pattern[i] != "]":
+        if pattern[i] == "\\" and i + 1 < len(pattern):
+            i += 1
+            members.append(re.escape(pattern[i]))
+        elif i + 2 < len(pattern) and pattern[i + 1] == "-" and pattern[i + 2] != "]":
+            low, high = sorted((pattern[i], pattern[i + 2]))
+            members.append(f"{re.escape(low)}-{re.escape(high)}")
+            i += 2
+        else:
+            members.append(re.escape(pattern[i]))
+        i += 1
+    if not members:
+        return i, "." if negate else "(?!)"
+    return i, "[" + ("^" if negate else "") + "".join(members) + "]"
+
+
+class KeyFilter:
+    """
+    The keys selected by KEY_INCLUDE_PATTERNS minus those matching KEY_EXCLUDE_PATTERNS.
+    Includes are pushed down to Redis as SCAN MATCH patterns, excludes are checked locally with
+    one precompiled regex so excluded keys never cost a TYPE or value lookup.
+    """
+
+    def __init__(self, include: list[str], exclude: list[str]):
+        self.include = list(dict.fromkeys(include)) or ["*"]
+        if "*" in self.include:
+            self.include = ["*"]  # every other pass would only repeat its keys
+        self.exclude = exclude
+        self.include_regex = self.compile(self.include)
+        self.exclude_regex = self.compile(exclude) if exclude else None
+
+    @staticmethod
+    def compile(patterns: list[str]) -> re.Pattern:
+        return re.compile(
+            "|".join(f"(?:{glob_to_regex(pattern)})" for pattern in patterns),
+            re.DOTALL,
+        )
+
+    def excluded(self, key: str) -> bool:
+        return self.exclude_regex is not None and bool(
+            self.exclude_regex.fullmatch(key)
+        )
+
+    def matches(self, key: str) -> bool:
+        return (
+            self.include == ["*"] or bool(self.include_regex.fullmatch(key))
+        ) and not self.excluded(key)
+
+    def filter_keys(self, keys: list[str]) -> list[str]:
+        if self.exclude_regex is None:
+            return keys
+        return [key for key in keys if not self.excluded(key)]
+
+    def __repr__(self) -> str:
+        return f"KeyFilter(include={self.include}, exclude={self.exclude})"
@@ -0,0 +1,167 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+from redis.cluster import ClusterNode
+
+from redis_to_mongo.partition import Partition
+from redis_to_mongo.redis_api import RedisHandler, ScanCount
+
+
+class NodeScan:
+    """
+    SCAN progress of one node (None on a standalone server) through a cycle's passes,
+    each pass being a (match, type_filter) pair walked from cursor 0 back to cursor 0.
+    """
+
+    def __init__(
+        self, passes: list[tuple[str, str | None]], node: ClusterNode | None = None
+    ):
+        self.passes = passes
+        self.node = node
+        self.pass_index = 0
+        self.cursor = 0
+        self.count = ScanCount()
+
+    @property
+    def done(self) -> bool:
+        return self.pass_index == len(self.passes)
+
+    def scan(
+        self, redis_handler: RedisHandler, deadline: float | None
+    ) -> list[tuple[str | None, list[str]]]:
+        """
+        Scans pages until the passes are done or the deadline has passed, at least one page
+        per call so every round makes progress. Returns (type_filter, keys) per page.
+        """
+        pages = []
+        while not self.done:
+            match, type_filter = self.passes[self.pass_index]
+            self.cursor, keys = redis_handler.scan_page(
+                self.cursor, match, type_filter, self.count, self.node
+            )
+            pages.append((type_filter, keys))
+            if self.cursor == 0:
+                self.pass_index += 1
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+        return pages
+
+
+class KeyScanner:
+    """
+    Walks the keyspace with SCAN a time budget at a time, keeping the cursors between rounds.
+    A cycle is every include pattern (per type for typed scans) walked over every node; until
+    the running cycle completes, the keys of the last completed one stand in for those it has
+    not reached yet. Keys therefore only drop out once a whole cycle missed them.
+    """
+
+    def __init__(
+        self,
+        redis_handler: RedisHandler,
+        partition: Partition,
+        types: list[str] | None = None,
+    ):
+        self.redis_handler = redis_handler
+        self.partition = partition
+        self.passes = self.get_passes(types)
+        self.nodes: list[NodeScan] = []
+        self.cycle: dict[str, str] = {}  # keys found so far by the running cycle
+        self.completed: dict[str, str] | None = None  # the last completed cycle
+        self.cycles = 0
+
+    def get_passes(self, types: list[str] | None) -> list[tuple[str, str | None]]:
+        """
+        Untyped passes resolve TYPE per key, typed ones filter server-side. Module types
+        (e.g. ReJSON-RL) need an untyped pass over the keys no typed pass claimed.
+        """
+        include = self.redis_handler.key_filter.include
+        if types is None:
+            return [(pattern, None) for pattern in include]
+        passes: list[tuple[str, str | None]] = [
+            (pattern, key_type)
+            for key_type in types
+            if key_type in RedisHandler.CORE_TYPES
+            for pattern in include
+        ]
+        if any(key_type not in RedisHandler.CORE_TYPES for key_type in types):
+            passes += [(pattern, None) for pattern in include]
+        return passes
+
+    def start_cycle(self):
+        nodes = (
+            self.redis_handler.get_scan_nodes() if self.redis_handler.cluster else []
+        )
+        self.nodes = [NodeScan(self.passes, node) for node in nodes or [None]]
+        self.cycle = {}
+
+    def scan(self, budget_sec: float | None) -> bool:
+        """
+        Continues the running cycle, starting one if needed, until budget_sec is spent (None
+        runs it to the end). On a cluster the nodes are scanned in parallel.
+        Returns whether the cycle completed.
+        """
+        if not self.nodes:
+            self.start_cycle()
+        deadline = None if budget_sec is None else time.monotonic() + budget_sec
+        pending = [node for node in self.nodes if not node.done]
+        try:
+            if len(pending) == 1:
+                node_pages = [pending[0].scan(self.redis_handler, deadline)]
+            else:
+                with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+                    node_pages = list(
+                        executor.map(
+                            lambda node: node.scan(self.redis_handler, deadline),
+                            pending,
+                        )
+                    )
+        except Exception:
+            # cursors may be lost with a failed over node, the next round starts over
+            self.nodes = []
+            raise
+        self.add_pages([page for pages in node_pages for page in pages])
+        if not all(node.done for node in self.nodes):
+            return False
+        # sorted by length once per cycle to process main streams first
+        self.completed = dict(sorted(self.cycle.items(), key=lambda item: len(item[0])))
+        self.cycle, self.nodes = {}, []
+        self.cycles += 1
+        return True
+
+    def add_pages(self, pages: list[tuple[str | None, list[str]]]):
+        """
+        Adds the scanned keys left by the key filter and the partition to the running cycle,
+        resolving TYPE only for untyped keys no typed pass has claimed.
+        """
+        untyped = []
+        for type_filter, keys in pages:
+            keys = [
+                key
+                for key in self.redis_handler.key_filter.filter_keys(keys)
+                if self.partition.owns(key)
+            ]
+            if type_filter is None:
+                untyped.extend(keys)
+            else:
+                self.cycle.update((key, type_filter) for key in keys)
+        unresolved = [key for key in dict.fromkeys(untyped) if key not in self.cycle]
+        for key, key_type in self.redis_handler.iter_types(unresolved):
+            if key_type != "none":  # deleted since it was scanned
+                self.cycle[key] = key_type
+
+    def key_types(self) -> dict[str, str]:
+        """
+        Returns the keys of the last completed cycle updated with those found by the running one.
+        """
+        if not self.cycle:
+            return dict(self.completed or {})
+        return {**(self.completed or {}), **self.cycle}
+
+    def unconfirmed_keys(self) -> set[str]:
+        """
+        Returns the keys of the last completed cycle the running one has not found yet.
+        They may have been deleted since, key_types only drops them once the cycle completes.
+        """
+        if not self.nodes or self.completed is None:
+            return set()
+        return {key for key in self.completed if key not in self.cycle}
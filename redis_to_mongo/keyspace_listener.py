@@ -0,0 +1,81 @@
+import threading
+from typing import Any
+
+from redis.cluster import ClusterNode
+
+from redis_to_mongo.logger import logger
+from redis_to_mongo.redis_api import RedisHandler
+
+
+class KeyspaceListener:
+    """
+    Subscribes to Redis keyspace notifications and collects the touched keys into a
+    deduplicated dirty set that the SyncEngine drains once per round.
+    Notifications are only published on the node where the key changed, so on a cluster
+    every primary is subscribed to.
+    """
+
+    # K: keyspace channel, A: all generic and type specific events (incl. module keys)
+    NOTIFY_FLAGS = "KA"
+
+    def __init__(self, redis_handler: RedisHandler):
+        self.redis_handler = redis_handler
+        self.channel_prefix = f"__keyspace@{redis_handler.DB_NUMBER}__:"
+        self.dirty_keys: set[str] = set()
+        self.lock = threading.Lock()
+        self.events_lost = False
+        self.pubsubs: list[Any] = []
+        self.threads: list[Any] = []
+
+    def start(self):
+        nodes: list[ClusterNode | None] = [None]
+        if self.redis_handler.cluster:
+            nodes = list(self.redis_handler.client.get_primaries())  # type: ignore
+        for node in nodes:
+            self.redis_handler.enable_keyspace_notifications(self.NOTIFY_FLAGS, node)
+            if node is None:
+                pubsub = self.redis_handler.client.pubsub(
+                    ignore_subscribe_messages=True
+                )
+            else:
+                pubsub = self.redis_handler.client.pubsub(  # type: ignore
+                    node=node, ignore_subscribe_messages=True
+                )
+            pubsub.psubscribe(**{self.channel_prefix + "*": self.handle_message})
+            self.pubsubs.append(pubsub)
+            self.threads.append(
+                pubsub.run_in_thread(
+                    sleep_time=0.1, daemon=True, exception_handler=self.handle_exception
+                )
+            )
+        logger.info(
+            f"Listening to keyspace notifications on {self.channel_prefix}* on {len(nodes)} node(s)"
+        )
+
+    def stop(self):
+        for thread in self.threads:
+            thread.stop()
+        for pubsub in self.pubsubs:
+            pubsub.close()
+        self.threads, self.pubsubs = [], []
+
+    def handle_message(self, message: dict):
+        key = message["channel"][len(self.channel_prefix) :]
+        with self.lock:
+            self.dirty_keys.add(key)
+
+    def handle_exception(self, exception: Exception, pubsub, thread):
+        # notifications are fire and forget, anything published while disconnected is gone
+        logger.error(f"Keyspace notification listener failed: {str(exception)}")
+        with self.lock:
+            self.events_lost = True
+        thread.stop()
+
+    def drain(self) -> tuple[set[str], bool]:
+        """
+        Returns the keys touched since the last drain and whether events may have been missed.
+        """
+        with self.lock:
+            dirty_keys, self.dirty_keys = self.dirty_keys, set()
+            events_lost, self.events_lost = self.events_lost, False
+        return dirty_keys, events_lost
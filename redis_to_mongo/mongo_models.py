@@ -0,0 +1,32 @@
+from mongoengine import DictField, IntField, ListField, ObjectIdField, StringField
+
+from redis_to_mongo.redis_to_mongo_mongo_modules.mongo_models import *
+from redis_to_mongo.redis_to_mongo_mongo_modules.mongo_models import (
+    BaseDocument,
+    KeyedDocument,
+)
+
+# models for the types not covered by the shared mongo modules
+
+
+class HashODM(KeyedDocument):
+    values = DictField()
+
+
+# storage for values too big to live inside their ODM document
+
+
+class ValueManifestODM(BaseDocument):
+    owner = ObjectIdField(required=True, unique=True)  # id of the offloaded ODM
+    generation = ObjectIdField(required=True)  # of the chunks currently in use
+    encoding = StringField(choices=("members", "json"), required=True)
+    chunk_count = IntField()
+    size = IntField()  # BSON bytes of the members
+
+
+class ValueChunkODM(BaseDocument):
+    owner = ObjectIdField(required=True)
+    generation = ObjectIdField(required=True)
+    seq = IntField(required=True)
+    values = ListField()
+    meta = {"indexes": [("owner", "generation", "seq")]}
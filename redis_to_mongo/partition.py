@@ -0,0 +1,36 @@
+from redis.crc import REDIS_CLUSTER_HASH_SLOTS as HASH_SLOTS, key_slot
+
+
+def key_hash_slot(key: str) -> int:
+    """
+    Returns the Redis Cluster hash slot of the key, honouring {hash tags}.
+    https://redis.io/docs/reference/cluster-spec/#hash-tags
+    """
+    return key_slot(key.encode())
+
+
+class Partition:
+    """
+    One of count contiguous hash slot ranges of the keyspace, owned by a single sync worker.
+    """
+
+    def __init__(self, index: int, count: int):
+        if count < 1 or not 0 <= index < count:
+            raise ValueError(f"Invalid partition {index} of {count}")
+        self.index = index
+        self.count = count
+        self.first_slot = index * HASH_SLOTS // count
+        self.last_slot = (index + 1) * HASH_SLOTS // count - 1
+
+    def owns(self, key: str) -> bool:
+        return self.count == 1 or (
+            self.first_slot <= key_hash_slot(key) <= self.last_slot
+        )
+
+    def filter_key_types(self, key_types: dict[str, str]) -> dict[str, str]:
+        if self.count == 1:
+            return key_types
+        return {key: type for key, type in key_types.items() if self.owns(key)}
+
+    def __repr__(self) -> str:
+        return f"Partition({self.index}/{self.count}, slots {self.first_slot}-{self.last_slot})"
@@ -1,22 +1,73 @@
-from typing import Any, cast
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import time
+from typing import Any, Callable, Iterator, cast
 import redis
+from redis.cluster import ClusterNode, RedisCluster
 from redis_to_mongo.logger import logger
 from redis_to_mongo.config_loader import RedisConfig
+from redis_to_mongo.key_filter import KeyFilter
+
+
+class ScanCount:
+    """
+    COUNT hint for a series of SCAN calls. It doubles while calls come back well within
+    TARGET_SEC and halves once one takes longer, so big keyspaces are walked in few round trips
+    without single calls blocking Redis for long.
+    """
+
+    START = 1000
+    MIN = 100
+    MAX = 100_000
+    TARGET_SEC = 0.05
+
+    def __init__(self, value: int | None = None):
+        self.value = value or self.START
+
+    def update(self, elapsed: float) -> None:
+        if elapsed > self.TARGET_SEC:
+            self.value = max(self.MIN, self.value // 2)
+        elif elapsed < self.TARGET_SEC / 2:
+            self.value = min(self.MAX, self.value * 2)
 
 
 class RedisHandler:
     DB_NUMBER = 0
-    _instance = None
+    # types SCAN can filter server-side, https://redis.io/commands/scan/#the-type-option
+    CORE_TYPES = {"string", "list", "set", "zset", "hash", "stream"}
+    SIZE_COMMANDS = {"list": "llen", "set": "scard", "zset": "zcard", "hash": "hlen"}
+    # how often a blocking read over several cluster hash slots checks them all again
+    STREAM_POLL_SEC = 0.01
 
-    def __new__(cls, config: RedisConfig):
-        if cls._instance is None:
-            cls._instance = super(RedisHandler, cls).__new__(cls)
-            cls._instance.client = cls._instance._initialize_redis_client(config)
-            cls._instance.config = config
-        return cls._instance
+    def __init__(self, config: RedisConfig):
+        self.config = config
+        self.cluster = config.config["redis_mode"] == "cluster"
+        self.client = self._initialize_redis_client(config)
+        self.round_trips = 0
+        self.key_filter = KeyFilter(
+            config.config["key_include_patterns"], config.config["key_exclude_patterns"]
+        )
+
+    def take_round_trips(self) -> int:
+        """
+        Returns the number of Redis round trips made since the last call and resets the counter.
+        """
+        round_trips, self.round_trips = self.round_trips, 0
+        return round_trips
 
     def _initialize_redis_client(self, config: RedisConfig) -> redis.Redis:
         try:
+            if self.cluster:
+                # cluster nodes only have db 0
+                cluster_client = RedisCluster(
+                    host=config.config["redis_host"],
+                    port=config.config["redis_port"],
+                    decode_responses=True,
+                )
+                logger.debug(
+                    f"Redis cluster client initialized with {len(cluster_client.get_nodes())} nodes via host={config.config['redis_host']}, port={config.config['redis_port']}"
+                )
+                return cast(redis.Redis, cluster_client)
             client: redis.Redis = redis.Redis(
                 host=config.config["redis_host"],
                 port=config.config["redis_port"],
@@ -31,35 +82,181 @@ class RedisHandler:
             logger.error(f"Error initializing Redis client: {str(e)}")
             raise e
 
+    def enable_keyspace_notifications(
+        self, flags: str, node: ClusterNode | None = None
+    ) -> None:
+        """
+        Adds the given flags to the server's (or the cluster node's) notify-keyspace-events,
+        keeping the ones already set.
+        """
+        target = {} if node is None else {"target_nodes": node}
+        try:
+            current = self.client.config_get("notify-keyspace-events", **target)  # type: ignore
+            current_flags = current.get("notify-keyspace-events", "")
+            merged = "".join(sorted(set(current_flags) | set(flags)))
+            if set(merged) != set(current_flags):
+                self.client.config_set("notify-keyspace-events", merged, **target)  # type: ignore
+                logger.info(f"Set notify-keyspace-events to {merged}")
+        except redis.ResponseError as e:
+            # e.g. CONFIG is disabled on managed instances, the server may already be configured
+            logger.warning(
+                f"Could not set notify-keyspace-events, make sure it includes {flags}: {str(e)}"
+            )
+
     def read_messages(
         self,
         last_read_ids: dict[str, str],
         block: int | None = None,
     ) -> dict[str, list[tuple[str, dict[str, str]]]]:
         try:
-            messages = self.client.xread(  # type: ignore
+            messages = self._read_streams(
                 last_read_ids,
-                count=self.config.config["messages_per_stream"],
-                block=block,
+                lambda client, read_ids, block: client.xread(
+                    read_ids,
+                    count=self.config.config["messages_per_stream"],
+                    block=block,
+                ),
+                block,
             )
-            messages = cast(list[Any], messages)
             logger.debug(f"Read {len(messages)} messages from streams {last_read_ids}")
-            for stream_data in messages:
-                stream_name, message_list = stream_data[0], stream_data[1]  # type: ignore
-                latest_message_id = message_list[-1][0]
-                last_read_ids[stream_name] = latest_message_id
-            return dict(messages)
+            return self.advance_read_ids(last_read_ids, messages)
         except Exception as e:
             logger.error(
                 f"Error reading messages from streams {last_read_ids}: {str(e)}"
             )
             raise e
 
+    @staticmethod
+    def advance_read_ids(
+        last_read_ids: dict[str, str], messages: list[Any]
+    ) -> dict[str, list[tuple[str, dict[str, str]]]]:
+        """
+        Moves each read stream's id on to its last message and returns the messages per stream.
+        """
+        for stream_data in messages:
+            stream_name, message_list = stream_data[0], stream_data[1]
+            latest_message_id = message_list[-1][0]
+            last_read_ids[stream_name] = latest_message_id
+        return dict(messages)
+
+    def create_consumer_group(self, stream: str, group: str, start_id: str) -> None:
+        """
+        Creates the consumer group on the stream starting after start_id, if it does not exist yet.
+        """
+        try:
+            self.round_trips += 1
+            self.client.xgroup_create(stream, group, id=start_id)  # type: ignore
+            logger.info(f"Created consumer group {group} on {stream} at {start_id}")
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                logger.error(
+                    f"Error creating consumer group {group} on {stream}: {str(e)}"
+                )
+                raise e
+
+    def read_group_messages(
+        self,
+        streams: list[str],
+        group: str,
+        consumer: str,
+        block: int | None = None,
+    ) -> dict[str, list[tuple[str, dict[str, str]]]]:
+        """
+        Reads messages never delivered to any consumer of the group and assigns them to consumer.
+        """
+        try:
+            messages = self._read_streams(
+                {stream: ">" for stream in streams},
+                lambda client, read_ids, block: client.xreadgroup(
+                    group,
+                    consumer,
+                    read_ids,
+                    count=self.config.config["messages_per_stream"],
+                    block=block,
+                ),
+                block,
+            )
+            logger.debug(f"Read {len(messages)} streams as {consumer} in group {group}")
+            return dict(messages)
+        except Exception as e:
+            logger.error(f"Error reading streams {streams} in group {group}: {str(e)}")
+            raise e
+
+    def ack_messages(self, group: str, message_ids: dict[str, list[str]]) -> None:
+        """
+        Acknowledges the given message ids per stream with pipelined XACKs.
+        """
+        streams = [stream for stream, ids in message_ids.items() if ids]
+        self._pipeline_per_key(
+            streams, lambda pipe, stream: pipe.xack(stream, group, *message_ids[stream])
+        )
+
+    def claim_pending_messages(
+        self, streams: list[str], group: str, consumer: str, min_idle_ms: int
+    ) -> dict[str, list[tuple[str, dict[str, str]]]]:
+        """
+        Transfers messages pending longer than min_idle_ms (e.g. of a crashed consumer) to consumer.
+        """
+        claims = self._pipeline_per_key(
+            streams,
+            lambda pipe, stream: pipe.xautoclaim(
+                stream,
+                group,
+                consumer,
+                min_idle_ms,
+                count=self.config.config["messages_per_stream"],
+            ),
+        )
+        return self.claimed_messages(streams, claims)
+
+    @staticmethod
+    def claimed_messages(
+        streams: list[str], claims: list[Any]
+    ) -> dict[str, list[tuple[str, dict[str, str]]]]:
+        claimed = {}
+        for stream, claim in zip(streams, claims):
+            # entries deleted from the stream while pending come back without content
+            messages = [message for message in claim[1] if message[1] is not None]
+            if messages:
+                claimed[stream] = messages
+        return claimed
+
+    def get_consumer_group_lags(self, streams: list[str], group: str) -> dict[str, int]:
+        """
+        Returns the number of entries not yet delivered to the group per stream.
+        """
+        groups = self._pipeline_per_key(
+            streams, lambda pipe, stream: pipe.xinfo_groups(stream)
+        )
+        lags = {}
+        for stream, stream_groups in zip(streams, groups):
+            for info in stream_groups:
+                if info["name"] == group and info.get("lag") is not None:
+                    lags[stream] = info["lag"]
+        return lags
+
+    def get_stream_lags(self, last_read_ids: dict[str, str]) -> dict[str, int]:
+        """
+        Returns how many milliseconds each stream's newest entry is ahead of the given read id.
+        """
+        streams = list(last_read_ids)
+        newest = self._pipeline_per_key(
+            streams, lambda pipe, stream: pipe.xrevrange(stream, count=1)
+        )
+        lags = {}
+        for stream, entries in zip(streams, newest):
+            if entries:
+                newest_ms = int(entries[0][0].split("-")[0])
+                read_ms = int(last_read_ids[stream].split("-")[0])
+                lags[stream] = max(0, newest_ms - read_ms)
+        return lags
+
     def get_ordered_set(self, set_name: str) -> list[dict[str, Any]]:
         """
         Returns all values from the given ordered set.
         """
         try:
+            self.round_trips += 1
             set_values = self.client.zrange(set_name, 0, -1, withscores=True)  # type: ignore
             logger.debug(f"Retrieved all values from set {set_name}: {set_values}")
             dict_list = list(map(lambda t: {"key": t[0], "score": t[1]}, set_values))
@@ -73,6 +270,7 @@ class RedisHandler:
         Returns all values from the given ordered set.
         """
         try:
+            self.round_trips += 1
             set_values = self.client.smembers(set_name)  # type: ignore
             logger.debug(f"Retrieved all values from set {set_name}: {set_values}")
             as_list = list(set_values)
@@ -91,6 +289,7 @@ class RedisHandler:
         Returns the value of the given key as a JSON object.
         """
         try:
+            self.round_trips += 1
             json_value = self.client.json().get(key)  # type: ignore
             logger.debug(f"Retrieved JSON value for key {key}: {json_value}")
             return json_value
@@ -103,6 +302,7 @@ class RedisHandler:
         Returns all values from the list stored at the given key.
         """
         try:
+            self.round_trips += 1
             list_values = self.client.lrange(key, 0, -1)  # type: ignore
             logger.debug(f"Retrieved all values from list {key}: {list_values}")
             return list_values
@@ -115,6 +315,7 @@ class RedisHandler:
         Returns the string value of the given key.
         """
         try:
+            self.round_trips += 1
             string_value = self.client.get(key)  # type: ignore
             logger.debug(f"Retrieved string value for key {key}: {string_value}")
             return string_value
@@ -122,6 +323,284 @@ class RedisHandler:
             logger.error(f"Error retrieving string value for key {key}: {str(e)}")
             raise e
 
+    def iter_value_batches(
+        self,
+        keys: list[str],
+        fetch_batch: Callable[[list[str]], list[Any]],
+        batch_size: int | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Yields {key: value} chunks, fetching each chunk of keys with one batched call.
+        """
+        batch_size = batch_size or self.config.config["value_batch_size"]
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start : start + batch_size]
+            yield dict(zip(batch, fetch_batch(batch)))
+
+    def get_strings(self, keys: list[str]) -> list[str | None]:
+        """
+        Returns the string values of the given keys with a single MGET, one per hash slot on a cluster.
+        """
+        try:
+            string_values = self._multi_key_command(
+                keys, lambda client, keys: client.mget(keys)
+            )
+            logger.debug(f"Retrieved string values for {len(keys)} keys")
+            return cast(list[str | None], string_values)
+        except Exception as e:
+            logger.error(f"Error retrieving string values for keys: {str(e)}")
+            raise e
+
+    def get_jsons(self, keys: list[str]) -> list[Any]:
+        """
+        Returns the JSON values of the given keys with a single JSON.MGET on the root path,
+        one per hash slot on a cluster.
+        """
+        try:
+            json_values = self._multi_key_command(
+                keys, lambda client, keys: client.json().mget(keys, ".")
+            )
+            logger.debug(f"Retrieved JSON values for {len(keys)} keys")
+            return cast(list[Any], json_values)
+        except Exception as e:
+            logger.error(f"Error retrieving JSON values for keys: {str(e)}")
+            raise e
+
+    def get_lists(self, keys: list[str]) -> list[list[str]]:
+        """
+        Returns all values of the given lists with pipelined LRANGEs.
+        """
+        return self._pipeline_per_key(keys, lambda pipe, key: pipe.lrange(key, 0, -1))
+
+    def get_sets(self, keys: list[str]) -> list[list[str]]:
+        """
+        Returns all members of the given sets with pipelined SMEMBERS.
+        """
+        set_values = self._pipeline_per_key(keys, lambda pipe, key: pipe.smembers(key))
+        return [list(members) for members in set_values]
+
+    def get_ordered_sets(self, keys: list[str]) -> list[list[dict[str, Any]]]:
+        """
+        Returns all members of the given ordered sets with pipelined ZRANGE ... WITHSCORES.
+        """
+        set_values = self._pipeline_per_key(
+            keys, lambda pipe, key: pipe.zrange(key, 0, -1, withscores=True)
+        )
+        return [
+            [{"key": member, "score": score} for member, score in members]
+            for members in set_values
+        ]
+
+    def get_collection_sizes(self, keys: list[str], key_type: str) -> list[int]:
+        """
+        Returns the number of members of each key with pipelined LLEN/SCARD/ZCARD/HLEN.
+        """
+        command = self.SIZE_COMMANDS[key_type]
+        return self._pipeline_per_key(
+            keys, lambda pipe, key: getattr(pipe, command)(key)
+        )
+
+    def iter_list_chunks(
+        self,
+        key: str,
+        chunk_size: int | None = None,
+        start: int = 0,
+        stop: int | None = None,
+    ) -> Iterator[list[str]]:
+        """
+        Yields the elements from start to stop (inclusive, the end of the list if None) in order
+        with ranged LRANGEs of chunk_size elements.
+        """
+        chunk_size = chunk_size or self.config.config["collection_chunk_size"]
+        while stop is None or start <= stop:
+            end = start + chunk_size - 1
+            if stop is not None:
+                end = min(end, stop)
+            self.round_trips += 1
+            chunk = self.client.lrange(key, start, end)  # type: ignore
+            if chunk:
+                yield cast(list[str], chunk)
+            if len(chunk) < end - start + 1:  # type: ignore
+                return
+            start = end + 1
+
+    def iter_set_chunks(
+        self, key: str, chunk_size: int | None = None
+    ) -> Iterator[list[str]]:
+        """
+        Yields the set members with SSCAN pages of about chunk_size members. Members may repeat
+        across pages if the set is rehashed during the scan.
+        """
+        chunk_size = chunk_size or self.config.config["collection_chunk_size"]
+        cursor = 0
+        while True:
+            self.round_trips += 1
+            cursor, members = self.client.sscan(key, cursor, count=chunk_size)  # type: ignore
+            if members:
+                yield cast(list[str], members)
+            if cursor == 0:
+                return
+
+    def iter_ordered_set_chunks(
+        self, key: str, chunk_size: int | None = None
+    ) -> Iterator[list[dict[str, Any]]]:
+        """
+        Yields the ordered set by rank with ranged ZRANGE ... WITHSCORES of chunk_size members.
+        Ranges rather than ZSCAN keep the chunks in score order.
+        """
+        chunk_size = chunk_size or self.config.config["collection_chunk_size"]
+        start = 0
+        while True:
+            self.round_trips += 1
+            members = self.client.zrange(  # type: ignore
+                key, start, start + chunk_size - 1, withscores=True
+            )
+            if members:
+                yield [{"key": member, "score": score} for member, score in members]  # type: ignore
+            if len(members) < chunk_size:  # type: ignore
+                return
+            start += chunk_size
+
+    def get_hashes(self, keys: list[str]) -> list[dict[str, str]]:
+        """
+        Returns all fields of the given hashes with pipelined HSCANs of HASH_SCAN_COUNT fields,
+        so large hashes are read in chunks rather than one HGETALL, small ones fit in the first page.
+        """
+        count = self.config.config["hash_scan_count"]
+        cursors = dict.fromkeys(keys, 0)
+        values: dict[str, dict[str, str]] = {key: {} for key in keys}
+        while cursors:
+            pending = list(cursors)
+            pages = self._pipeline_per_key(
+                pending, lambda pipe, key: pipe.hscan(key, cursors[key], count=count)
+            )
+            for key, (cursor, fields) in zip(pending, pages):
+                values[key].update(fields)
+                if cursor == 0:
+                    del cursors[key]
+                else:
+                    cursors[key] = cursor
+        return [values[key] for key in keys]
+
+    def _pipeline_per_key(
+        self, keys: list[str], queue_command: Callable[[Any, str], Any]
+    ) -> list[Any]:
+        """
+        Runs one command per key in a pipeline, one pipeline per node on a cluster.
+        """
+        if self.cluster:
+            return self._run_per_node(
+                keys,
+                lambda key: key,
+                lambda node_keys: self._execute_pipeline(node_keys, queue_command),
+            )
+        return self._execute_pipeline(keys, queue_command)
+
+    def _execute_pipeline(
+        self, items: list[Any], queue_command: Callable[[Any, Any], Any]
+    ) -> list[Any]:
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for item in items:
+                queue_command(pipe, item)
+            self.round_trips += 1
+            values = pipe.execute()
+            logger.debug(f"Retrieved values for {len(items)} keys in one pipeline")
+            return values
+        except Exception as e:
+            logger.error(f"Error retrieving values for keys: {str(e)}")
+            raise e
+
+    def _multi_key_command(
+        self, keys: list[str], command: Callable[[Any, list[str]], list[Any]]
+    ) -> list[Any]:
+        """
+        Runs a multi-key read like MGET. Cluster keys in one command must share a hash slot,
+        so there it is split into one command per slot, pipelined per node.
+        """
+        if not self.cluster:
+            self.round_trips += 1
+            return command(self.client, keys)
+        slots = defaultdict(list)
+        for key in keys:
+            slots[self.client.keyslot(key)].append(key)
+        slot_keys = list(slots.values())
+        slot_values = self._run_per_node(
+            slot_keys,
+            lambda same_slot_keys: same_slot_keys[0],
+            lambda node_slot_keys: self._execute_pipeline(node_slot_keys, command),
+        )
+        values = {}
+        for same_slot_keys, same_slot_values in zip(slot_keys, slot_values):
+            values.update(zip(same_slot_keys, same_slot_values))
+        return [values[key] for key in keys]
+
+    def _read_streams(
+        self,
+        read_ids: dict[str, str],
+        read: Callable[[Any, dict[str, str], int | None], Any],
+        block: int | None,
+    ) -> list[Any]:
+        """
+        Runs an XREAD-like command over the streams. Cluster streams in one command must share a hash
+        slot, so there reads are split per slot and pipelined per node. A blocking read across slots
+        can't be one command, so the pipelines are repeated every STREAM_POLL_SEC until some stream
+        has messages or block ms have passed (block=0 waits forever, like XREAD BLOCK 0).
+        """
+        if not self.cluster:
+            self.round_trips += 1
+            return cast(list[Any], read(self.client, read_ids, block) or [])
+        slots: dict[int, dict[str, str]] = defaultdict(dict)
+        for stream, read_id in read_ids.items():
+            slots[self.client.keyslot(stream)][stream] = read_id
+        slot_read_ids = list(slots.values())
+        if block is not None and len(slot_read_ids) == 1:
+            self.round_trips += 1
+            return cast(list[Any], read(self.client, slot_read_ids[0], block) or [])
+        deadline = time.monotonic() + (block or 0) / 1000
+        while True:
+            responses = self._run_per_node(
+                slot_read_ids,
+                lambda same_slot_ids: next(iter(same_slot_ids)),
+                lambda node_read_ids: self._execute_pipeline(
+                    node_read_ids,
+                    lambda pipe, same_slot_ids: read(pipe, same_slot_ids, None),
+                ),
+            )
+            messages = [
+                stream for response in responses if response for stream in response
+            ]
+            if messages or block is None or (block and time.monotonic() >= deadline):
+                return messages
+            time.sleep(self.STREAM_POLL_SEC)
+
+    def _run_per_node(
+        self,
+        items: list[Any],
+        item_key: Callable[[Any], str],
+        run: Callable[[list[Any]], list[Any]],
+    ) -> list[Any]:
+        """
+        Splits items by the cluster node owning item_key(item), runs the nodes' items in parallel
+        and returns the results in the original order.
+        """
+        groups = defaultdict(list)
+        for index, item in enumerate(items):
+            node = self.client.get_node_from_key(item_key(item))  # type: ignore
+            groups[node.name].append(index)
+        results: list[Any] = [None] * len(items)
+        if not groups:
+            return results
+        with ThreadPoolExecutor(max_workers=len(groups)) as executor:
+            futures = {
+                executor.submit(run, [items[index] for index in indexes]): indexes
+                for indexes in groups.values()
+            }
+            for future, indexes in futures.items():
+                for index, value in zip(indexes, future.result()):
+                    results[index] = value
+        return results
+
     def get_all_keys(self) -> list[str]:
         """
         Efficiently structures Redis keys into streams and sets.
@@ -129,21 +608,146 @@ class RedisHandler:
         """
         try:
             all_keys = sorted(
-                list(self.client.scan_iter(match="*")), key=len
+                self.scan_included_keys(), key=len
             )  # Sort by string length
             return cast(list[str], all_keys)
         except Exception as e:
             logger.error(f"Error retrieving stream structure: {str(e)}")
             raise e
 
+    def scan_keys(self, match: str = "*", type_filter: str | None = None) -> list[str]:
+        """
+        Returns all keys matching the pattern, optionally filtered server-side by Redis type.
+        On a cluster every shard is scanned in parallel.
+        """
+        if not self.cluster:
+            return self._scan_node(match, type_filter)
+        nodes = self.get_scan_nodes()
+        with ThreadPoolExecutor(max_workers=len(nodes)) as executor:
+            node_keys = list(
+                executor.map(
+                    lambda node: self._scan_node(match, type_filter, node), nodes
+                )
+            )
+        return [key for keys in node_keys for key in keys]
+
+    def scan_included_keys(self, type_filter: str | None = None) -> list[str]:
+        """
+        Returns the keys selected by the key filter: one SCAN MATCH pass per include pattern,
+        excluded keys dropped before anything else looks them up.
+        """
+        if len(self.key_filter.include) == 1:
+            keys = self.scan_keys(self.key_filter.include[0], type_filter)
+        else:
+            # a key matching several include patterns comes back from each of their passes
+            keys = list(
+                dict.fromkeys(
+                    key
+                    for pattern in self.key_filter.include
+                    for key in self.scan_keys(pattern, type_filter)
+                )
+            )
+        return self.key_filter.filter_keys(keys)
+
+    def _scan_node(
+        self, match: str, type_filter: str | None, node: ClusterNode | None = None
+    ) -> list[str]:
+        keys = []
+        cursor = 0
+        count = ScanCount()
+        while True:
+            cursor, batch = self.scan_page(cursor, match, type_filter, count, node)
+            keys.extend(batch)
+            if cursor == 0:
+                break
+        return keys
+
+    def scan_page(
+        self,
+        cursor: int,
+        match: str,
+        type_filter: str | None,
+        count: ScanCount,
+        node: ClusterNode | None = None,
+    ) -> tuple[int, list[str]]:
+        """
+        Runs one SCAN call from cursor and adapts count to how long it took.
+        Returns the next cursor, 0 once the node has been walked, and the page of keys.
+        """
+        start = time.monotonic()
+        if node is None:
+            cursor, batch = self.client.scan(  # type: ignore
+                cursor, match=match, count=count.value, _type=type_filter
+            )
+        else:
+            cursors, batch = self.client.scan(  # type: ignore
+                cursor,
+                match=match,
+                count=count.value,
+                _type=type_filter,
+                target_nodes=node,
+            )
+            cursor = cursors[node.name]
+        count.update(time.monotonic() - start)
+        self.round_trips += 1
+        return cursor, cast(list[str], batch)
+
+    def get_scan_nodes(self) -> list[ClusterNode]:
+        """
+        Returns one node per cluster shard, its primary or a replica depending on CLUSTER_SCAN_NODES.
+        """
+        client = cast(RedisCluster, self.client)
+        shards = {}
+        for slot_nodes in client.nodes_manager.slots_cache.values():
+            shards[slot_nodes[0].name] = slot_nodes
+        use_replicas = self.config.config["cluster_scan_nodes"] == "replicas"
+        return [
+            nodes[1] if use_replicas and len(nodes) > 1 else nodes[0]
+            for nodes in shards.values()
+        ]
+
+    def get_key_types_by_type(self, types: list[str]) -> dict[str, str]:
+        """
+        Returns keys of the requested types using SCAN ... TYPE, so core types need no TYPE lookups.
+        Module types (e.g. ReJSON-RL) are not filtered the same way server-side, so they fall back
+        to a full scan with pipelined TYPE lookups over the keys no typed scan claimed.
+        """
+        try:
+            key_types = {}
+            for key_type in types:
+                if key_type in self.CORE_TYPES:
+                    for key in self.scan_included_keys(type_filter=key_type):
+                        key_types[key] = key_type
+            if any(key_type not in self.CORE_TYPES for key_type in types):
+                unclaimed = [
+                    key for key in self.scan_included_keys() if key not in key_types
+                ]
+                key_types.update(self.iter_types(unclaimed))
+            return dict(sorted(key_types.items(), key=lambda item: len(item[0])))
+        except Exception as e:
+            logger.error(f"Error retrieving keys by type {types}: {str(e)}")
+            raise e
+
     def get_types(self, keys: list[str]) -> dict[str, str]:
         """
         Returns a dictionary with the Redis type for each key in the provided list.
         """
+        key_types = dict(self.iter_types(keys))
+        logger.debug(f"Retrieved types for keys: {key_types}")
+        return key_types
+
+    def iter_types(
+        self, keys: list[str], batch_size: int | None = None
+    ) -> Iterator[tuple[str, str]]:
+        """
+        Yields (key, type) pairs, resolving TYPE for a whole batch of keys in one pipelined round trip.
+        """
+        batch_size = batch_size or self.config.config["type_batch_size"]
         try:
-            key_types = {key: self.client.type(key) for key in keys}  # type: ignore
-            logger.debug(f"Retrieved types for keys: {key_types}")
-            return key_types
+            for start in range(0, len(keys), batch_size):
+                batch = keys[start : start + batch_size]
+                types = self._pipeline_per_key(batch, lambda pipe, key: pipe.type(key))
+                yield from zip(batch, types)
         except Exception as e:
             logger.error(f"Error retrieving types for keys: {str(e)}")
             raise e
@@ -2,22 +2,31 @@ import signal
 import sys
 
 from redis_to_mongo.constants import PROD_CONFIG_ENV, TEST_CONFIG_ENV
+from redis_to_mongo.config_loader import SyncerConfig
+from redis_to_mongo.partition import Partition
 from redis_to_mongo.sync_engine import SyncEngine
+from redis_to_mongo.async_sync_engine import AsyncSyncEngine
 from redis_to_mongo.logger import logger
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2 or sys.argv[1] not in ["prod", "test"]:
-        print("Usage: run.py [prod|test]")
+
+def get_config_path(argv: list[str], script: str) -> str:
+    if len(argv) < 2 or argv[1] not in ["prod", "test"]:
+        print(f"Usage: {script} [prod|test]")
         sys.exit(1)
 
-    environment = sys.argv[1]
+    environment = argv[1]
     if environment == "prod":
-        CONFIG_PATH = PROD_CONFIG_ENV
-    else:
-        CONFIG_PATH = TEST_CONFIG_ENV
+        return PROD_CONFIG_ENV
+    return TEST_CONFIG_ENV
+
+
+def create_engine(config_path: str, partition: Partition | None = None) -> SyncEngine:
+    if SyncerConfig(config_path).config["sync_engine"] == "async":
+        return AsyncSyncEngine(config_path=config_path, partition=partition)
+    return SyncEngine(config_path=config_path, partition=partition)
 
-    se = SyncEngine(config_path=CONFIG_PATH)
 
+def run_engine(se: SyncEngine) -> None:
     def signal_handler(signum, frame):
         logger.info("Graceful shutdown initiated.")
         # Perform any necessary cleanup here
@@ -31,3 +40,8 @@ if __name__ == "__main__":
         se.run()
     except (KeyboardInterrupt, SystemExit):
         signal_handler(None, None)
+
+
+if __name__ == "__main__":
+    CONFIG_PATH = get_config_path(sys.argv, "run.py")
+    run_engine(create_engine(CONFIG_PATH))
@@ -0,0 +1,103 @@
+import threading
+import time
+from typing import Any
+
+from redis_to_mongo.logger import logger
+from redis_to_mongo.syncers.sync_stream import SyncStreams
+
+
+class StreamTailer:
+    """
+    Tails the streams tracked by a SyncStreams syncer with blocking XREAD in its own thread
+    and flushes messages to Mongo in micro-batches, by size or by time, whichever comes first.
+    The SyncEngine keeps reconciling the stream structure on its own, slower cadence.
+    """
+
+    ERROR_BACKOFF_SEC = 1
+
+    def __init__(
+        self,
+        syncer: SyncStreams,
+        block_ms: int,
+        flush_size: int,
+        flush_interval_ms: int,
+    ):
+        self.syncer = syncer
+        self.block_ms = block_ms
+        self.flush_size = flush_size
+        self.flush_interval_sec = flush_interval_ms / 1000
+        self.buffer: dict[str, list[tuple[str, dict[str, str]]]] = {}
+        self.buffer_stream_ids: dict[str, Any] = {}
+        self.buffered = 0
+        self.last_flush = time.time()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.syncer.tailed = True
+        self.stopped.clear()
+        self.thread = threading.Thread(
+            target=self.run, name="stream-tailer", daemon=True
+        )
+        self.thread.start()
+        logger.info(
+            f"Stream tailer started, block={self.block_ms}ms flush_size={self.flush_size}"
+        )
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.flush()
+        self.syncer.tailed = False
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                self.tail_once()
+                if (
+                    self.buffered >= self.flush_size
+                    or time.time() - self.last_flush >= self.flush_interval_sec
+                ):
+                    self.flush()
+            except Exception as e:
+                logger.error(f"Stream tailer error: {str(e)}")
+                self.stopped.wait(self.ERROR_BACKOFF_SEC)
+
+    def tail_once(self):
+        read_ids, stream_ids = self.syncer.read_ids_snapshot()
+        if not read_ids:
+            self.stopped.wait(self.block_ms / 1000)
+            return
+        # do not block past the flush deadline when messages are waiting
+        block_ms = self.block_ms
+        if self.buffered:
+            remaining = self.flush_interval_sec - (time.time() - self.last_flush)
+            block_ms = max(1, min(block_ms, int(remaining * 1000)))
+        all_messages = self.syncer.redis_handler.read_messages(read_ids, block=block_ms)
+        with self.syncer.lock:
+            self.syncer.last_read_ids.update(read_ids)
+        for stream, messages in all_messages.items():
+            self.buffer.setdefault(stream, []).extend(messages)
+            self.buffer_stream_ids[stream] = stream_ids[stream]
+            self.buffered += len(messages)
+
+    def flush(self):
+        """
+        Writes buffered messages and their read ids. Messages that failed to write, or the whole buffer
+        if the flush fails, are kept for the next flush.
+        """
+        self.last_flush = time.time()
+        if not self.buffered:
+            return
+        updates, failed = self.syncer.write_messages(
+            self.buffer, self.buffer_stream_ids
+        )
+        self.syncer.bulk_update(updates, False)
+        logger.debug(f"Stream tailer flushed {self.buffered} messages")
+        self.buffer = failed
+        self.buffer_stream_ids = {
+            stream: self.buffer_stream_ids[stream] for stream in failed
+        }
+        self.buffered = sum(len(messages) for messages in failed.values())
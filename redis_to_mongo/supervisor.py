@@ -0,0 +1,89 @@
+import multiprocessing
+import signal
+import sys
+import time
+
+from redis_to_mongo.config_loader import SyncerConfig
+from redis_to_mongo.partition import Partition
+from redis_to_mongo.run import create_engine, get_config_path, run_engine
+from redis_to_mongo.logger import logger
+
+
+def run_worker(config_path: str, index: int, count: int) -> None:
+    run_engine(create_engine(config_path, Partition(index, count)))
+
+
+class Supervisor:
+    """
+    Runs PARTITION_COUNT SyncEngine worker processes, each syncing its own hash slot partition
+    of the keyspace, and restarts the ones that die.
+    """
+
+    CHECK_INTERVAL_SEC = 1
+    RESTART_BACKOFF_SEC = 5
+
+    def __init__(self, config_path: str):
+        self.config_path = config_path
+        self.count = SyncerConfig(config_path).config["partition_count"]
+        self.workers: dict[int, multiprocessing.Process] = {}
+        self.restart_after: dict[int, float] = {}
+        self.stopping = False
+
+    def start_worker(self, index: int):
+        worker = multiprocessing.Process(
+            target=run_worker,
+            args=(self.config_path, index, self.count),
+            name=f"sync-worker-{index}",
+        )
+        worker.start()
+        self.workers[index] = worker
+        logger.info(f"Started worker {index}/{self.count} with pid {worker.pid}")
+
+    def check_workers(self):
+        for index, worker in self.workers.items():
+            if worker.is_alive():
+                continue
+            if index not in self.restart_after:
+                logger.error(
+                    f"Worker {index} (pid {worker.pid}) died with exit code {worker.exitcode}, restarting in {self.RESTART_BACKOFF_SEC}s."
+                )
+                self.restart_after[index] = time.time() + self.RESTART_BACKOFF_SEC
+            elif time.time() >= self.restart_after[index]:
+                del self.restart_after[index]
+                self.start_worker(index)
+
+    def run(self):
+        for index in range(self.count):
+            self.start_worker(index)
+        while not self.stopping:
+            self.check_workers()
+            time.sleep(self.CHECK_INTERVAL_SEC)
+
+    def stop(self):
+        """
+        Sends SIGTERM to the workers so they shut down gracefully and waits for them.
+        """
+        self.stopping = True
+        for worker in self.workers.values():
+            if worker.is_alive():
+                worker.terminate()
+        for worker in self.workers.values():
+            worker.join()
+
+
+if __name__ == "__main__":
+    CONFIG_PATH = get_config_path(sys.argv, "supervisor.py")
+    supervisor = Supervisor(CONFIG_PATH)
+
+    def signal_handler(signum, frame):
+        logger.info("Stopping sync workers.")
+        supervisor.stop()
+        logger.info("All sync workers have been stopped.")
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    try:
+        supervisor.run()
+    except KeyboardInterrupt:
+        signal_handler(None, None)
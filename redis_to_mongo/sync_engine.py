@@ -1,6 +1,9 @@
 from datetime import datetime, timedelta
+import threading
 import time
 from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import cast
 
 from redis_to_mongo.config_loader import RedisConfig, SyncerConfig
 from redis_to_mongo.redis_to_mongo_mongo_modules.config_loader import MongoConfig
@@ -8,6 +11,10 @@ from redis_to_mongo.redis_to_mongo_mongo_modules.mongo_api import MongoHandler
 from redis_to_mongo.logger import logger
 from redis_to_mongo.syncers import *
 from redis_to_mongo.redis_api import RedisHandler
+from redis_to_mongo.keyspace_listener import KeyspaceListener
+from redis_to_mongo.key_scanner import KeyScanner
+from redis_to_mongo.stream_tailer import StreamTailer
+from redis_to_mongo.partition import Partition
 
 
 class SyncEngine:
@@ -16,51 +23,315 @@ class SyncEngine:
     It uses the RedisHandler to interact with Redis and the Mongo API to interact with MongoDB.
     """
 
-    def __init__(self, config_path: str):
+    SYNCER_CLASSES: list[type[SyncTypeInterface]] = [
+        SyncHashes,
+        SyncJSONs,
+        SyncLists,
+        SyncSets,
+        SyncStreams,
+        SyncStrings,
+        SyncZSets,
+    ]
+    # config name of the syncer types whose TYPE isn't one, e.g. JSON_SYNC_INTERVAL_SEC
+    INTERVAL_NAMES = {"ReJSON-RL": "json"}
+
+    def __init__(self, config_path: str, partition: Partition | None = None):
         self.config = SyncerConfig(config_path)
-        self.redis_handler = RedisHandler(RedisConfig(config_path))
+        self.partition = partition or Partition(
+            self.config.config["partition_index"], self.config.config["partition_count"]
+        )
+        self.redis_config = RedisConfig(config_path)
+        self.redis_handler = RedisHandler(self.redis_config)
         self.mongo_handler = MongoHandler(MongoConfig(config_path))
         self.changes_processed = {"unk": 0}
+        self.changes_lock = threading.Lock()
+        # set when keys reported by notifications may not have been synced by every syncer
+        self.force_full_sync = False
+        self.executor = None
+        self.futures: dict[str, Future] = {}
+        if self.config.config["sync_engine"] == "threads":
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.config.config["sync_concurrency"],
+                thread_name_prefix="syncer",
+            )
+        self.keyspace_listener = None
+        if self.config.config["sync_mode"] == "notify":
+            # subscribe before the initial scan so changes made during it are not missed
+            self.keyspace_listener = KeyspaceListener(self.redis_handler)
+            self.keyspace_listener.start()
+        self.last_full_sync = time.time()
+        # keys notified since each syncer's last round, and syncers owed a full sync
+        self.dirty_keys: dict[str, set[str]] = defaultdict(set)
+        self.full_sync_pending: set[str] = set()
+        self.key_scanner = None
+        if self.config.config["key_scan_budget_ms"] > 0:
+            self.key_scanner = KeyScanner(
+                self.redis_handler, self.partition, self.get_scan_types()
+            )
         self.init_syncers()
+        # when each syncer is next due, all of them are due right away
+        self.deadlines = {syncer.TYPE: 0.0 for syncer in self.syncers}
+        self.stream_tailer = None
+        if self.config.config["stream_mode"] == "tail":
+            self.start_stream_tailer()
 
     def shutdown(self):
         """
         Disconnects the Mongo and Redis handlers.
         """
+        if self.keyspace_listener is not None:
+            self.keyspace_listener.stop()
+        if self.stream_tailer is not None:
+            self.stream_tailer.stop()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
         self.mongo_handler.client.close()
-        self.redis_handler.client.close()
+        for redis_handler in self.get_redis_handlers():
+            redis_handler.client.close()
+
+    def get_syncer_classes(self) -> list[type[SyncTypeInterface]]:
+        if self.config.config["stream_mode"] != "group":
+            return self.SYNCER_CLASSES
+        return [
+            SyncStreamsGroup if syncer is SyncStreams else syncer
+            for syncer in self.SYNCER_CLASSES
+        ]
+
+    def get_key_types(self, types: list[str] | None = None) -> dict[str, str]:
+        """
+        Returns the current key types, either from a full scan or from per-type filtered scans
+        of the given types (all by default). The key scanner always covers every type.
+        """
+        if self.key_scanner is not None:
+            return self.scan_key_types()
+        if self.config.config["key_scan_mode"] == "typed":
+            types = types or self.get_scan_types()
+            key_types = self.redis_handler.get_key_types_by_type(types)  # type: ignore
+        else:
+            key_types = self.redis_handler.get_all_key_types()
+        return self.partition.filter_key_types(key_types)
+
+    def get_scan_types(self) -> list[str] | None:
+        if self.config.config["key_scan_mode"] != "typed":
+            return None
+        return [syncer.TYPE for syncer in self.SYNCER_CLASSES]  # type: ignore
+
+    def scan_key_types(self) -> dict[str, str]:
+        """
+        Continues the key scanner's cycle for KEY_SCAN_BUDGET_MS and returns the keys of its last
+        completed cycle updated with the ones found since. Syncers only see a key disappear once
+        a completed cycle missed it, so a cycle spread over rounds deactivates nothing early.
+        The first scan runs a whole cycle, there is no completed one to stand in for it yet.
+        """
+        scanner = cast(KeyScanner, self.key_scanner)
+        budget_sec = None
+        if scanner.completed is not None:
+            budget_sec = self.config.config["key_scan_budget_ms"] / 1000
+        if scanner.scan(budget_sec):
+            logger.info(
+                f"Key scan cycle {scanner.cycles} completed with {len(scanner.completed or {})} keys"
+            )
+        return scanner.key_types()
 
     def init_syncers(self):
-        key_types = self.redis_handler.get_all_key_types()
+        key_types = self.get_key_types()
         self.syncers: list[SyncTypeInterface] = []
-        syncer_classes = [
-            SyncJSONs,
-            SyncLists,
-            SyncSets,
-            SyncStreams,
-            SyncStrings,
-            SyncZSets,
-        ]
-        for syncer in syncer_classes:
-            s = syncer(self.redis_handler)
+        for syncer in self.get_syncer_classes():
+            s = syncer(self.get_syncer_redis_handler())
+            s.partition = self.partition
+            s.key_filter = self.redis_handler.key_filter
             s.init(key_types)
             self.syncers.append(s)
             self.changes_processed[s.TYPE] = 0
 
+    def get_syncer_redis_handler(self) -> RedisHandler:
+        """
+        Syncers running concurrently get their own Redis client, sequential ones share the engine's.
+        """
+        if self.config.config["sync_engine"] == "sync":
+            return self.redis_handler
+        return RedisHandler(self.redis_config)
+
+    def get_redis_handlers(self) -> list[RedisHandler]:
+        handlers = [self.redis_handler]
+        handlers += [syncer.redis_handler for syncer in getattr(self, "syncers", [])]
+        return list(dict.fromkeys(handlers))
+
+    def start_stream_tailer(self):
+        stream_syncer = next(s for s in self.syncers if isinstance(s, SyncStreams))
+        self.stream_tailer = StreamTailer(
+            stream_syncer,
+            block_ms=self.config.config["stream_block_ms"],
+            flush_size=self.config.config["stream_flush_size"],
+            flush_interval_ms=self.config.config["stream_flush_interval_ms"],
+        )
+        self.stream_tailer.start()
+
+    def get_sync_interval(self, syncer: SyncTypeInterface) -> float:
+        name = self.INTERVAL_NAMES.get(syncer.TYPE, syncer.TYPE)  # type: ignore
+        interval = self.config.config.get(f"{name}_sync_interval_sec")
+        if interval is None:
+            return self.config.config["sync_interval_sec"]
+        return interval
+
+    def next_deadline(self) -> float:
+        return min(self.deadlines.values())
+
+    def start_round(
+        self,
+    ) -> tuple[list[SyncTypeInterface], dict[str, str], bool]:
+        """
+        Picks the syncers whose deadline has passed, moves their deadline one interval on and
+        prepares a single key scan shared by all of them.
+        """
+        now = time.time()
+        syncers = [s for s in self.syncers if self.deadlines[s.TYPE] <= now]
+        for syncer in syncers:
+            self.deadlines[syncer.TYPE] = now + self.get_sync_interval(syncer)
+        if not syncers:
+            return [], {}, False
+        key_types, incremental = self.prepare_round(syncers)
+        return syncers, key_types, incremental
+
     def sync(self):
-        key_types = self.redis_handler.get_all_key_types()
+        syncers, key_types, incremental = self.start_round()
+        if self.executor is not None:
+            self.sync_in_pool(syncers, key_types, incremental)
+            return
+        for syncer in syncers:
+            self.sync_syncer(syncer, key_types, incremental)
+
+    def sync_in_pool(
+        self,
+        syncers: list[SyncTypeInterface],
+        key_types: dict[str, str],
+        incremental: bool,
+    ):
+        """
+        Runs the syncers on the worker pool and waits for them until the next deadline.
+        A syncer still busy with an earlier round is skipped instead of queued again.
+        """
+        futures = []
+        for syncer in syncers:
+            previous = self.futures.get(syncer.TYPE)  # type: ignore
+            if previous is not None and not previous.done():
+                logger.warning(
+                    f"Syncer {syncer.TYPE} is still running its previous round, skipping it."
+                )
+                if incremental:
+                    self.force_full_sync = True
+                continue
+            future = self.executor.submit(  # type: ignore
+                self.sync_syncer_isolated, syncer, key_types, incremental
+            )
+            self.futures[syncer.TYPE] = future  # type: ignore
+            futures.append(future)
+        _, not_done = wait(futures, timeout=max(0, self.next_deadline() - time.time()))
+        if not_done:
+            logger.warning(
+                f"{len(not_done)} syncers did not finish within the round, not waiting for them."
+            )
+
+    def prepare_round(
+        self, syncers: list[SyncTypeInterface] | None = None
+    ) -> tuple[dict[str, str], bool]:
+        """
+        Returns the key types the given syncers (all by default) sync this round and whether they
+        are only the keys changed since their last round. Notified keys are kept per syncer until
+        it is due, a full sync owed to any of them makes the round full for all of them.
+        """
+        syncers = self.syncers if syncers is None else syncers
+        types = {syncer.TYPE for syncer in syncers}
+        if self.keyspace_listener is not None:
+            dirty_keys, events_lost = self.keyspace_listener.drain()
+            for syncer in self.syncers:
+                self.dirty_keys[syncer.TYPE].update(dirty_keys)  # type: ignore
+            full_sync_due = (
+                time.time() - self.last_full_sync
+                >= self.config.config["full_sync_interval_sec"]
+            )
+            if events_lost or full_sync_due or self.force_full_sync:
+                self.full_sync_pending.update(s.TYPE for s in self.syncers)  # type: ignore
+                self.last_full_sync = time.time()
+                self.force_full_sync = False
+            if events_lost:
+                logger.warning("Keyspace events may have been lost, running full sync.")
+                self.keyspace_listener.stop()
+                self.keyspace_listener.start()
+            if not types & self.full_sync_pending:
+                round_keys = set().union(*(self.dirty_keys.pop(t) for t in types))
+                return self.get_dirty_key_types(round_keys), True
+        self.last_full_sync = time.time()
+        self.force_full_sync = False
+        self.full_sync_pending -= types
+        for key_type in types:
+            self.dirty_keys.pop(key_type, None)
+        key_types = self.get_key_types(sorted(types))  # type: ignore
+        if self.key_scanner is not None:
+            unconfirmed_keys = self.key_scanner.unconfirmed_keys()
+            for syncer in syncers:
+                syncer.unconfirmed_keys = unconfirmed_keys
         implemented_types = set(syncer.TYPE for syncer in self.syncers)
         for key in list(key_types.keys()):
             if key_types[key] not in implemented_types:
-                logger.warning(
-                    f"Key {key} has unsupported type {key_types[key]} and will be removed from synchronization. Allowed types: {implemented_types=}."
-                )
+                self.warn_unsupported(key, key_types[key], implemented_types)
                 del key_types[key]
-                self.changes_processed["unk"] += 1
-        for syncer in self.syncers:
+        return key_types, False
+
+    def sync_syncer(
+        self, syncer: SyncTypeInterface, key_types: dict[str, str], incremental: bool
+    ):
+        if incremental:
+            syncer.sync_keys(key_types)
+        else:
             syncer.sync(key_types)
+        self.record_changes(syncer)
+
+    def record_changes(self, syncer: SyncTypeInterface):
+        with self.changes_lock:
             self.changes_processed[syncer.TYPE] = syncer.changes_processed  # type: ignore
 
+    def sync_syncer_isolated(
+        self, syncer: SyncTypeInterface, key_types: dict[str, str], incremental: bool
+    ):
+        """
+        sync_syncer for concurrent rounds, a failing syncer is logged and retried next round
+        without affecting the others.
+        """
+        try:
+            self.sync_syncer(syncer, key_types, incremental)
+        except Exception as e:
+            logger.error(f"Syncer {syncer.TYPE} failed this round: {str(e)}")
+            if incremental:
+                self.force_full_sync = True
+
+    def get_dirty_key_types(self, dirty_keys: set[str]) -> dict[str, str]:
+        """
+        Incremental round: only keys reported by keyspace notifications are reconciled and compared.
+        Returns their current types, deleted and unsupported keys as "none".
+        """
+        owned_keys = [
+            key
+            for key in dirty_keys
+            if self.partition.owns(key) and self.redis_handler.key_filter.matches(key)
+        ]
+        key_types = dict(self.redis_handler.iter_types(owned_keys))
+        implemented_types = set(syncer.TYPE for syncer in self.syncers)
+        for key, key_type in key_types.items():
+            if key_type != "none" and key_type not in implemented_types:
+                self.warn_unsupported(key, key_type, implemented_types)
+                # treated like a deleted key, so a syncer still tracking it deactivates it
+                key_types[key] = "none"
+        logger.info(f"Syncing {len(key_types)} keys changed since the last round")
+        return key_types
+
+    def warn_unsupported(self, key: str, key_type: str, implemented_types: set[str]):
+        logger.warning(
+            f"Key {key} has unsupported type {key_type} and will be removed from synchronization. Allowed types: {implemented_types=}."
+        )
+        with self.changes_lock:
+            self.changes_processed["unk"] += 1
+
     def run(self) -> None:
         """
         Run the SyncEngine indefinitely, synchronizing data between Redis and MongoDB.
@@ -76,24 +347,33 @@ class SyncEngine:
             self.sync()
             # Add logic for processing sets and metadata streams if necessary
             round_elapsed_time = time.time() - round_start_time
-            logger.info(f"Round took: {round_elapsed_time:.5f} seconds")
-            elapsed_time = time.time() - start_time
-            uptime += elapsed_time
-            logger.info(
-                f"SyncEngine has been running for: {timedelta(seconds=int(uptime))}"
-            )
-            self.print_changes_processed_stats()
-            sleep_time = max(
-                0, self.config.config["sync_interval_sec"] - round_elapsed_time
-            )
-            logger.info(
-                f"Sleeping for: {sleep_time:.2f}/{self.config.config['sync_interval_sec']} seconds."
-            )
-            for _ in range(int(sleep_time)):
-                time.sleep(1)
-            time.sleep(sleep_time % 1)
+            uptime += time.time() - start_time
+            sleep_time = self.report_round(round_elapsed_time, uptime)
+            time.sleep(sleep_time)
             start_time = time.time()
 
+    def report_round(self, round_elapsed_time: float, uptime: float) -> float:
+        """
+        Logs the round's statistics and returns how long to sleep until the next syncer is due.
+        """
+        logger.info(f"Round took: {round_elapsed_time:.5f} seconds")
+        logger.info(f"Round made {self.take_round_trips()} Redis round trips")
+        logger.info(
+            f"SyncEngine has been running for: {timedelta(seconds=int(uptime))}"
+        )
+        self.print_changes_processed_stats()
+        sleep_time = max(0, self.next_deadline() - time.time())
+        logger.info(
+            f"Sleeping for: {sleep_time:.2f} seconds until the next due syncer."
+        )
+        return sleep_time
+
+    def take_round_trips(self) -> int:
+        return sum(
+            redis_handler.take_round_trips()
+            for redis_handler in self.get_redis_handlers()
+        )
+
     def print_changes_processed_stats(self):
         """
         Print the statistics of changes processed in a formatted table.
@@ -1,7 +1,9 @@
 from redis_to_mongo.syncers.syncer_base import SyncTypeInterface
+from redis_to_mongo.syncers.sync_hash import SyncHashes
 from redis_to_mongo.syncers.sync_json import SyncJSONs
 from redis_to_mongo.syncers.sync_list import SyncLists
 from redis_to_mongo.syncers.sync_set import SyncSets
 from redis_to_mongo.syncers.sync_stream import SyncStreams
+from redis_to_mongo.syncers.sync_stream_group import SyncStreamsGroup
 from redis_to_mongo.syncers.sync_string import SyncStrings
 from redis_to_mongo.syncers.sync_zset import SyncZSets
@@ -0,0 +1,134 @@
+import json
+from typing import Any, Iterable, Iterator
+from bson import ObjectId
+from pymongo import ReturnDocument
+from redis_to_mongo.mongo_models import ValueChunkODM, ValueManifestODM
+from redis_to_mongo.syncers.shadow_cache import bson_size
+
+
+class ChunkStore:
+    """
+    Keeps values too big for their ODM document (BSON caps documents at 16 MB) as ordered
+    ValueChunkODM documents of about chunk_bytes each, listed by one ValueManifestODM per ODM.
+    A rewrite inserts chunks under a new generation and switches the manifest over before the
+    old chunks are removed, so readers always find a complete value.
+    """
+
+    READ_BATCH_SIZE = 1000
+
+    def offloaded(self, owners: list[Any]) -> set[Any]:
+        """
+        Returns which of the given ODM ids have their value in chunks.
+        """
+        manifests = ValueManifestODM._get_collection()
+        result = set()
+        for start in range(0, len(owners), self.READ_BATCH_SIZE):
+            batch = owners[start : start + self.READ_BATCH_SIZE]
+            result.update(
+                doc["owner"]
+                for doc in manifests.find({"owner": {"$in": batch}}, {"owner": 1})
+            )
+        return result
+
+    def write_value(self, owner: Any, value: Any, chunk_bytes: int) -> None:
+        """
+        Stores a list member by member, anything else as pieces of its JSON text.
+        """
+        if isinstance(value, list):
+            self.write_chunks(owner, [value], chunk_bytes)
+            return
+        text = json.dumps(value)
+        pieces = [
+            text[start : start + chunk_bytes]
+            for start in range(0, len(text), chunk_bytes)
+        ]
+        self.write_chunks(owner, [pieces], chunk_bytes, "json")
+
+    def write_chunks(
+        self,
+        owner: Any,
+        chunks: Iterable[list[Any]],
+        chunk_bytes: int,
+        encoding: str = "members",
+    ) -> None:
+        """
+        Stores the members yielded by chunks, regrouped into chunk documents of about chunk_bytes.
+        """
+        collection = ValueChunkODM._get_collection()
+        generation = ObjectId()
+        seq = size = pending_bytes = 0
+        pending: list[Any] = []
+
+        def flush():
+            nonlocal seq, pending, pending_bytes
+            collection.insert_one(
+                {
+                    "owner": owner,
+                    "generation": generation,
+                    "seq": seq,
+                    "values": pending,
+                }
+            )
+            seq += 1
+            pending, pending_bytes = [], 0
+
+        for chunk in chunks:
+            for item in chunk:
+                item_bytes = bson_size(item)
+                if pending and pending_bytes + item_bytes > chunk_bytes:
+                    flush()
+                pending.append(item)
+                pending_bytes += item_bytes
+                size += item_bytes
+        if pending:
+            flush()
+        previous = ValueManifestODM._get_collection().find_one_and_update(
+            {"owner": owner},
+            {
+                "$set": {
+                    "generation": generation,
+                    "encoding": encoding,
+                    "chunk_count": seq,
+                    "size": size,
+                }
+            },
+            upsert=True,
+            return_document=ReturnDocument.BEFORE,
+        )
+        if previous:
+            collection.delete_many(
+                {"owner": owner, "generation": previous["generation"]}
+            )
+
+    def iter_chunks(self, owner: Any) -> Iterator[list[Any]]:
+        """
+        Yields the stored chunks in order, fetching one chunk document at a time.
+        """
+        manifest = ValueManifestODM._get_collection().find_one({"owner": owner})
+        if not manifest:
+            return
+        cursor = (
+            ValueChunkODM._get_collection()
+            .find({"owner": owner, "generation": manifest["generation"]})
+            .sort("seq", 1)
+            .batch_size(1)
+        )
+        for doc in cursor:
+            yield doc["values"]
+
+    def read_value(self, owner: Any) -> Any:
+        manifest = ValueManifestODM._get_collection().find_one(
+            {"owner": owner}, {"encoding": 1}
+        )
+        if not manifest:
+            return None
+        members = [item for chunk in self.iter_chunks(owner) for item in chunk]
+        if manifest["encoding"] == "json":
+            return json.loads("".join(members))
+        return members
+
+    def delete(self, owners: list[Any]) -> None:
+        if not owners:
+            return
+        ValueManifestODM._get_collection().delete_many({"owner": {"$in": owners}})
+        ValueChunkODM._get_collection().delete_many({"owner": {"$in": owners}})
@@ -0,0 +1,61 @@
+import heapq
+
+
+class KeyScheduler:
+    """
+    Decides which keys a syncer compares each round. A key found changed is due again the next
+    round, each check finding it unchanged doubles its interval up to max_interval rounds.
+    Due rounds sit in a heap, so a round only touches the keys that are due. Heap entries are
+    dropped lazily: an entry whose round no longer matches the key's due round is skipped.
+    """
+
+    def __init__(self, max_interval: int):
+        self.max_interval = max_interval
+        self.round = 0
+        self.intervals: dict[str, int] = {}
+        self.due: dict[str, int] = {}
+        self.heap: list[tuple[int, str]] = []
+
+    def schedule(self, key: str, due: int) -> None:
+        self.due[key] = due
+        heapq.heappush(self.heap, (due, key))
+
+    def add(self, keys: list[str]) -> None:
+        for key in keys:
+            if key not in self.due:
+                self.intervals[key] = 1
+                self.schedule(key, self.round + 1)
+
+    def remove(self, keys: list[str]) -> None:
+        for key in keys:
+            self.intervals.pop(key, None)
+            self.due.pop(key, None)
+
+    def pop_due(self) -> list[str]:
+        """
+        Starts the next round and returns its due keys. They are provisionally rescheduled at
+        their current interval, so a round that fails before record() loses none of them.
+        """
+        self.round += 1
+        keys = []
+        while self.heap and self.heap[0][0] <= self.round:
+            due, key = heapq.heappop(self.heap)
+            if self.due.get(key) != due:
+                continue
+            keys.append(key)
+            self.schedule(key, self.round + self.intervals[key])
+        return keys
+
+    def record(self, key: str, changed: bool) -> None:
+        if key not in self.intervals:
+            return
+        if changed:
+            interval = 1
+        else:
+            interval = min(self.intervals[key] * 2, self.max_interval)
+        self.intervals[key] = interval
+        if self.due[key] != self.round + interval:
+            self.schedule(key, self.round + interval)
+
+    def __len__(self) -> int:
+        return len(self.due)
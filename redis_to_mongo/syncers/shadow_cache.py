@@ -0,0 +1,117 @@
+import hashlib
+import json
+from collections import deque
+from typing import Any
+import bson
+
+
+def bson_size(value: Any) -> int:
+    """
+    Returns the bytes the value takes as a BSON array element, not counting its index.
+    Compact JSON underestimates that several times for short members.
+    """
+    return (
+        len(bson.encode({"": value})) - 5
+    )  # the enclosing document's length and end byte
+
+
+class ShadowCache:
+    """
+    In-memory shadow of the last value synced per key, kept as a 16 byte digest.
+    Once max_entries digests are held, keys not yet cached are left out rather than
+    evicting others, so a syncer tracking more keys than the cap still hits for most of them.
+    """
+
+    DIGEST_SIZE = 16
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.digests: dict[str, bytes] = {}
+
+    @staticmethod
+    def encode(value: Any) -> bytes:
+        return json.dumps(
+            value, sort_keys=True, separators=(",", ":"), default=str
+        ).encode()
+
+    @classmethod
+    def digest(cls, value: Any) -> bytes:
+        return hashlib.blake2b(cls.encode(value), digest_size=cls.DIGEST_SIZE).digest()
+
+    @classmethod
+    def unordered_digest(cls, members: list[Any]) -> bytes:
+        stream_digest = StreamDigest(ordered=False)
+        stream_digest.update(members)
+        return stream_digest.digest()
+
+    def get(self, key: str) -> bytes | None:
+        return self.digests.get(key)
+
+    def put(self, key: str, digest: bytes) -> None:
+        if key in self.digests or len(self.digests) < self.max_entries:
+            self.digests[key] = digest
+
+    def pop(self, key: str) -> None:
+        self.digests.pop(key, None)
+
+    def clear(self) -> None:
+        self.digests.clear()
+
+    def __len__(self) -> int:
+        return len(self.digests)
+
+
+class StreamDigest:
+    """
+    Digest of a list fed in chunks, so it never has to be held whole. Ordered digests equal
+    ShadowCache.digest of the whole list, unordered ones are the same for any member order.
+    Every member fed is counted, only a dedupe digest keeps the member digests seen to count
+    repeated ones once, at the cost of memory growing with the value.
+    The last tail_size items fed are kept in tail, size is the BSON size of the items as an array.
+    """
+
+    def __init__(self, ordered: bool = True, tail_size: int = 0, dedupe: bool = False):
+        self.ordered = ordered
+        self.dedupe = dedupe and not ordered
+        self.tail: deque[Any] = deque(maxlen=tail_size)
+        self.hash = hashlib.blake2b(b"[", digest_size=ShadowCache.DIGEST_SIZE)
+        self.total = 0  # sum of the member digests when unordered
+        self.seen: set[bytes] | None = set() if self.dedupe else None
+        self.count = 0
+        self.size = 0
+
+    def update(self, items: list[Any]) -> list[Any]:
+        """
+        Feeds items and returns the ones counted, all of them unless dedupe skipped repeats.
+        """
+        counted = []
+        for item in items:
+            encoded = ShadowCache.encode(item)
+            if not self.ordered:
+                member_digest = hashlib.blake2b(
+                    encoded, digest_size=ShadowCache.DIGEST_SIZE
+                ).digest()
+                if self.seen is not None:
+                    if member_digest in self.seen:
+                        continue
+                    self.seen.add(member_digest)
+                self.total = (self.total + int.from_bytes(member_digest, "big")) % (
+                    1 << (8 * ShadowCache.DIGEST_SIZE)
+                )
+            elif self.count:
+                self.hash.update(b"," + encoded)
+            else:
+                self.hash.update(encoded)
+            self.size += bson_size(item) + len(str(self.count))
+            self.count += 1
+            counted.append(item)
+        if self.tail.maxlen:
+            self.tail.extend(counted[-self.tail.maxlen :])
+        return counted
+
+    def digest(self) -> bytes:
+        if not self.ordered:
+            return self.total.to_bytes(ShadowCache.DIGEST_SIZE, "big")
+        finished = self.hash.copy()
+        finished.update(b"]")
+        return finished.digest()
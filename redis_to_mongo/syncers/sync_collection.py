@@ -0,0 +1,265 @@
+import asyncio
+from abc import abstractmethod
+from typing import Any, AsyncIterator, Iterator
+from pymongo import UpdateOne
+from redis_to_mongo.syncers.shadow_cache import StreamDigest
+from redis_to_mongo.syncers.syncer_base import SyncTypeInterface
+
+
+class SyncCollectionType(SyncTypeInterface):
+    """
+    Base for the list, set and zset syncers. Keys with more than LARGE_COLLECTION_THRESHOLD members
+    are streamed in COLLECTION_CHUNK_SIZE chunks to compare their digest, so unchanged keys are never
+    loaded whole. Changed ones are streamed again and rewritten, held whole only when they are
+    written inline, which means they fit in a document.
+    """
+
+    ORDERED = True  # whether member order is part of the value
+
+    @abstractmethod
+    def iter_redis_chunks(self, key: str) -> Iterator[list[Any]]:
+        pass
+
+    def _sync(self) -> dict[str, dict[str, Any]]:
+        keys = self.select_keys()
+        large_keys = self.select_large_keys(keys)
+        updates = {}
+        for redis_values in self.redis_handler.iter_value_batches(
+            [key for key in keys if key not in large_keys], self.fetch_values
+        ):
+            updates.update(self.diff_values(redis_values))
+        for key, size in large_keys.items():
+            self.sync_large_key(key, size)
+        return updates
+
+    async def _sync_async(self) -> dict[str, dict[str, Any]]:
+        """
+        _sync on the async clients. Large keys are streamed one after another in a worker thread.
+        """
+        keys = await self.select_keys_async()
+        large_keys = await self.select_large_keys_async(keys)
+        updates = await self.diff_batches_async(
+            [key for key in keys if key not in large_keys]
+        )
+        for key, size in large_keys.items():
+            await asyncio.to_thread(self.sync_large_key, key, size)
+        return updates
+
+    def select_large_keys(self, keys: list[str]) -> dict[str, int]:
+        """
+        Returns the keys with more than LARGE_COLLECTION_THRESHOLD members and their size.
+        """
+        threshold = self.redis_handler.config.config["large_collection_threshold"]
+        if not threshold or not keys:
+            return {}
+        sizes = self.redis_handler.get_collection_sizes(keys, self.TYPE)  # type: ignore
+        return {key: size for key, size in zip(keys, sizes) if size > threshold}
+
+    async def select_large_keys_async(self, keys: list[str]) -> dict[str, int]:
+        threshold = self.redis_handler.config.config["large_collection_threshold"]
+        if not threshold or not keys:
+            return {}
+        redis_handler = self.get_async_clients().redis_handler
+        sizes = await redis_handler.get_collection_sizes(keys, self.TYPE)  # type: ignore
+        return {key: size for key, size in zip(keys, sizes) if size > threshold}
+
+    def sync_large_key(self, key: str, size: int) -> None:
+        odm_id = self.odm_ids[key]
+        current = self.stream_digest(self.iter_redis_chunks(key))
+        if self.repeats_members(current, size):
+            current = self.stream_digest(self.iter_redis_chunks(key), dedupe=True)
+        digest = current.digest()
+        previous_digest = self.shadow.get(key)
+        if previous_digest is None:
+            previous_digest = self.stream_digest(
+                self.iter_stored_chunks(odm_id)
+            ).digest()
+        if digest != previous_digest:
+            offload = self.should_offload(current.size)
+            # the digest of what actually got written, the key may have changed in between
+            written = self.rewrite_in_chunks(
+                odm_id, self.iter_redis_chunks(key), offload, current.dedupe
+            )
+            if self.repeats_members(written, size):
+                written = self.rewrite_in_chunks(
+                    odm_id, self.iter_redis_chunks(key), offload, True
+                )
+            digest = written.digest()
+            self.changes_processed += 1
+        self.pending_digests[key] = digest
+
+    def repeats_members(self, stream_digest: StreamDigest, size: int) -> bool:
+        """
+        Whether an unordered scan returned more members than the key holds. SSCAN and ZSCAN can
+        return a member twice while the key is rehashed, only then is it scanned again with a
+        dedupe digest, which holds a digest per member.
+        """
+        return (
+            not self.ORDERED and not stream_digest.dedupe and stream_digest.count > size
+        )
+
+    def new_stream_digest(self, dedupe: bool = False) -> StreamDigest:
+        return StreamDigest(self.ORDERED, dedupe=dedupe)
+
+    def stream_digest(
+        self, chunks: Iterator[list[Any]], dedupe: bool = False
+    ) -> StreamDigest:
+        stream_digest = self.new_stream_digest(dedupe)
+        for chunk in chunks:
+            stream_digest.update(chunk)
+        return stream_digest
+
+    def iter_stored_chunks(self, odm_id: Any, start: int = 0) -> Iterator[list[Any]]:
+        """
+        Yields the stored values of the ODM from start on in chunks using $slice projections,
+        or all of them from the chunk store if offloaded.
+        """
+        if odm_id in self.offloaded:
+            yield from self.chunk_store.iter_chunks(odm_id)
+            return
+        collection = self.get_odm_class()._get_collection()
+        chunk_size = self.redis_handler.config.config["collection_chunk_size"]
+        while True:
+            doc = collection.find_one(
+                {"_id": odm_id}, {self.VALUE_FIELD: {"$slice": [start, chunk_size]}}
+            )
+            chunk = (doc or {}).get(self.VALUE_FIELD, [])
+            if chunk:
+                yield chunk
+            if len(chunk) < chunk_size:
+                return
+            start += chunk_size
+
+    async def iter_stored_chunks_async(
+        self, odm_id: Any, start: int = 0
+    ) -> AsyncIterator[list[Any]]:
+        """
+        iter_stored_chunks through the async Mongo client, for values stored inline.
+        """
+        collection = self.get_async_clients().collection(self.get_odm_class())
+        chunk_size = self.redis_handler.config.config["collection_chunk_size"]
+        while True:
+            doc = await collection.find_one(
+                {"_id": odm_id}, {self.VALUE_FIELD: {"$slice": [start, chunk_size]}}
+            )
+            chunk = (doc or {}).get(self.VALUE_FIELD, [])
+            if chunk:
+                yield chunk
+            if len(chunk) < chunk_size:
+                return
+            start += chunk_size
+
+    def rewrite_in_chunks(
+        self,
+        odm_id: Any,
+        chunks: Iterator[list[Any]],
+        offload: bool = False,
+        dedupe: bool = False,
+    ) -> StreamDigest:
+        """
+        Writes the value yielded by chunks to the chunk store if offload, which switches over to
+        the new chunks once all are written. Otherwise the chunks are gathered into one $set, an
+        inline value has to fit its document anyway. Readers never see a partly written value.
+        Repeated members are dropped if dedupe, always when written inline as those are held whole.
+        Returns the digest of what was written.
+        """
+        stream_digest = self.new_stream_digest(dedupe or not offload)
+
+        def digested(chunks: Iterator[list[Any]]) -> Iterator[list[Any]]:
+            for chunk in chunks:
+                yield stream_digest.update(chunk)
+
+        if offload:
+            self.chunk_store.write_chunks(
+                odm_id,
+                digested(chunks),
+                self.redis_handler.config.config["offload_chunk_bytes"],
+            )
+            self.offloaded.add(odm_id)
+            values = []
+        else:
+            values = [member for chunk in digested(chunks) for member in chunk]
+        self.bulk_write_ops(
+            [UpdateOne({"_id": odm_id}, {"$set": {self.VALUE_FIELD: values}})], True
+        )
+        if not offload and odm_id in self.offloaded:
+            self.drop_chunks([odm_id])
+        return stream_digest
+
+
+class SyncMembersType(SyncCollectionType):
+    """
+    Base for the set and zset syncers. A changed key is written as member-level updates, a $pull of
+    the removed (or rescored) members followed by an insert of the added ones, unless that would
+    touch as many members as rewriting values. Changes are counted in members, chunked rewrites
+    of large keys count as one.
+    """
+
+    PARTIAL_UPDATES = True
+
+    def __init__(self, redis_handler):
+        super().__init__(redis_handler)
+        self.members_changed = 0  # by the current round
+
+    @staticmethod
+    @abstractmethod
+    def member_id(member: Any) -> Any:
+        """
+        Returns what identifies the member within the collection, e.g. the zset member without its score.
+        """
+        pass
+
+    @abstractmethod
+    def pull_update(self, member_ids: list[Any]) -> dict[str, Any]:
+        pass
+
+    @abstractmethod
+    def add_update(self, members: list[Any]) -> dict[str, Any]:
+        pass
+
+    def partial_update(
+        self, previous: list[Any], current: list[Any]
+    ) -> list[dict[str, Any]] | dict[str, Any]:
+        """
+        Returns the update steps turning previous into current, or a plain $set of current when
+        that is at least as small.
+        """
+        previous_members = {self.member_id(member): member for member in previous}
+        current_members = {self.member_id(member): member for member in current}
+        removed = [
+            member_id
+            for member_id in previous_members
+            if member_id not in current_members
+        ]
+        added = [
+            member
+            for member_id, member in current_members.items()
+            if previous_members.get(member_id) != member
+        ]
+        if not removed and not added:
+            return []
+        self.members_changed += len(removed) + len(added)
+        if len(removed) + len(added) >= len(current):
+            return {self.VALUE_FIELD: current}
+        pulled = removed + [
+            self.member_id(member)
+            for member in added
+            if self.member_id(member) in previous_members
+        ]
+        updates = []
+        if pulled:
+            updates.append(self.pull_update(pulled))
+        if added:
+            updates.append(self.add_update(added))
+        return updates
+
+    def _sync(self) -> dict[str, dict[str, Any]]:
+        self.members_changed = 0
+        return super()._sync()
+
+    async def _sync_async(self) -> dict[str, dict[str, Any]]:
+        self.members_changed = 0
+        return await super()._sync_async()
+
+    def count_changes(self, updates: dict[Any, Any]) -> int:
+        return self.members_changed
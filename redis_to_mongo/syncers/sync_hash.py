@@ -0,0 +1,43 @@
+from typing import Any
+from redis_to_mongo.mongo_models import HashODM
+from redis_to_mongo.syncers.syncer_base import SyncTypeInterface
+
+
+class SyncHashes(SyncTypeInterface):
+    TYPE = "hash"
+    ODM_CLASS = HashODM
+    VALUE_FIELD = "values"
+    VALUE_GETTER = "get_hashes"
+    PARTIAL_UPDATES = True
+
+    def partial_update(
+        self, previous: dict[str, str], current: dict[str, str]
+    ) -> dict[str, Any]:
+        """
+        Returns $set/$unset of the changed values.<field> paths, or a full set of values when
+        some field name can't be used in a path or the field updates would outgrow the hash.
+        """
+        set_fields = {
+            field: value
+            for field, value in current.items()
+            if previous.get(field) != value
+        }
+        unset_fields = [field for field in previous if field not in current]
+        if not set_fields and not unset_fields:
+            return {}
+        changed_fields = list(set_fields) + unset_fields
+        if len(changed_fields) >= len(current) or not all(
+            self.is_field_path_safe(field) for field in changed_fields
+        ):
+            return {self.VALUE_FIELD: current}
+        update = {}
+        if set_fields:
+            update["$set"] = {
+                f"{self.VALUE_FIELD}.{field}": value
+                for field, value in set_fields.items()
+            }
+        if unset_fields:
+            update["$unset"] = {
+                f"{self.VALUE_FIELD}.{field}": "" for field in unset_fields
+            }
+        return update
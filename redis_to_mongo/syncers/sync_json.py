@@ -1,17 +1,89 @@
+from collections import Counter
 from typing import Any
 from redis_to_mongo.redis_to_mongo_mongo_modules.mongo_models import JSONODM
+from redis_to_mongo.syncers.shadow_cache import ShadowCache
 from redis_to_mongo.syncers.syncer_base import SyncTypeInterface
 
 
 class SyncJSONs(SyncTypeInterface):
     TYPE = "ReJSON-RL"
     ODM_CLASS = JSONODM
+    VALUE_FIELD = "value"
+    VALUE_GETTER = "get_jsons"
+    OFFLOAD = True
+    PARTIAL_UPDATES = True
 
-    def _sync(self) -> dict[str, dict[str, Any]]:
-        updates = {}
-        for key, odm_id in self.odm_ids.items():
-            redis_json = self.redis_handler.get_json(key)
-            odm = self.get_odm_class().objects(id=odm_id).first()
-            if redis_json != odm.value:
-                updates[odm_id] = {"value": redis_json}
-        return updates
+    def partial_update(self, previous: Any, current: Any) -> dict[str, Any]:
+        """
+        Returns $set/$unset of the changed value.* paths, or a full replace of value when the
+        root itself changed, an array got reordered or the paths would outweigh the document.
+        """
+        set_paths: dict[str, Any] = {}
+        unset_paths: list[str] = []
+        if not self.path_diff(
+            previous, current, self.VALUE_FIELD, set_paths, unset_paths
+        ):
+            return {self.VALUE_FIELD: current}
+        if self.VALUE_FIELD in set_paths:
+            return {self.VALUE_FIELD: current}
+        if len(ShadowCache.encode(set_paths)) + sum(
+            len(path) for path in unset_paths
+        ) >= len(ShadowCache.encode(current)):
+            return {self.VALUE_FIELD: current}
+        update: dict[str, Any] = {}
+        if set_paths:
+            update["$set"] = set_paths
+        if unset_paths:
+            update["$unset"] = {path: "" for path in unset_paths}
+        return update
+
+    def path_diff(
+        self,
+        previous: Any,
+        current: Any,
+        path: str,
+        set_paths: dict[str, Any],
+        unset_paths: list[str],
+    ) -> bool:
+        """
+        Collects the paths under path that differ between previous and current, returns False
+        if an array was reordered and the whole document should be replaced.
+        """
+        if isinstance(previous, dict) and isinstance(current, dict):
+            if not all(
+                self.is_field_path_safe(field) for field in [*previous, *current]
+            ):
+                set_paths[path] = current
+                return True
+            for field, value in current.items():
+                if field not in previous:
+                    set_paths[f"{path}.{field}"] = value
+                elif not self.path_diff(
+                    previous[field], value, f"{path}.{field}", set_paths, unset_paths
+                ):
+                    return False
+            unset_paths.extend(
+                f"{path}.{field}" for field in previous if field not in current
+            )
+            return True
+        if isinstance(previous, list) and isinstance(current, list):
+            if previous == current:
+                return True
+            if self.is_reordered(previous, current):
+                return False
+            if len(previous) != len(current):
+                set_paths[path] = current
+                return True
+            return all(
+                self.path_diff(before, after, f"{path}.{index}", set_paths, unset_paths)
+                for index, (before, after) in enumerate(zip(previous, current))
+            )
+        if type(previous) is not type(current) or previous != current:
+            set_paths[path] = current
+        return True
+
+    @staticmethod
+    def is_reordered(previous: list[Any], current: list[Any]) -> bool:
+        return len(previous) == len(current) and Counter(
+            map(ShadowCache.encode, previous)
+        ) == Counter(map(ShadowCache.encode, current))
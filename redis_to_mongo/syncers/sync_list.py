@@ -1,18 +1,277 @@
-from typing import Any
+import asyncio
+from typing import Any, Iterator, cast
+from pymongo import UpdateOne
 from redis_to_mongo.redis_to_mongo_mongo_modules.mongo_models import ListODM
-from redis_to_mongo.syncers.syncer_base import SyncTypeInterface
+from redis_to_mongo.syncers.shadow_cache import StreamDigest
+from redis_to_mongo.syncers.sync_collection import SyncCollectionType
 
+TAIL_CHECK_SIZE = 8  # last elements remembered per list to recognise head trims
+
+
+class ListDelta:
+    """
+    Fed the current list chunk by chunk, works out how it relates to the last synced version, known
+    by its digest, length and last elements. An append is exact: the first previous_length elements
+    must hash to previous_digest. A head trim (possibly followed by appends) is a candidate when the
+    previous last elements reappear earlier in the list, trim_digest is then the digest of the
+    elements up to there, to be checked against the end of the stored list.
+    """
+
+    def __init__(
+        self, previous_digest: bytes, previous_length: int, previous_tail: list[Any]
+    ):
+        self.previous_digest = previous_digest
+        self.previous_length = previous_length
+        self.previous_tail = previous_tail
+        self.current = StreamDigest(tail_size=TAIL_CHECK_SIZE)
+        self.prefix_digest: bytes | None = None  # of the first previous_length elements
+        self.trim_kept: int | None = None  # previous elements left after a head trim
+        self.trim_digest: bytes | None = None  # of the first trim_kept elements
+
+    def update(self, chunk: list[Any]) -> None:
+        for element in chunk:
+            if self.current.count == self.previous_length:
+                self.prefix_digest = self.current.digest()
+            self.current.update([element])
+            if (
+                self.current.count < self.previous_length
+                and element == self.previous_tail[-1]
+                and self.matches_previous_tail()
+            ):
+                self.trim_kept = self.current.count
+                self.trim_digest = self.current.digest()
+
+    def matches_previous_tail(self) -> bool:
+        seen = list(self.current.tail)
+        overlap = min(len(seen), len(self.previous_tail))
+        return seen[-overlap:] == self.previous_tail[-overlap:]
+
+    def kept(self) -> int | None:
+        """
+        Returns how many elements of the previous version still lead the list, everything after
+        them was appended, or None if the list changed some other way. A head trim is only a
+        candidate until trim_digest is found to match the end of the previous version.
+        """
+        if not self.previous_length:
+            return 0
+        if self.current.count == self.previous_length:
+            self.prefix_digest = self.current.digest()
+        if self.prefix_digest == self.previous_digest:
+            return self.previous_length
+        return self.trim_kept
+
+
+class SyncLists(SyncCollectionType):
+    """
+    Lists that only grew at the tail and/or were trimmed at the head (logs, capped queues) are
+    written as a $push of the new elements with a negative $slice dropping the trimmed ones,
+    other changes rewrite the whole list.
+    """
 
-class SyncLists(SyncTypeInterface):
     TYPE = "list"
     ODM_CLASS = ListODM
+    VALUE_FIELD = "values"
+    VALUE_GETTER = "get_lists"
+    OFFLOAD = True
+
+    def __init__(self, redis_handler):
+        super().__init__(redis_handler)
+        # keys: (length, last elements) of the last synced version
+        self.tails: dict[str, tuple[int, list[Any]]] = {}
+        self.pending_tails: dict[str, tuple[int, list[Any]]] = {}
+        # ODM ids: (key, delta, previous length) of head trims to verify against the stored list
+        self.trim_checks: dict[Any, tuple[str, ListDelta, int]] = {}
+
+    def iter_redis_chunks(
+        self, key: str, start: int = 0, stop: int | None = None
+    ) -> Iterator[list[Any]]:
+        return self.redis_handler.iter_list_chunks(key, start=start, stop=stop)
+
+    def new_stream_digest(self, dedupe: bool = False) -> StreamDigest:
+        return StreamDigest(tail_size=TAIL_CHECK_SIZE)
+
+    def tail_of(self, value: list[Any]) -> tuple[int, list[Any]]:
+        return len(value), value[-TAIL_CHECK_SIZE:]
+
+    def diff_values(self, redis_values: dict[str, Any]) -> dict[Any, dict[str, Any]]:
+        updates = super().diff_values(redis_values)
+        trim_checks = self.take_trim_checks()
+        verified = {
+            odm_id: self.stored_suffix_matches(odm_id, delta, previous_length)
+            for odm_id, (_, delta, previous_length) in trim_checks.items()
+        }
+        return self.settle_trims(updates, redis_values, trim_checks, verified)
 
-    def _sync(self) -> dict[str, dict[str, Any]]:
-        updates = {}
-        for key, odm_id in self.odm_ids.items():
-            redis_list = self.redis_handler.get_list(key)
-            # guaranteed to be there
-            odm = self.get_odm_class().objects(id=odm_id).first()
-            if redis_list != odm.values:
-                updates[odm_id] = {"values": redis_list}
+    async def diff_values_async(
+        self, redis_values: dict[str, Any]
+    ) -> dict[Any, dict[str, Any]]:
+        updates = await super().diff_values_async(redis_values)
+        # nothing else ran on the loop since value_updates, so the checks are this batch's
+        trim_checks = self.take_trim_checks()
+        matches = await asyncio.gather(
+            *(
+                self.stored_suffix_matches_async(odm_id, delta, previous_length)
+                for odm_id, (_, delta, previous_length) in trim_checks.items()
+            )
+        )
+        verified = dict(zip(trim_checks, matches))
+        return self.settle_trims(updates, redis_values, trim_checks, verified)
+
+    def take_trim_checks(self) -> dict[Any, tuple[str, ListDelta, int]]:
+        trim_checks, self.trim_checks = self.trim_checks, {}
+        return trim_checks
+
+    def settle_trims(
+        self,
+        updates: dict[Any, Any],
+        redis_values: dict[str, Any],
+        trim_checks: dict[Any, tuple[str, ListDelta, int]],
+        verified: dict[Any, bool],
+    ) -> dict[Any, Any]:
+        """
+        Rewrites the lists whose head trim the stored list did not confirm.
+        """
+        for odm_id, (key, _, _) in trim_checks.items():
+            if not verified[odm_id]:
+                updates[odm_id] = super().value_update(key, redis_values[key], None)
+        return updates
+
+    def value_updates(
+        self,
+        redis_values: dict[str, Any],
+        digests: dict[str, bytes],
+        previous_values: dict[Any, Any],
+    ) -> dict[Any, Any]:
+        updates = super().value_updates(redis_values, digests, previous_values)
+        for key, value in redis_values.items():
+            self.pending_tails[key] = self.tail_of(value)
         return updates
+
+    def value_update(
+        self, key: str, value: list[Any], previous_value: list[Any] | None
+    ) -> dict[str, Any]:
+        odm_id = self.odm_ids[key]
+        if previous_value is not None:
+            previous_digest = self.value_digest(previous_value)
+            previous = self.tail_of(previous_value)
+        else:
+            previous_digest, previous = self.shadow.get(key), self.tails.get(key)
+        if (
+            previous_digest is None
+            or previous is None
+            or self.needs_full_write(odm_id, value)
+        ):
+            return super().value_update(key, value, previous_value)
+        delta = ListDelta(previous_digest, *previous)
+        delta.update(value)
+        kept = delta.kept()
+        if kept is not None and kept < previous[0]:
+            if previous_value is None:
+                # pushed once diff_values verified it, rewritten otherwise
+                self.trim_checks[odm_id] = (key, delta, previous[0])
+            elif previous_value[len(previous_value) - kept :] != value[:kept]:
+                kept = None
+        if kept is None:
+            return super().value_update(key, value, previous_value)
+        push: dict[str, Any] = {"$each": value[kept:]}
+        if kept < previous[0]:
+            push["$slice"] = -len(value)
+        return {"$push": {self.VALUE_FIELD: push}}
+
+    def stored_suffix_matches(
+        self, odm_id: Any, delta: ListDelta, previous_length: int
+    ) -> bool:
+        """
+        Whether the last trim_kept stored elements are the ones now leading the list, read from
+        Mongo in chunks, so a trim is never taken from the previous last elements alone.
+        """
+        kept = cast(int, delta.trim_kept)
+        stored = self.stream_digest(
+            self.iter_stored_chunks(odm_id, previous_length - kept)
+        )
+        return stored.count == kept and stored.digest() == delta.trim_digest
+
+    async def stored_suffix_matches_async(
+        self, odm_id: Any, delta: ListDelta, previous_length: int
+    ) -> bool:
+        kept = cast(int, delta.trim_kept)
+        stored = self.new_stream_digest()
+        async for chunk in self.iter_stored_chunks_async(
+            odm_id, previous_length - kept
+        ):
+            stored.update(chunk)
+        return stored.count == kept and stored.digest() == delta.trim_digest
+
+    def sync_large_key(self, key: str, size: int) -> None:
+        odm_id = self.odm_ids[key]
+        previous_digest, previous = self.shadow.get(key), self.tails.get(key)
+        if previous_digest is None or previous is None:
+            stored = self.stream_digest(self.iter_stored_chunks(odm_id))
+            previous_digest = stored.digest()
+            previous = (stored.count, list(stored.tail))
+        delta = ListDelta(previous_digest, *previous)
+        for chunk in self.iter_redis_chunks(key):
+            delta.update(chunk)
+        written = delta.current
+        if written.digest() != previous_digest:
+            kept = delta.kept()
+            offload = self.should_offload(written.size)
+            rewrite = kept is None or offload or odm_id in self.offloaded
+            if not rewrite and kept < previous[0]:
+                rewrite = not self.stored_suffix_matches(odm_id, delta, previous[0])
+            if rewrite:
+                # the digest of what actually got written, the key may have changed in between
+                written = self.rewrite_in_chunks(
+                    odm_id, self.iter_redis_chunks(key), offload
+                )
+            else:
+                self.append_in_chunks(odm_id, key, kept, previous[0], written.count)
+            self.changes_processed += 1
+        self.pending_digests[key] = written.digest()
+        self.pending_tails[key] = (written.count, list(written.tail))
+
+    def append_in_chunks(
+        self, odm_id: Any, key: str, kept: int, previous_length: int, length: int
+    ) -> None:
+        """
+        Trims the stored list down to its last kept elements, then appends the elements from kept
+        up to length one chunk per write. Elements pushed to Redis after the digest pass are left
+        for the next round so the stored list matches the digest.
+        """
+        if kept < previous_length:
+            self.bulk_write_ops(
+                [
+                    UpdateOne(
+                        {"_id": odm_id},
+                        {"$push": {self.VALUE_FIELD: {"$each": [], "$slice": -kept}}},
+                    )
+                ],
+                True,
+            )
+        for chunk in self.iter_redis_chunks(key, start=kept, stop=length - 1):
+            self.bulk_write_ops(
+                [
+                    UpdateOne(
+                        {"_id": odm_id},
+                        {"$push": {self.VALUE_FIELD: {"$each": chunk}}},
+                    )
+                ],
+                True,
+            )
+
+    def commit_shadow(self) -> None:
+        for key, tail in self.pending_tails.items():
+            if key in self.odm_ids:
+                self.tails[key] = tail
+        self.pending_tails = {}
+        super().commit_shadow()
+
+    def discard_shadow(self) -> None:
+        self.pending_tails = {}
+        self.trim_checks = {}
+        super().discard_shadow()
+
+    def update_structure(self, new_keys: list[str], removed_keys: list[str]):
+        super().update_structure(new_keys, removed_keys)
+        for key in removed_keys:
+            self.tails.pop(key, None)
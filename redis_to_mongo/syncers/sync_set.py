@@ -1,18 +1,27 @@
-from typing import Any
+from typing import Any, Iterator
 from redis_to_mongo.redis_to_mongo_mongo_modules.mongo_models import SetODM
-from redis_to_mongo.syncers.syncer_base import SyncTypeInterface
+from redis_to_mongo.syncers.sync_collection import SyncMembersType
 
 
-class SyncSets(SyncTypeInterface):
+class SyncSets(SyncMembersType):
     TYPE = "set"
     ODM_CLASS = SetODM
+    VALUE_FIELD = "values"
+    VALUE_GETTER = "get_sets"
+    ORDERED = False
 
-    def _sync(self) -> dict[str, dict[str, Any]]:
-        updates = {}
-        for key, odm_id in self.odm_ids.items():
-            redis_set = self.redis_handler.get_set(key)
-            # guaranteed to be there
-            odm = self.get_odm_class().objects(id=odm_id).first()
-            if sorted(redis_set) != odm.values:
-                updates[odm_id] = {"values": redis_set}
-        return updates
+    def value_digest(self, value: list[str]) -> bytes:
+        return self.shadow.unordered_digest(value)
+
+    def iter_redis_chunks(self, key: str) -> Iterator[list[Any]]:
+        return self.redis_handler.iter_set_chunks(key)
+
+    @staticmethod
+    def member_id(member: str) -> str:
+        return member
+
+    def pull_update(self, member_ids: list[str]) -> dict[str, Any]:
+        return {"$pull": {self.VALUE_FIELD: {"$in": member_ids}}}
+
+    def add_update(self, members: list[str]) -> dict[str, Any]:
+        return {"$addToSet": {self.VALUE_FIELD: {"$each": members}}}
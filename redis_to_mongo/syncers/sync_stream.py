@@ -1,49 +1,364 @@
+import asyncio
+import hashlib
+import threading
+import time
 from typing import Any
+from bson import ObjectId
 from pymongo import InsertOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from redis_to_mongo.redis_api import RedisHandler
 from redis_to_mongo.redis_to_mongo_mongo_modules.mongo_models import (
     StreamODM,
     StreamMessageODM,
 )
 from redis_to_mongo.syncers.syncer_base import SyncTypeInterface
+from redis_to_mongo.logger import logger
 
 
 class SyncStreams(SyncTypeInterface):
     TYPE = "stream"
     ODM_CLASS = StreamODM
+    VALUE_FIELD = "last_redis_read_id"
+    DUPLICATE_KEY_ERROR = 11000
+    WRITE_RETRIES = 2  # immediate retries of the failed message inserts
 
-    def init(self, key_types: dict[str, str]):
+    def __init__(self, redis_handler: RedisHandler):
+        super().__init__(redis_handler)
         self.last_read_ids = {}
-        super().init(key_types)
-
-    def sync_structure(self, key_types: list[str]):
-        super().sync_structure(key_types)
-        for key, odm_id in self.odm_ids.items():
-            # we are not  assigning a default but checking db, because init also uses this method, and no last reads will be here at that point.
-            # avoiding fixing inefficiencies due to time and not having a bottleneck yet
-            if key not in self.last_read_ids:
-                mongo_stream = self.get_odm_class().objects(id=odm_id).first()
-                # if stream disappears and then reappears, means it was removed from redis and so
-                # we start with it from its new beginnign and so last read id 0-0 and not what we store. doesn't matter
-                self.last_read_ids[key] = mongo_stream.last_redis_read_id
+        # guards odm_ids and last_read_ids when a StreamTailer reads from another thread
+        self.lock = threading.RLock()
+        self.tailed = (
+            False  # set when a StreamTailer reads the streams instead of _sync
+        )
+
+    def init(self, key_types: dict[str, str]):
+        with self.lock:
+            self.last_read_ids = {}
+            super().init(key_types)
+
+    def sync(self, key_types: dict[str, str]):
+        with self.lock:
+            super().sync(key_types)
+
+    def sync_keys(self, key_types: dict[str, str]):
+        with self.lock:
+            super().sync_keys(key_types)
+
+    async def sync_async(self, key_types: dict[str, str]):
+        with self.lock:
+            await super().sync_async(key_types)
+
+    async def sync_keys_async(self, key_types: dict[str, str]):
+        with self.lock:
+            await super().sync_keys_async(key_types)
+
+    def update_structure(self, new_keys: list[str], removed_keys: list[str]):
+        super().update_structure(new_keys, removed_keys)
+        # we are not  assigning a default but checking db, because init also uses this method, and no last reads will be here at that point.
+        unread = {
+            odm_id: key
+            for key, odm_id in self.odm_ids.items()
+            if key not in self.last_read_ids
+        }
+        if unread:
+            # if stream disappears and then reappears, means it was removed from redis and so
+            # we start with it from its new beginnign and so last read id 0-0 and not what we store. doesn't matter
+            stored_ids = self.get_previous_values(list(unread))
+            for odm_id, key in unread.items():
+                self.last_read_ids[key] = stored_ids[odm_id]
+
+    def read_ids_snapshot(
+        self, keys: list[str] | None = None
+    ) -> tuple[dict[str, str], dict[str, Any]]:
+        """
+        Returns copies of the read ids and ODM ids of the given streams, by default the ones
+        to read this round.
+        """
+        with self.lock:
+            keys = self.select_keys() if keys is None else keys
+            read_ids = {key: self.last_read_ids[key] for key in keys}
+            stream_ids = {key: self.odm_ids[key] for key in keys}
+        return read_ids, stream_ids
 
     def _sync(self) -> dict[str, dict[str, Any]]:
+        """
+        Keeps reading until every stream is caught up or the round's time/message budget is spent.
+        """
+        if self.tailed:
+            return {}
+        read_ids, stream_ids = self.read_ids_snapshot()
+        config = self.redis_handler.config.config
+        deadline = time.time() + config["stream_drain_budget_ms"] / 1000
+        messages_read = 0
         updates = {}
-        if not self.last_read_ids:
+        self.backlogs = {}
+        while read_ids:
+            start_ids = dict(read_ids)
+            all_messages = self.read_page(read_ids)
+            page_updates, failed = self.write_messages(all_messages, stream_ids)
+            updates.update(page_updates)
+            self.confirm_page(all_messages, failed, start_ids)
+            messages_read += sum(len(messages) for messages in all_messages.values())
+            read_ids = self.unfinished_streams(read_ids, all_messages, failed)
+            if read_ids and self.drain_budget_spent(deadline, messages_read):
+                self.backlogs = self.get_backlogs(read_ids)
+                self.warn_backlogs(messages_read)
+                break
+        return updates
+
+    async def _sync_async(self) -> dict[str, dict[str, Any]]:
+        """
+        _sync on the async clients, backlogs are only looked up through RedisHandler.
+        """
+        if self.tailed:
             return {}
-        all_messages = self.redis_handler.read_messages(self.last_read_ids)
+        read_ids, stream_ids = self.read_ids_snapshot(await self.select_keys_async())
+        config = self.redis_handler.config.config
+        deadline = time.time() + config["stream_drain_budget_ms"] / 1000
+        messages_read = 0
+        updates = {}
+        self.backlogs = {}
+        while read_ids:
+            start_ids = dict(read_ids)
+            all_messages = await self.read_page_async(read_ids)
+            page_updates, failed = await self.write_messages_async(
+                all_messages, stream_ids
+            )
+            updates.update(page_updates)
+            await self.confirm_page_async(all_messages, failed, start_ids)
+            messages_read += sum(len(messages) for messages in all_messages.values())
+            read_ids = self.unfinished_streams(read_ids, all_messages, failed)
+            if read_ids and self.drain_budget_spent(deadline, messages_read):
+                self.backlogs = await asyncio.to_thread(self.get_backlogs, read_ids)
+                self.warn_backlogs(messages_read)
+                break
+        return updates
+
+    def unfinished_streams(
+        self,
+        read_ids: dict[str, str],
+        all_messages: dict[str, list[tuple[str, dict[str, str]]]],
+        failed: dict[str, list[tuple[str, dict[str, str]]]],
+    ) -> dict[str, str]:
+        """
+        Returns the read ids of the streams to read another page of, a full page means
+        the stream may hold more messages.
+        """
+        return {
+            stream: read_ids[stream]
+            for stream, messages in all_messages.items()
+            if len(messages) >= self.redis_handler.config.config["messages_per_stream"]
+            and stream not in failed
+        }
+
+    def drain_budget_spent(self, deadline: float, messages_read: int) -> bool:
+        return (
+            time.time() >= deadline
+            or messages_read
+            >= self.redis_handler.config.config["stream_drain_max_messages"]
+        )
+
+    def warn_backlogs(self, messages_read: int) -> None:
+        logger.warning(
+            f"Stream drain budget spent after {messages_read} messages, backlog: {self.backlogs}"
+        )
+
+    def read_page(
+        self, read_ids: dict[str, str]
+    ) -> dict[str, list[tuple[str, dict[str, str]]]]:
+        all_messages = self.redis_handler.read_messages(read_ids)
+        self.last_read_ids.update(read_ids)
+        return all_messages
+
+    async def read_page_async(
+        self, read_ids: dict[str, str]
+    ) -> dict[str, list[tuple[str, dict[str, str]]]]:
+        redis_handler = self.get_async_clients().redis_handler
+        all_messages = await redis_handler.read_messages(read_ids)
+        self.last_read_ids.update(read_ids)
+        return all_messages
+
+    def confirm_page(
+        self,
+        all_messages: dict[str, list[tuple[str, dict[str, str]]]],
+        failed: dict[str, list[tuple[str, dict[str, str]]]],
+        start_ids: dict[str, str],
+    ) -> None:
+        """
+        Called once a page of messages is written to Mongo. Streams with failed writes are read
+        again from their last confirmed message, the already written ones are skipped as duplicates.
+        """
+        with self.lock:
+            for stream, failed_messages in failed.items():
+                confirmed_id = self.confirmed_read_id(
+                    all_messages[stream], failed_messages
+                )
+                self.last_read_ids[stream] = confirmed_id or start_ids[stream]
+
+    async def confirm_page_async(
+        self,
+        all_messages: dict[str, list[tuple[str, dict[str, str]]]],
+        failed: dict[str, list[tuple[str, dict[str, str]]]],
+        start_ids: dict[str, str],
+    ) -> None:
+        self.confirm_page(all_messages, failed, start_ids)
+
+    def get_backlogs(self, read_ids: dict[str, str]) -> dict[str, int]:
+        return self.redis_handler.get_stream_lags(read_ids)
+
+    @staticmethod
+    def message_id(stream_id: Any, rid: str) -> ObjectId:
+        """
+        Derives the message _id from its stream and redis id, so writing a message twice is a duplicate key error.
+        """
+        return ObjectId(
+            hashlib.blake2b(f"{stream_id}:{rid}".encode(), digest_size=12).digest()
+        )
+
+    @staticmethod
+    def confirmed_read_id(
+        messages: list[tuple[str, dict[str, str]]],
+        failed_messages: list[tuple[str, dict[str, str]]],
+    ) -> str | None:
+        """
+        Returns the id of the last message written before the first failed one, None if there is none.
+        """
+        if not failed_messages:
+            return messages[-1][0] if messages else None
+        first_failed = [message[0] for message in messages].index(failed_messages[0][0])
+        return messages[first_failed - 1][0] if first_failed else None
+
+    def write_messages(
+        self,
+        all_messages: dict[str, list[tuple[str, dict[str, str]]]],
+        stream_ids: dict[str, Any],
+    ) -> tuple[dict[str, dict[str, Any]], dict[str, list[tuple[str, dict[str, str]]]]]:
+        """
+        Inserts the read messages and returns the last read id updates for their streams along with
+        the messages that could not be written. A read id only advances up to its first failed message.
+        """
+        pending = self.pending_messages(all_messages)
+        for _ in range(self.WRITE_RETRIES + 1):
+            if not pending:
+                break
+            failed_indexes = self.insert_messages(
+                self.message_documents(pending, stream_ids)
+            )
+            self.changes_processed += len(pending) - len(failed_indexes)
+            pending = [pending[index] for index in sorted(failed_indexes)]
+        return self.read_id_updates(all_messages, stream_ids, pending)
+
+    async def write_messages_async(
+        self,
+        all_messages: dict[str, list[tuple[str, dict[str, str]]]],
+        stream_ids: dict[str, Any],
+    ) -> tuple[dict[str, dict[str, Any]], dict[str, list[tuple[str, dict[str, str]]]]]:
+        pending = self.pending_messages(all_messages)
+        for _ in range(self.WRITE_RETRIES + 1):
+            if not pending:
+                break
+            failed_indexes = await self.insert_messages_async(
+                self.message_documents(pending, stream_ids)
+            )
+            self.changes_processed += len(pending) - len(failed_indexes)
+            pending = [pending[index] for index in sorted(failed_indexes)]
+        return self.read_id_updates(all_messages, stream_ids, pending)
+
+    @staticmethod
+    def pending_messages(
+        all_messages: dict[str, list[tuple[str, dict[str, str]]]],
+    ) -> list[tuple[str, tuple[str, dict[str, str]]]]:
+        return [
+            (stream, message)
+            for stream, messages in all_messages.items()
+            for message in messages
+        ]
+
+    def message_documents(
+        self,
+        pending: list[tuple[str, tuple[str, dict[str, str]]]],
+        stream_ids: dict[str, Any],
+    ) -> list[dict[str, Any]]:
+        return [
+            {
+                "_id": self.message_id(stream_ids[stream], message[0]),
+                "stream": stream_ids[stream],
+                "rid": message[0],
+                "content": message[1],
+            }
+            for stream, message in pending
+        ]
+
+    def read_id_updates(
+        self,
+        all_messages: dict[str, list[tuple[str, dict[str, str]]]],
+        stream_ids: dict[str, Any],
+        pending: list[tuple[str, tuple[str, dict[str, str]]]],
+    ) -> tuple[dict[str, dict[str, Any]], dict[str, list[tuple[str, dict[str, str]]]]]:
+        """
+        Returns the last read id updates of the streams up to their first unwritten message
+        and the unwritten messages per stream.
+        """
+        failed: dict[str, list[tuple[str, dict[str, str]]]] = {}
+        for stream, message in pending:
+            failed.setdefault(stream, []).append(message)
         # will need to update last read ids only for the streams that got read and we assume other values unchanged
-        write_ops = []
+        updates = {}
         for stream, messages in all_messages.items():
-            stream_id = self.odm_ids[stream]
-            for message in messages:
-                write_ops.append(
-                    InsertOne(
-                        {"stream": stream_id, "rid": message[0], "content": message[1]}
-                    )
+            confirmed_id = self.confirmed_read_id(messages, failed.get(stream, []))
+            if confirmed_id is not None:
+                updates[stream_ids[stream]] = {"last_redis_read_id": confirmed_id}
+        return updates, failed
+
+    def insert_messages(self, documents: list[dict[str, Any]]) -> list[int]:
+        """
+        Inserts message documents unordered and returns the indexes of the ones not written.
+        A duplicate key error means the message was written before, e.g. before a crash.
+        """
+        try:
+            # messages are unordered and important field internal time we had in stream or message id i guess
+            self.bulk_write_ops(
+                [InsertOne(document) for document in documents],
+                ordered=False,
+                odm_override=StreamMessageODM,
+            )
+        except BulkWriteError as e:
+            return self.unwritten_indexes(e, len(documents))
+        except PyMongoError as e:
+            logger.error(f"Error writing {len(documents)} stream messages: {str(e)}")
+            return list(range(len(documents)))
+        return []
+
+    async def insert_messages_async(self, documents: list[dict[str, Any]]) -> list[int]:
+        clients = self.get_async_clients()
+        try:
+            async with clients.slots:
+                await clients.collection(StreamMessageODM).bulk_write(
+                    [InsertOne(document) for document in documents], ordered=False
                 )
+        except BulkWriteError as e:
+            return self.unwritten_indexes(e, len(documents))
+        except PyMongoError as e:
+            logger.error(f"Error writing {len(documents)} stream messages: {str(e)}")
+            return list(range(len(documents)))
+        return []
 
-            updates[stream_id] = {"last_redis_read_id": self.last_read_ids[stream]}
-        # messages are unordered and important field internal time we had in stream or message id i guess
-        self.bulk_write_ops(write_ops, ordered=False, odm_override=StreamMessageODM)
-        self.changes_processed += len(write_ops)
-        return updates
+    def unwritten_indexes(self, e: BulkWriteError, count: int) -> list[int]:
+        """
+        Returns the indexes of the messages a failed bulk insert did not write.
+        """
+        if e.details.get("writeConcernErrors"):
+            logger.warning(
+                f"Write concern not satisfied for {count} stream messages, will retry"
+            )
+            return list(range(count))
+        failed_indexes = [
+            error["index"]
+            for error in e.details["writeErrors"]
+            if error["code"] != self.DUPLICATE_KEY_ERROR
+        ]
+        if failed_indexes:
+            logger.warning(
+                f"{len(failed_indexes)} of {count} stream messages failed to write"
+            )
+        return failed_indexes
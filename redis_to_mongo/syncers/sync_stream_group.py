@@ -0,0 +1,145 @@
+import os
+import socket
+from typing import Any
+from redis_to_mongo.redis_api import RedisHandler
+from redis_to_mongo.syncers.sync_stream import SyncStreams
+from redis_to_mongo.logger import logger
+
+
+class SyncStreamsGroup(SyncStreams):
+    """
+    Stream syncer built on a Redis consumer group, so several sync workers can share the streams.
+    Each worker process is one consumer: XREADGROUP hands every message to a single worker, which
+    XACKs it once written to Mongo. Messages left pending by a crashed worker are reclaimed with
+    XAUTOCLAIM after STREAM_CLAIM_MIN_IDLE_MS.
+    Progress is tracked by the group, so StreamODM.last_redis_read_id is only used as the group's
+    starting point when it is first created.
+    """
+
+    def __init__(self, redis_handler: RedisHandler):
+        super().__init__(redis_handler)
+        config = redis_handler.config.config
+        self.group = config["stream_consumer_group"]
+        self.consumer = (
+            config["stream_consumer_name"] or f"{socket.gethostname()}-{os.getpid()}"
+        )
+        self.grouped_streams: set[str] = set()
+
+    def update_structure(self, new_keys: list[str], removed_keys: list[str]):
+        super().update_structure(new_keys, removed_keys)
+        self.grouped_streams.difference_update(removed_keys)
+        for key in self.odm_ids:
+            if key not in self.grouped_streams:
+                # continue from where the single process mode left off
+                self.redis_handler.create_consumer_group(
+                    key, self.group, self.last_read_ids[key]
+                )
+                self.grouped_streams.add(key)
+
+    def _sync(self) -> dict[str, dict[str, Any]]:
+        read_ids, stream_ids = self.read_ids_snapshot()
+        if not read_ids:
+            return {}
+        claimed = self.redis_handler.claim_pending_messages(
+            list(read_ids),
+            self.group,
+            self.consumer,
+            self.redis_handler.config.config["stream_claim_min_idle_ms"],
+        )
+        if any(claimed.values()):
+            self.log_claimed(claimed)
+            _, failed = self.write_messages(claimed, stream_ids)
+            self.confirm_page(claimed, failed, {})
+        try:
+            super()._sync()
+        except Exception as e:
+            return self.handle_missing_group(e)
+        # progress lives in the consumer group, workers must not move the shared read id around
+        return {}
+
+    async def _sync_async(self) -> dict[str, dict[str, Any]]:
+        read_ids, stream_ids = self.read_ids_snapshot(await self.select_keys_async())
+        if not read_ids:
+            return {}
+        claimed = await self.get_async_clients().redis_handler.claim_pending_messages(
+            list(read_ids),
+            self.group,
+            self.consumer,
+            self.redis_handler.config.config["stream_claim_min_idle_ms"],
+        )
+        if any(claimed.values()):
+            self.log_claimed(claimed)
+            _, failed = await self.write_messages_async(claimed, stream_ids)
+            await self.confirm_page_async(claimed, failed, {})
+        try:
+            await super()._sync_async()
+        except Exception as e:
+            return self.handle_missing_group(e)
+        return {}
+
+    @staticmethod
+    def log_claimed(claimed: dict[str, list[tuple[str, dict[str, str]]]]) -> None:
+        logger.info(
+            f"Reclaimed {sum(len(m) for m in claimed.values())} pending stream messages"
+        )
+
+    def handle_missing_group(self, e: Exception) -> dict[str, dict[str, Any]]:
+        if "NOGROUP" in str(e):
+            # a stream was deleted and recreated, recreate its group on the next round
+            logger.warning(f"Consumer group missing, recreating: {str(e)}")
+            self.grouped_streams.clear()
+            return {}
+        raise e
+
+    def read_page(
+        self, read_ids: dict[str, str]
+    ) -> dict[str, list[tuple[str, dict[str, str]]]]:
+        return self.redis_handler.read_group_messages(
+            list(read_ids), self.group, self.consumer
+        )
+
+    async def read_page_async(
+        self, read_ids: dict[str, str]
+    ) -> dict[str, list[tuple[str, dict[str, str]]]]:
+        return await self.get_async_clients().redis_handler.read_group_messages(
+            list(read_ids), self.group, self.consumer
+        )
+
+    def confirm_page(
+        self,
+        all_messages: dict[str, list[tuple[str, dict[str, str]]]],
+        failed: dict[str, list[tuple[str, dict[str, str]]]],
+        start_ids: dict[str, str],
+    ) -> None:
+        """
+        Acks the written messages, failed ones stay pending and are reclaimed once idle.
+        """
+        self.redis_handler.ack_messages(
+            self.group, self.written_message_ids(all_messages, failed)
+        )
+
+    async def confirm_page_async(
+        self,
+        all_messages: dict[str, list[tuple[str, dict[str, str]]]],
+        failed: dict[str, list[tuple[str, dict[str, str]]]],
+        start_ids: dict[str, str],
+    ) -> None:
+        await self.get_async_clients().redis_handler.ack_messages(
+            self.group, self.written_message_ids(all_messages, failed)
+        )
+
+    @staticmethod
+    def written_message_ids(
+        all_messages: dict[str, list[tuple[str, dict[str, str]]]],
+        failed: dict[str, list[tuple[str, dict[str, str]]]],
+    ) -> dict[str, list[str]]:
+        message_ids = {}
+        for stream, messages in all_messages.items():
+            failed_ids = {message[0] for message in failed.get(stream, [])}
+            message_ids[stream] = [
+                message[0] for message in messages if message[0] not in failed_ids
+            ]
+        return message_ids
+
+    def get_backlogs(self, read_ids: dict[str, str]) -> dict[str, int]:
+        return self.redis_handler.get_consumer_group_lags(list(read_ids), self.group)
@@ -1,18 +1,34 @@
-from typing import Any
+from typing import Any, Iterator
 from redis_to_mongo.redis_to_mongo_mongo_modules.mongo_models import ZSetODM
-from redis_to_mongo.syncers.syncer_base import SyncTypeInterface
+from redis_to_mongo.syncers.sync_collection import SyncMembersType
 
 
-class SyncZSets(SyncTypeInterface):
+class SyncZSets(SyncMembersType):
     TYPE = "zset"
     ODM_CLASS = ZSetODM
+    VALUE_FIELD = "values"
+    VALUE_GETTER = "get_ordered_sets"
+    OFFLOAD = True
 
-    def _sync(self) -> dict[str, dict[str, Any]]:
-        updates = {}
-        for key, odm_id in self.odm_ids.items():
-            redis_ordered_set = self.redis_handler.get_ordered_set(key)
-            # guaranteed to be there
-            odm = self.get_odm_class().objects(id=odm_id).first()
-            if redis_ordered_set != odm.values:
-                updates[odm_id] = {"values": redis_ordered_set}
-        return updates
+    def iter_redis_chunks(self, key: str) -> Iterator[list[Any]]:
+        return self.redis_handler.iter_ordered_set_chunks(key)
+
+    @staticmethod
+    def member_id(member: dict[str, Any]) -> str:
+        return member["key"]
+
+    def pull_update(self, member_ids: list[str]) -> dict[str, Any]:
+        return {"$pull": {self.VALUE_FIELD: {"key": {"$in": member_ids}}}}
+
+    def add_update(self, members: list[dict[str, Any]]) -> dict[str, Any]:
+        """
+        Inserts the members keeping values in ZRANGE order, by score then member.
+        """
+        return {
+            "$push": {
+                self.VALUE_FIELD: {
+                    "$each": members,
+                    "$sort": {"score": 1, "key": 1},
+                }
+            }
+        }
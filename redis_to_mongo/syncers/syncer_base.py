@@ -1,5 +1,9 @@
-from abc import ABC, abstractmethod
-from typing import Any
+import asyncio
+from abc import ABC
+from typing import TYPE_CHECKING, Any, Iterable
+import bson
+from bson import ObjectId
+from mongoengine import signals
 from pymongo import UpdateOne
 from redis_to_mongo.redis_api import RedisHandler
 from redis_to_mongo.redis_to_mongo_mongo_modules.mongo_models import (
@@ -7,7 +11,14 @@ from redis_to_mongo.redis_to_mongo_mongo_modules.mongo_models import (
     BaseDocument,
 )
 from redis_to_mongo.logger import logger
+from redis_to_mongo.key_filter import KeyFilter
+from redis_to_mongo.partition import Partition
+from redis_to_mongo.syncers.chunk_store import ChunkStore
+from redis_to_mongo.syncers.key_scheduler import KeyScheduler
+from redis_to_mongo.syncers.shadow_cache import ShadowCache
 
+if TYPE_CHECKING:
+    from redis_to_mongo.async_clients import AsyncClients
 
 # string, list, set, zset, hash and stream
 # https://redis.io/commands/type/
@@ -16,11 +27,38 @@ from redis_to_mongo.logger import logger
 class SyncTypeInterface(ABC):
     TYPE = None  # To be defined by each child class
     ODM_CLASS: type[KeyedDocument] | None = None
+    VALUE_FIELD: str | None = None  # ODM field holding the synced redis value
+    # RedisHandler and AsyncRedisHandler method fetching a batch of values, e.g. "get_strings"
+    VALUE_GETTER: str | None = None
+    MONGO_READ_BATCH_SIZE = 1000
+    SHADOW_CACHE_MAX_ENTRIES = 1_000_000  # ~16 bytes digest + key per entry
+    OFFLOAD = False  # whether values past OFFLOAD_THRESHOLD_BYTES go to the chunk store
+    PARTIAL_UPDATES = (
+        False  # whether changed values are written as partial_update diffs
+    )
 
     def __init__(self, redis_handler: RedisHandler):
         self.redis_handler = redis_handler
         self.odm_ids = {}  # keys: ODMs from mongo
         self.changes_processed = 0  # approx
+        self.key_subset: list[str] | None = None  # restricts _sync to these keys
+        # keys a running key scan has not found again yet, checked before fetching their value
+        self.unconfirmed_keys: set[str] = set()
+        self.partition: Partition | None = (
+            None  # keys owned by this worker, all if None
+        )
+        self.key_filter: KeyFilter | None = (
+            None  # keys selected for syncing, all if None
+        )
+        self.shadow = ShadowCache(self.SHADOW_CACHE_MAX_ENTRIES)
+        self.pending_digests: dict[str, bytes] = {}  # applied once the round is written
+        self.chunk_store = ChunkStore()
+        # ids of the ODMs whose value is in the chunk store
+        self.offloaded: set[Any] = set()
+        # backs off rarely changing keys when KEY_BACKOFF_MAX_ROUNDS > 1
+        self.key_scheduler: KeyScheduler | None = None
+        # set by AsyncSyncEngine, the clients its *_async rounds read and write through
+        self.async_clients: "AsyncClients | None" = None
 
     def filter_key_types(self, key_types: dict[str, str]) -> list[str]:
         return [key for key, type in key_types.items() if type == self.TYPE]
@@ -31,55 +69,555 @@ class SyncTypeInterface(ABC):
             raise ValueError("ODM_CLASS is not defined for this sync type.")
         return self.ODM_CLASS
 
+    def get_previous_values(self, odm_ids: list[Any]) -> dict[Any, Any]:
+        """
+        Loads the stored value of each given ODM with batched $in queries, projecting only VALUE_FIELD.
+        Offloaded values are reassembled from the chunk store.
+        """
+        collection = self.get_odm_class()._get_collection()
+        previous_values = self.get_offloaded_values(odm_ids)
+        odm_ids = [odm_id for odm_id in odm_ids if odm_id not in self.offloaded]
+        for start in range(0, len(odm_ids), self.MONGO_READ_BATCH_SIZE):
+            batch = odm_ids[start : start + self.MONGO_READ_BATCH_SIZE]
+            for doc in collection.find({"_id": {"$in": batch}}, {self.VALUE_FIELD: 1}):
+                previous_values[doc["_id"]] = self.stored_value(doc)
+        return previous_values
+
+    async def get_previous_values_async(self, odm_ids: list[Any]) -> dict[Any, Any]:
+        """
+        get_previous_values through the async Mongo client, the chunk store is read in a worker thread.
+        """
+        clients = self.get_async_clients()
+        collection = clients.collection(self.get_odm_class())
+        previous_values = {}
+        if any(odm_id in self.offloaded for odm_id in odm_ids):
+            previous_values = await asyncio.to_thread(
+                self.get_offloaded_values, odm_ids
+            )
+        odm_ids = [odm_id for odm_id in odm_ids if odm_id not in self.offloaded]
+        for start in range(0, len(odm_ids), self.MONGO_READ_BATCH_SIZE):
+            batch = odm_ids[start : start + self.MONGO_READ_BATCH_SIZE]
+            async for doc in collection.find(
+                {"_id": {"$in": batch}}, {self.VALUE_FIELD: 1}
+            ):
+                previous_values[doc["_id"]] = self.stored_value(doc)
+        return previous_values
+
+    def get_offloaded_values(self, odm_ids: list[Any]) -> dict[Any, Any]:
+        return {
+            odm_id: self.chunk_store.read_value(odm_id)
+            for odm_id in odm_ids
+            if odm_id in self.offloaded
+        }
+
+    def stored_value(self, doc: dict[str, Any]) -> Any:
+        # mongoengine does not store empty fields, so fall back to the field default
+        if self.VALUE_FIELD in doc:
+            return doc[self.VALUE_FIELD]
+        return self.empty_value()
+
+    def empty_value(self) -> Any:
+        default = self.get_odm_class()._fields[self.VALUE_FIELD].default
+        return default() if callable(default) else default
+
+    def get_async_clients(self) -> "AsyncClients":
+        if self.async_clients is None:
+            raise ValueError("Async rounds need the clients set by AsyncSyncEngine.")
+        return self.async_clients
+
+    def value_size(self, value: Any) -> int:
+        """
+        Returns the BSON bytes the value takes in its ODM document.
+        """
+        return len(bson.encode({self.VALUE_FIELD: value}))
+
+    def should_offload(self, size: int) -> bool:
+        threshold = self.redis_handler.config.config["offload_threshold_bytes"]
+        return self.OFFLOAD and bool(threshold) and size > threshold
+
+    def needs_full_write(self, odm_id: Any, value: Any) -> bool:
+        """
+        Whether a changed value has to be written whole, as targeted updates can't reach
+        values in the chunk store nor grow a document past the offload threshold.
+        """
+        return odm_id in self.offloaded or self.should_offload(self.value_size(value))
+
+    def value_digest(self, value: Any) -> bytes:
+        """
+        Returns the digest values are compared by, e.g. ignoring member order for unordered types.
+        """
+        return self.shadow.digest(value)
+
+    def diff_values(self, redis_values: dict[str, Any]) -> dict[Any, dict[str, Any]]:
+        """
+        Returns $set updates for the keys whose redis value differs from the last synced one.
+        Values are compared to the shadow digests, only cache misses (e.g. after a restart) read Mongo.
+        """
+        digests = {key: self.value_digest(value) for key, value in redis_values.items()}
+        previous_ids = self.previous_ids(digests)
+        previous_values = self.get_previous_values(previous_ids) if previous_ids else {}
+        return self.value_updates(redis_values, digests, previous_values)
+
+    async def diff_values_async(
+        self, redis_values: dict[str, Any]
+    ) -> dict[Any, dict[str, Any]]:
+        digests = {key: self.value_digest(value) for key, value in redis_values.items()}
+        previous_ids = self.previous_ids(digests)
+        previous_values = (
+            await self.get_previous_values_async(previous_ids) if previous_ids else {}
+        )
+        return self.value_updates(redis_values, digests, previous_values)
+
+    def previous_ids(self, digests: dict[str, bytes]) -> list[Any]:
+        """
+        Returns the ids of the ODMs whose stored value the diff needs: the shadow cache misses,
+        with PARTIAL_UPDATES every changed key as its update is made from the stored value.
+        """
+        if self.PARTIAL_UPDATES:
+            # a shadow miss compares as changed, partial_update sorts out if anything differs
+            keys = [
+                key for key, digest in digests.items() if self.shadow.get(key) != digest
+            ]
+        else:
+            keys = [key for key in digests if self.shadow.get(key) is None]
+        return [self.odm_ids[key] for key in keys]
+
+    def value_updates(
+        self,
+        redis_values: dict[str, Any],
+        digests: dict[str, bytes],
+        previous_values: dict[Any, Any],
+    ) -> dict[Any, Any]:
+        """
+        Returns the updates of the keys whose digest differs from the last synced one and stages
+        the digests for commit_shadow. previous_values holds the stored values of previous_ids.
+        """
+        if self.PARTIAL_UPDATES:
+            return self.partial_value_updates(redis_values, digests, previous_values)
+        updates = {}
+        for key, redis_value in redis_values.items():
+            odm_id = self.odm_ids[key]
+            previous_digest = self.shadow.get(key)
+            if previous_digest is None:
+                previous_digest = self.value_digest(previous_values[odm_id])
+            if digests[key] != previous_digest:
+                updates[odm_id] = self.value_update(
+                    key, redis_value, previous_values.get(odm_id)
+                )
+            self.pending_digests[key] = digests[key]
+        return updates
+
+    def partial_value_updates(
+        self,
+        redis_values: dict[str, Any],
+        digests: dict[str, bytes],
+        previous_values: dict[Any, Any],
+    ) -> dict[Any, Any]:
+        """
+        Returns the partial_update of each changed key, or a full write where the value can't take one.
+        """
+        updates = {}
+        for key, digest in digests.items():
+            if self.shadow.get(key) == digest:
+                continue
+            odm_id = self.odm_ids[key]
+            update = self.partial_update(previous_values[odm_id], redis_values[key])
+            if update and self.needs_full_write(odm_id, redis_values[key]):
+                update = {self.VALUE_FIELD: redis_values[key]}
+            if update:
+                updates[odm_id] = update
+        self.pending_digests.update(digests)
+        return updates
+
+    def partial_update(
+        self, previous: Any, current: Any
+    ) -> list[dict[str, Any]] | dict[str, Any]:
+        """
+        Returns the update (or the update steps) turning the stored previous value into current,
+        empty if they are the same. Types with PARTIAL_UPDATES diff members, fields or paths.
+        """
+        if previous == current:
+            return {}
+        return {self.VALUE_FIELD: current}
+
+    def value_update(self, key: str, value: Any, previous_value: Any) -> dict[str, Any]:
+        """
+        Returns the update writing the changed value of key. previous_value is the stored value
+        if it had to be read from Mongo, None otherwise.
+        """
+        return {self.VALUE_FIELD: value}
+
+    def commit_shadow(self) -> None:
+        for key, digest in self.pending_digests.items():
+            if key in self.odm_ids:
+                if self.key_scheduler:
+                    self.key_scheduler.record(key, self.shadow.get(key) != digest)
+                self.shadow.put(key, digest)
+        self.pending_digests = {}
+
+    def discard_shadow(self) -> None:
+        self.pending_digests = {}
+
     def init(self, key_types: dict[str, str]):
-        active_odms = self.get_odm_class().objects(active_now=True).all()
-        self.odm_ids = {odm.key: odm.id for odm in active_odms}
+        active_odms = self.get_odm_class().objects(active_now=True).only("key")
+        # other workers' keys and keys outside the key filter are not ours to deactivate
+        self.odm_ids = {
+            odm.key: odm.id
+            for odm in active_odms
+            if (self.partition is None or self.partition.owns(odm.key))
+            and (self.key_filter is None or self.key_filter.matches(odm.key))
+        }
+        if self.OFFLOAD:
+            self.offloaded = self.chunk_store.offloaded(list(self.odm_ids.values()))
+        self.key_scheduler = None  # rebuilt for the new keys by the first select_keys
         keys = self.filter_key_types(key_types)
         self.sync_structure(keys)
 
     def sync_structure(self, keys: list[str]):
-        for key in keys:
-            if key not in self.odm_ids:
-                odm = self.get_odm_class().objects(key=key).first()
-                if odm:
-                    self.odm_ids[key] = odm.id
-                    odm.update_active_now_no_save(True)
-                    odm.save()
-                else:
-                    odm = self.get_odm_class()(key=key, active_now=True)
-                    odm.save()
-                    self.odm_ids[key] = odm.id
-
-        for odm_key in list(self.odm_ids.keys()):
-            # what happens when the key emptied during not running? it's active but no longer appears in the keys so we do not update it
-            if odm_key not in keys:
-                self.odm_ids.pop(odm_key)
-                odm = self.get_odm_class().objects(key=odm_key).first()
-                odm.update_active_now_no_save(False)
-                odm.reset_fields_to_default_no_save()
-                odm.save()
+        key_set = set(keys)
+        new_keys = [key for key in keys if key not in self.odm_ids]
+        removed_keys = [key for key in self.odm_ids if key not in key_set]
+        self.update_structure(new_keys, removed_keys)
+
+    def update_structure(self, new_keys: list[str], removed_keys: list[str]):
+        """
+        Applies appearing and vanished keys in bulk: one batched $in lookup for appearing
+        keys, upserts for new or reactivated ones and updates for deactivated ones.
+        The tracked keys only change once the write went through, a failed round is redone.
+        """
+        if not new_keys and not removed_keys:
+            return
+        odm_class = self.get_odm_class()
+        operations = []
+        new_ids = {}
+        upserted_keys = []
+
+        existing_odms = {odm.key: odm for odm in self.load_odms(new_keys, "key__in")}
+        for key in new_keys:
+            odm = existing_odms.get(key)
+            if odm:
+                new_ids[key] = odm.id
+                odm.update_active_now_no_save(True)
+                self.prepare_save(odm)
+                operations.extend(self.delta_operations(odm))
+            else:
+                new_odm = odm_class(key=key, active_now=True)
+                self.prepare_save(new_odm)
+                document = new_odm.to_mongo().to_dict()
+                document.pop("key")  # set by the upsert filter
+                document["_id"] = new_ids[key] = ObjectId()
+                upserted_keys.append(key)
+                operations.append(
+                    UpdateOne({"key": key}, {"$setOnInsert": document}, upsert=True)
+                )
+
+        # what happens when the key emptied during not running? it's active but no longer appears in the keys so we do not update it
+        removed_ids = [self.odm_ids[key] for key in removed_keys]
+        for odm in self.load_odms(removed_ids, "id__in"):
+            odm.update_active_now_no_save(False)
+            odm.reset_fields_to_default_no_save()
+            self.prepare_save(odm)
+            operations.extend(self.delta_operations(odm))
+
+        result = self.bulk_write_ops(operations, ordered=False)
+        if result and result.upserted_count < len(upserted_keys):
+            # some keys were inserted concurrently by someone else and matched instead of upserted
+            for odm in self.load_odms(upserted_keys, "key__in"):
+                new_ids[odm.key] = odm.id
+        self.odm_ids.update(new_ids)
+        for key in removed_keys:
+            del self.odm_ids[key]
+            self.shadow.pop(key)
+        self.drop_chunks([odm_id for odm_id in removed_ids if odm_id in self.offloaded])
+        if self.key_scheduler:
+            self.key_scheduler.add(new_keys)
+            self.key_scheduler.remove(removed_keys)
+
+    def load_odms(self, values: list[Any], lookup: str) -> list[KeyedDocument]:
+        """
+        Loads ODMs matching the given values with batched $in queries, e.g. lookup="key__in".
+        """
+        odms = []
+        for start in range(0, len(values), self.MONGO_READ_BATCH_SIZE):
+            batch = values[start : start + self.MONGO_READ_BATCH_SIZE]
+            odms.extend(self.get_odm_class().objects(**{lookup: batch}))
+        return odms
+
+    @staticmethod
+    def prepare_save(odm: KeyedDocument) -> None:
+        """
+        Runs what save() runs before writing (pre_save signals, validation and clean()), so
+        documents written in bulk come out the same as saved ones.
+        """
+        signals.pre_save.send(odm.__class__, document=odm)
+        odm.validate(clean=True)
+        signals.pre_save_post_validation.send(
+            odm.__class__, document=odm, created=odm.id is None
+        )
+
+    @staticmethod
+    def delta_operations(odm: KeyedDocument) -> list[UpdateOne]:
+        """
+        Returns the update save() would send for the unsaved changes on the ODM, as a bulk operation.
+        """
+        set_fields, unset_fields = odm._delta()
+        update = {}
+        if set_fields:
+            update["$set"] = set_fields
+        if unset_fields:
+            update["$unset"] = unset_fields
+        return [UpdateOne({"_id": odm.id}, update)] if update else []
 
     def sync(self, key_types: dict[str, str]):
         keys = self.filter_key_types(key_types)
         self.sync_structure(keys)
-        updates = self._sync()
-        self.changes_processed += len(updates)
-        self.bulk_update(updates, False)
+        self.sync_values()
 
-    @abstractmethod
-    def _sync(self) -> dict[str, dict[str, Any]]:
-        pass
+    async def sync_async(self, key_types: dict[str, str]):
+        """
+        sync on the async clients. Appearing and vanished keys are still applied through
+        mongoengine, in a worker thread.
+        """
+        keys = self.filter_key_types(key_types)
+        await asyncio.to_thread(self.sync_structure, keys)
+        await self.sync_values_async()
 
-    def bulk_update(self, updates: dict[str, dict[str, Any]], ordered) -> None:
-        operations = [
-            UpdateOne({"_id": _id}, {"$set": update}) for _id, update in updates.items()
+    def sync_keys(self, key_types: dict[str, str]):
+        """
+        Incremental counterpart of sync, key_types only holds the keys changed since the last round.
+        Keys whose type is no longer this syncer's (e.g. "none" after a delete) are deactivated.
+        """
+        self.key_subset = self.sync_key_structure(key_types)
+        try:
+            self.sync_values()
+        finally:
+            self.key_subset = None
+
+    async def sync_keys_async(self, key_types: dict[str, str]):
+        self.key_subset = await asyncio.to_thread(self.sync_key_structure, key_types)
+        try:
+            await self.sync_values_async()
+        finally:
+            self.key_subset = None
+
+    def sync_key_structure(self, key_types: dict[str, str]) -> list[str]:
+        """
+        Applies the appearing and vanished keys among key_types, returns the ones of this syncer's type.
+        """
+        keys = self.filter_key_types(key_types)
+        new_keys = [key for key in keys if key not in self.odm_ids]
+        removed_keys = [
+            key
+            for key, key_type in key_types.items()
+            if key in self.odm_ids and key_type != self.TYPE
         ]
-        self.bulk_write_ops(operations, ordered)
+        self.update_structure(new_keys, removed_keys)
+        return keys
+
+    def sync_values(self):
+        try:
+            updates = self._sync()
+            self.changes_processed += self.count_changes(updates)
+            self.bulk_update(updates, False)
+        except Exception:
+            self.discard_shadow()  # unwritten values must compare as changed next round
+            raise
+        self.commit_shadow()
+
+    async def sync_values_async(self):
+        try:
+            updates = await self._sync_async()
+            self.changes_processed += self.count_changes(updates)
+            await self.bulk_update_async(updates)
+        except Exception:
+            self.discard_shadow()
+            raise
+        self.commit_shadow()
+
+    def count_changes(self, updates: dict[Any, Any]) -> int:
+        return len(updates)
+
+    def select_keys(self) -> list[str]:
+        return self.confirm_keys(self.due_keys())
+
+    async def select_keys_async(self) -> list[str]:
+        return await self.confirm_keys_async(self.due_keys())
+
+    def due_keys(self) -> list[str]:
+        """
+        Returns the tracked keys _sync should compare this round, only the due ones when
+        the key scheduler backs off unchanged keys.
+        """
+        if self.key_subset is None:
+            max_interval = self.redis_handler.config.config["key_backoff_max_rounds"]
+            if max_interval <= 1:
+                return list(self.odm_ids)
+            if self.key_scheduler is None:
+                self.key_scheduler = KeyScheduler(max_interval)
+                self.key_scheduler.add(list(self.odm_ids))
+            return [key for key in self.key_scheduler.pop_due() if key in self.odm_ids]
+        return [key for key in self.key_subset if key in self.odm_ids]
+
+    def confirm_keys(self, keys: list[str]) -> list[str]:
+        """
+        Drops the unconfirmed keys that are gone or changed type, with one pipelined TYPE per
+        batch. They stay tracked until the key scan misses them, their value is just not fetched.
+        """
+        unconfirmed = [key for key in keys if key in self.unconfirmed_keys]
+        if not unconfirmed:
+            return keys
+        return self.drop_vanished(keys, self.redis_handler.iter_types(unconfirmed))
+
+    async def confirm_keys_async(self, keys: list[str]) -> list[str]:
+        unconfirmed = [key for key in keys if key in self.unconfirmed_keys]
+        if not unconfirmed:
+            return keys
+        key_types = await self.get_async_clients().redis_handler.get_types(unconfirmed)
+        return self.drop_vanished(keys, key_types.items())
+
+    def drop_vanished(
+        self, keys: list[str], key_types: Iterable[tuple[str, str]]
+    ) -> list[str]:
+        vanished = {key for key, key_type in key_types if key_type != self.TYPE}
+        return [key for key in keys if key not in vanished]
+
+    def fetch_values(self, keys: list[str]) -> list[Any]:
+        return getattr(self.redis_handler, str(self.VALUE_GETTER))(keys)
+
+    async def fetch_values_async(self, keys: list[str]) -> list[Any]:
+        redis_handler = self.get_async_clients().redis_handler
+        return await getattr(redis_handler, str(self.VALUE_GETTER))(keys)
+
+    def _sync(self) -> dict[str, dict[str, Any]]:
+        updates = {}
+        for redis_values in self.redis_handler.iter_value_batches(
+            self.select_keys(), self.fetch_values
+        ):
+            updates.update(self.diff_values(redis_values))
+        return updates
+
+    async def _sync_async(self) -> dict[str, dict[str, Any]]:
+        return await self.diff_batches_async(await self.select_keys_async())
+
+    async def diff_batches_async(self, keys: list[str]) -> dict[Any, Any]:
+        """
+        Fetches and diffs the VALUE_BATCH_SIZE batches of keys concurrently, each holding one of
+        the engine's slots from its Redis read to its Mongo read. A failed batch fails the round
+        once all of them are done, so none stages digests after the round is discarded.
+        """
+        clients = self.get_async_clients()
+        batch_size = self.redis_handler.config.config["value_batch_size"]
+
+        async def diff_batch(batch: list[str]) -> dict[Any, Any]:
+            async with clients.slots:
+                values = await self.fetch_values_async(batch)
+                return await self.diff_values_async(dict(zip(batch, values)))
+
+        results = await asyncio.gather(
+            *(
+                diff_batch(keys[start : start + batch_size])
+                for start in range(0, len(keys), batch_size)
+            ),
+            return_exceptions=True,
+        )
+        updates = {}
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+            updates.update(result)
+        return updates
+
+    def bulk_update(self, updates: dict[str, Any], ordered) -> None:
+        """
+        Writes the updates of a round, plain field values are $set and updates made of
+        operators (e.g. {"$set": ..., "$unset": ...}) are sent as they are. A list of updates
+        is applied to its document in order: the n-th steps of all documents are written as
+        one bulk after the previous one, so a failing document doesn't hold up the others.
+        Whole values are moved into or out of the chunk store by size first.
+        """
+        updates, returned = self.offload_updates(updates)
+        for operations in self.update_steps(updates):
+            self.bulk_write_ops(operations, ordered)
+        self.drop_chunks(returned)
+
+    async def bulk_update_async(self, updates: dict[str, Any]) -> None:
+        """
+        Unordered bulk_update through the async Mongo client, chunk store writes and deletes
+        go through mongoengine in a worker thread.
+        """
+        clients = self.get_async_clients()
+        returned = []
+        if self.OFFLOAD:
+            updates, returned = await asyncio.to_thread(self.offload_updates, updates)
+        collection = clients.collection(self.get_odm_class())
+        for operations in self.update_steps(updates):
+            async with clients.slots:
+                await collection.bulk_write(operations, ordered=False)
+        if returned:
+            await asyncio.to_thread(self.drop_chunks, returned)
+
+    def update_steps(self, updates: dict[Any, Any]) -> list[list[UpdateOne]]:
+        """
+        Returns the bulk operations of the updates, the n-th steps of all documents in the n-th list.
+        """
+        steps: list[list[UpdateOne]] = []
+        for _id, update in updates.items():
+            for index, step in enumerate(
+                update if isinstance(update, list) else [update]
+            ):
+                if index == len(steps):
+                    steps.append([])
+                steps[index].append(UpdateOne({"_id": _id}, self.update_document(step)))
+        return steps
+
+    def offload_updates(
+        self, updates: dict[Any, Any]
+    ) -> tuple[dict[Any, Any], list[Any]]:
+        """
+        Writes oversized whole values to the chunk store, leaving an emptied value field to $set.
+        Also returns the offloaded ids whose value is back under the threshold, their chunks are
+        to be dropped once the value is written inline.
+        """
+        if not self.OFFLOAD:
+            return updates, []
+        empty = self.empty_value()
+        inline_updates, returned = {}, []
+        for _id, update in updates.items():
+            inline_updates[_id] = update
+            if not isinstance(update, dict) or list(update) != [self.VALUE_FIELD]:
+                continue
+            value = update[self.VALUE_FIELD]
+            if self.should_offload(self.value_size(value)):
+                self.chunk_store.write_value(
+                    _id, value, self.redis_handler.config.config["offload_chunk_bytes"]
+                )
+                self.offloaded.add(_id)
+                inline_updates[_id] = {self.VALUE_FIELD: empty}
+            elif _id in self.offloaded:
+                returned.append(_id)
+        return inline_updates, returned
+
+    def drop_chunks(self, odm_ids: list[Any]) -> None:
+        self.chunk_store.delete(odm_ids)
+        self.offloaded.difference_update(odm_ids)
+
+    @staticmethod
+    def is_field_path_safe(field: str) -> bool:
+        """
+        Whether the field name can be part of a dotted update path.
+        """
+        return bool(field) and "." not in field and not field.startswith("$")
+
+    @staticmethod
+    def update_document(update: dict[str, Any]) -> dict[str, Any]:
+        if update and all(field.startswith("$") for field in update):
+            return update
+        return {"$set": update}
 
     def bulk_write_ops(
         self, operations, ordered, odm_override: type[BaseDocument] | None = None
     ):
         if not operations:
-            return
+            return None
         picked_odm = odm_override or self.get_odm_class()
-        picked_odm._get_collection().bulk_write(operations, ordered=ordered)
+        return picked_odm._get_collection().bulk_write(operations, ordered=ordered)
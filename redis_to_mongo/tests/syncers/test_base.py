@@ -285,3 +285,98 @@ def test_init_new_objects_needed(mongo_handler):
     assert "key2" in sync_strings.odm_ids
     assert StringODM.objects(key="key1").first() is not None
     assert StringODM.objects(key="key2").first() is not None
+
+
+def test_get_previous_values_batched(mongo_handler):
+    sync_strings = SyncStrings(None)
+    sync_strings.MONGO_READ_BATCH_SIZE = 2
+    ids = [
+        StringODM(key=f"key{i}", value=f"value{i}", active_now=True).save().id
+        for i in range(5)
+    ]
+    ids.append(StringODM(key="key_empty", active_now=True).save().id)
+    previous_values = sync_strings.get_previous_values(ids)
+    assert len(previous_values) == 6
+    for i in range(5):
+        assert previous_values[ids[i]] == f"value{i}"
+    assert previous_values[ids[-1]] is None
+
+
+def test_sync_structure_bulk_reactivation_and_deactivation(mongo_handler):
+    sync_strings = SyncStrings(None)
+    sync_strings.MONGO_READ_BATCH_SIZE = 7
+    StringODM(key="key0", value=None, active_now=False).save()
+    keys = [f"key{i}" for i in range(20)]
+    sync_strings.sync_structure(keys)
+    assert StringODM.objects.count() == 20
+    assert StringODM.objects(active_now=True).count() == 20
+    assert len(StringODM.objects(key="key0").first().activity_history) == 1
+    for key in keys:
+        assert sync_strings.odm_ids[key] == StringODM.objects(key=key).first().id
+
+    StringODM.objects(key="key5").update_one(set__value="stale")
+    sync_strings.sync_structure(keys[10:])
+    assert sorted(sync_strings.odm_ids) == sorted(keys[10:])
+    for key in keys[:10]:
+        odm = StringODM.objects(key=key).first()
+        assert odm.active_now is False
+        assert odm.value is None
+        assert odm.activity_history[-1]["active_now"] is False
+    assert StringODM.objects(active_now=True).count() == 10
+
+
+def test_sync_keys_only_touches_dirty_keys(mongo_handler, redis_handler):
+    sync_strings = SyncStrings(redis_handler)
+    for key in ["key1", "key2", "key3"]:
+        redis_handler.client.set(key, "value")
+    key_types = redis_handler.get_all_key_types()
+    sync_strings.init(key_types)
+    sync_strings.sync(key_types)
+
+    redis_handler.client.set("key1", "new_value")
+    redis_handler.client.set("key2", "new_value")
+    redis_handler.client.delete("key3")
+    redis_handler.client.set("key4", "value")
+    sync_strings.sync_keys({"key1": "string", "key3": "none", "key4": "string"})
+
+    assert StringODM.objects(key="key1").first().value == "new_value"
+    # key2 was not reported dirty, so it waits for the next full sync
+    assert StringODM.objects(key="key2").first().value == "value"
+    assert StringODM.objects(key="key3").first().active_now is False
+    assert StringODM.objects(key="key4").first().value == "value"
+    assert sorted(sync_strings.odm_ids) == ["key1", "key2", "key4"]
+
+
+def test_sync_structure_new_key_matches_save(mongo_handler):
+    sync_strings = SyncStrings(None)
+    sync_strings.sync_structure(["key1"])
+    saved = StringODM(key="key2", active_now=True).save()
+    written = StringODM.objects(key="key1").first().to_mongo().to_dict()
+    expected = StringODM.objects(id=saved.id).first().to_mongo().to_dict()
+    assert sorted(written) == sorted(expected)
+    assert [
+        {field: entry[field] for field in entry if field != "ts"}
+        for entry in written["activity_history"]
+    ] == [
+        {field: entry[field] for field in entry if field != "ts"}
+        for entry in expected["activity_history"]
+    ]
+
+
+def test_sync_structure_failed_write_keeps_state(mongo_handler, monkeypatch):
+    sync_strings = SyncStrings(None)
+    sync_strings.sync_structure(["key1"])
+    odm_ids = dict(sync_strings.odm_ids)
+
+    def failing_write(operations, ordered, odm_override=None):
+        raise RuntimeError("write failed")
+
+    monkeypatch.setattr(sync_strings, "bulk_write_ops", failing_write)
+    with pytest.raises(RuntimeError):
+        sync_strings.sync_structure(["key2"])
+    assert sync_strings.odm_ids == odm_ids
+    monkeypatch.undo()
+    sync_strings.sync_structure(["key2"])
+    assert sorted(sync_strings.odm_ids) == ["key2"]
+    assert sync_strings.odm_ids["key2"] == StringODM.objects(key="key2").first().id
+    assert StringODM.objects(key="key1").first().active_now is False
@@ -0,0 +1,113 @@
+import pytest
+
+from redis_to_mongo.syncers import SyncHashes
+from redis_to_mongo.mongo_models import HashODM
+
+
+@pytest.fixture
+def sync_hashes_fixture(mongo_handler, redis_handler):
+    return SyncHashes(redis_handler)
+
+
+def test_full_cycle(sync_hashes_fixture, redis_handler):
+    key_types = {"hash1": "hash"}
+    redis_handler.client.hset("hash1", mapping={"a": "1", "b": "2"})
+    sync_hashes_fixture.init(key_types)
+    sync_hashes_fixture.sync(key_types)
+    assert HashODM.objects(key="hash1").first().values == {"a": "1", "b": "2"}
+
+    redis_handler.client.hset("hash1", "c", "3")
+    redis_handler.client.hdel("hash1", "a")
+    sync_hashes_fixture.sync(key_types)
+    assert HashODM.objects(key="hash1").first().values == {"b": "2", "c": "3"}
+
+    redis_handler.client.delete("hash1")
+    sync_hashes_fixture.sync({})
+    hash_odm = HashODM.objects(key="hash1").first()
+    assert hash_odm.active_now is False
+    assert hash_odm.values == {}
+
+
+def test_field_level_updates(sync_hashes_fixture, redis_handler):
+    key_types = {"hash1": "hash"}
+    redis_handler.client.hset("hash1", mapping={f"f{i}": str(i) for i in range(10)})
+    sync_hashes_fixture.init(key_types)
+    sync_hashes_fixture.sync(key_types)
+
+    redis_handler.client.hset("hash1", "f1", "changed")
+    redis_handler.client.hdel("hash1", "f2")
+    odm_id = sync_hashes_fixture.odm_ids["hash1"]
+    assert sync_hashes_fixture._sync() == {
+        odm_id: {"$set": {"values.f1": "changed"}, "$unset": {"values.f2": ""}}
+    }
+
+    # field names that are not valid update paths replace the whole hash
+    redis_handler.client.hset("hash1", "a.b", "dotted")
+    assert sync_hashes_fixture._sync()[odm_id] == {
+        "values": redis_handler.client.hgetall("hash1")
+    }
+
+
+def test_large_hash_read_in_chunks(sync_hashes_fixture, redis_handler, monkeypatch):
+    monkeypatch.setitem(redis_handler.config.config, "hash_scan_count", 10)
+    fields = {f"field{i}": str(i) for i in range(1000)}
+    redis_handler.client.hset("hash1", mapping=fields)
+    redis_handler.client.hset("hash2", "small", "1")
+    assert redis_handler.get_hashes(["hash1", "hash2", "missing"]) == [
+        fields,
+        {"small": "1"},
+        {},
+    ]
+    assert redis_handler.take_round_trips() > 1
+
+
+def test_unchanged_hashes_backed_off(sync_hashes_fixture, redis_handler, monkeypatch):
+    monkeypatch.setitem(redis_handler.config.config, "key_backoff_max_rounds", 4)
+    key_types = {"hot": "hash", "cold": "hash"}
+    redis_handler.client.hset("hot", "a", "0")
+    redis_handler.client.hset("cold", "a", "0")
+    sync_hashes_fixture.init(key_types)
+    checked = []
+    select_keys = sync_hashes_fixture.select_keys
+    monkeypatch.setattr(
+        sync_hashes_fixture,
+        "select_keys",
+        lambda: checked.append(sorted(select_keys())) or checked[-1],
+    )
+    for round in range(5):
+        redis_handler.client.hset("hot", "a", str(round + 1))
+        sync_hashes_fixture.sync(key_types)
+    # the first round syncs cold, unchanged from the second it waits 2 rounds, then 4
+    assert checked == [
+        ["cold", "hot"],
+        ["cold", "hot"],
+        ["hot"],
+        ["cold", "hot"],
+        ["hot"],
+    ]
+    assert HashODM.objects(key="hot").first().values == {"a": "5"}
+
+
+def test_failed_write_rewritten_next_round(
+    sync_hashes_fixture, redis_handler, monkeypatch
+):
+    key_types = {"hash1": "hash", "hash2": "hash"}
+    redis_handler.client.hset("hash1", "a", "1")
+    redis_handler.client.hset("hash2", "a", "1")
+    sync_hashes_fixture.init(key_types)
+    sync_hashes_fixture.sync(key_types)
+
+    def failing_update(updates, ordered):
+        raise RuntimeError("write failed")
+
+    redis_handler.client.hset("hash1", "a", "2")
+    monkeypatch.setattr(sync_hashes_fixture, "bulk_update", failing_update)
+    with pytest.raises(RuntimeError):
+        sync_hashes_fixture.sync(key_types)
+    monkeypatch.undo()
+    # a round that doesn't compare hash1 must not mark its unwritten value as synced
+    redis_handler.client.hset("hash2", "a", "2")
+    sync_hashes_fixture.sync_keys({"hash2": "hash"})
+    sync_hashes_fixture.sync(key_types)
+    assert HashODM.objects(key="hash1").first().values == {"a": "2"}
+    assert HashODM.objects(key="hash2").first().values == {"a": "2"}
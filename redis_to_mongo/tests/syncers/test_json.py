@@ -92,3 +92,60 @@ def test_complex_nested_json_with_deletion(sync_jsons_fixture, data_dict):
     sync_jsons_fixture.redis_handler.client.json().set("key1", ".", deleted_values_json)
     sync_jsons_fixture.sync(key_types)
     assert JSONODM.objects(key="key1").first().value == deleted_values_json
+
+
+def test_path_level_updates(redis_handler, mongo_handler):
+    sync_jsons = SyncJSONs(redis_handler)
+    document = {
+        "counter": 1,
+        "profile": {"name": "a", "tags": ["x", "y"], "bio": "b" * 100},
+        "items": [{"id": 1, "qty": 1}, {"id": 2, "qty": 1}],
+    }
+    redis_handler.client.json().set("key1", ".", document)
+    sync_jsons.init({"key1": "ReJSON-RL"})
+    sync_jsons.sync({"key1": "ReJSON-RL"})
+    odm_id = sync_jsons.odm_ids["key1"]
+
+    redis_handler.client.json().numincrby("key1", ".counter", 1)
+    redis_handler.client.json().set("key1", ".items[1].qty", 5)
+    redis_handler.client.json().delete("key1", ".profile.name")
+    assert sync_jsons._sync() == {
+        odm_id: {
+            "$set": {"value.counter": 2, "value.items.1.qty": 5},
+            "$unset": {"value.profile.name": ""},
+        }
+    }
+    sync_jsons.sync({"key1": "ReJSON-RL"})
+    document["counter"] = 2
+    document["items"][1]["qty"] = 5
+    del document["profile"]["name"]
+    assert JSONODM.objects(id=odm_id).first().value == document
+
+    # reordered arrays replace the document
+    redis_handler.client.json().set("key1", ".profile.tags", ["y", "x"])
+    document["profile"]["tags"] = ["y", "x"]
+    assert sync_jsons._sync() == {odm_id: {"value": document}}
+
+    # so do diffs bigger than the document
+    redis_handler.client.json().set("key1", ".", {"counter": 3})
+    assert sync_jsons._sync() == {odm_id: {"value": {"counter": 3}}}
+
+
+def test_oversized_json_offloaded_to_chunks(redis_handler, mongo_handler, monkeypatch):
+    monkeypatch.setitem(redis_handler.config.config, "offload_threshold_bytes", 100)
+    monkeypatch.setitem(redis_handler.config.config, "offload_chunk_bytes", 40)
+    sync_jsons = SyncJSONs(redis_handler)
+    document = {"counter": 1, "blob": "x" * 200}
+    redis_handler.client.json().set("key1", ".", document)
+    sync_jsons.init({"key1": "ReJSON-RL"})
+    sync_jsons.sync({"key1": "ReJSON-RL"})
+    odm_id = sync_jsons.odm_ids["key1"]
+    assert JSONODM.objects(id=odm_id).first().value is None
+    assert sync_jsons.chunk_store.read_value(odm_id) == document
+
+    # offloaded documents are rewritten whole instead of path by path
+    redis_handler.client.json().numincrby("key1", ".counter", 1)
+    document["counter"] = 2
+    assert sync_jsons._sync() == {odm_id: {"value": document}}
+    sync_jsons.sync({"key1": "ReJSON-RL"})
+    assert sync_jsons.chunk_store.read_value(odm_id) == document
@@ -0,0 +1,33 @@
+from redis_to_mongo.syncers.key_scheduler import KeyScheduler
+
+
+def test_unchanged_keys_back_off_and_changed_keys_reset():
+    scheduler = KeyScheduler(max_interval=4)
+    scheduler.add(["hot", "cold"])
+    checked = {"hot": [], "cold": []}
+    for round in range(1, 13):
+        for key in scheduler.pop_due():
+            checked[key].append(round)
+            scheduler.record(key, changed=key == "hot")
+    assert checked["hot"] == list(range(1, 13))
+    # intervals of 2, 4, then capped at 4
+    assert checked["cold"] == [1, 3, 7, 11]
+
+    scheduler.record("cold", changed=True)
+    assert sorted(scheduler.pop_due()) == ["cold", "hot"]
+
+
+def test_removed_keys_are_not_due():
+    scheduler = KeyScheduler(max_interval=4)
+    scheduler.add(["key1", "key2"])
+    scheduler.remove(["key1"])
+    assert scheduler.pop_due() == ["key2"]
+    assert len(scheduler) == 1
+
+
+def test_keys_stay_scheduled_without_record():
+    scheduler = KeyScheduler(max_interval=4)
+    scheduler.add(["key1"])
+    assert scheduler.pop_due() == ["key1"]
+    # the round failed before recording anything
+    assert scheduler.pop_due() == ["key1"]
@@ -1,8 +1,10 @@
+import bson
 import pytest
 
 from redis_to_mongo.tests.conftest import redis_populate_all, data_dict, mongo_handler
 from redis_to_mongo.syncers import SyncLists
-from redis_to_mongo.mongo_models import ListODM
+from redis_to_mongo.syncers.shadow_cache import ShadowCache
+from redis_to_mongo.mongo_models import ListODM, ValueChunkODM, ValueManifestODM
 from pymongo import UpdateOne
 
 
@@ -85,3 +87,207 @@ def test_change_one_among_many(sync_lists_fixture, data_dict):
         "changed_value",
         "value3",
     ]
+
+
+def test_large_list_synced_in_chunks(redis_handler, mongo_handler, monkeypatch):
+    monkeypatch.setitem(redis_handler.config.config, "large_collection_threshold", 5)
+    monkeypatch.setitem(redis_handler.config.config, "collection_chunk_size", 4)
+    sync_lists = SyncLists(redis_handler)
+    redis_handler.client.rpush("key1", *[f"value{i}" for i in range(11)])
+    redis_handler.client.rpush("key2", "small")
+    key_types = {"key1": "list", "key2": "list"}
+    sync_lists.init(key_types)
+    sync_lists.sync(key_types)
+    assert ListODM.objects(key="key1").first().values == [
+        f"value{i}" for i in range(11)
+    ]
+    assert ListODM.objects(key="key2").first().values == ["small"]
+    assert sync_lists.changes_processed == 2
+
+    # unchanged large keys are only digested, also after a restart
+    sync_lists.sync(key_types)
+    sync_lists = SyncLists(redis_handler)
+    sync_lists.init(key_types)
+    sync_lists.sync(key_types)
+    assert sync_lists.changes_processed == 0
+
+    redis_handler.client.lset("key1", 9, "changed")
+    sync_lists.sync(key_types)
+    assert ListODM.objects(key="key1").first().values[9] == "changed"
+    assert sync_lists.changes_processed == 1
+
+
+def test_appends_and_head_trims_are_pushed(redis_handler, mongo_handler):
+    sync_lists = SyncLists(redis_handler)
+    redis_handler.client.rpush("key1", "a", "b", "c", "a")
+    sync_lists.init({"key1": "list"})
+    sync_lists.sync({"key1": "list"})
+    odm_id = sync_lists.odm_ids["key1"]
+
+    redis_handler.client.rpush("key1", "d", "e")
+    assert sync_lists._sync() == {odm_id: {"$push": {"values": {"$each": ["d", "e"]}}}}
+    sync_lists.sync({"key1": "list"})
+
+    # a capped log: trimmed at the head, then appended to
+    redis_handler.client.ltrim("key1", 2, -1)
+    redis_handler.client.rpush("key1", "f")
+    assert sync_lists._sync() == {
+        odm_id: {"$push": {"values": {"$each": ["f"], "$slice": -5}}}
+    }
+    sync_lists.sync({"key1": "list"})
+    assert ListODM.objects(id=odm_id).first().values == ["c", "a", "d", "e", "f"]
+
+    redis_handler.client.ltrim("key1", 3, -1)
+    sync_lists.sync({"key1": "list"})
+    assert ListODM.objects(id=odm_id).first().values == ["e", "f"]
+
+    # the same after a restart, compared to the stored list
+    sync_lists = SyncLists(redis_handler)
+    sync_lists.init({"key1": "list"})
+    redis_handler.client.rpush("key1", "g")
+    assert sync_lists._sync() == {odm_id: {"$push": {"values": {"$each": ["g"]}}}}
+
+    # anything else is rewritten
+    redis_handler.client.lset("key1", 0, "changed")
+    assert sync_lists._sync() == {odm_id: {"values": ["changed", "f", "g"]}}
+
+
+def test_trim_checks_the_whole_kept_region(redis_handler, mongo_handler, monkeypatch):
+    previous = [f"p{i}" for i in range(10)]
+    current = ["X"] + previous[2:]
+    for large_collection_threshold in [0, 5]:
+        monkeypatch.setitem(
+            redis_handler.config.config,
+            "large_collection_threshold",
+            large_collection_threshold,
+        )
+        redis_handler.client.delete("key1")
+        redis_handler.client.rpush("key1", *previous)
+        sync_lists = SyncLists(redis_handler)
+        sync_lists.init({"key1": "list"})
+        sync_lists.sync({"key1": "list"})
+        odm_id = sync_lists.odm_ids["key1"]
+
+        # the last TAIL_CHECK_SIZE elements match a trim of p0, the changed head doesn't
+        redis_handler.client.lpop("key1", 2)
+        redis_handler.client.lpush("key1", "X")
+        sync_lists.sync({"key1": "list"})
+        assert ListODM.objects(id=odm_id).first().values == current
+
+        # also when compared to the stored list after a restart
+        redis_handler.client.delete("key1")
+        redis_handler.client.rpush("key1", *previous)
+        sync_lists.sync({"key1": "list"})
+        sync_lists = SyncLists(redis_handler)
+        sync_lists.init({"key1": "list"})
+        redis_handler.client.lpop("key1", 2)
+        redis_handler.client.lpush("key1", "X")
+        sync_lists.sync({"key1": "list"})
+        assert ListODM.objects(id=odm_id).first().values == current
+
+
+def test_large_list_appends_and_head_trims_in_chunks(
+    redis_handler, mongo_handler, monkeypatch
+):
+    monkeypatch.setitem(redis_handler.config.config, "large_collection_threshold", 5)
+    monkeypatch.setitem(redis_handler.config.config, "collection_chunk_size", 4)
+    sync_lists = SyncLists(redis_handler)
+    redis_handler.client.rpush("key1", *[f"value{i}" for i in range(11)])
+    sync_lists.init({"key1": "list"})
+    sync_lists.sync({"key1": "list"})
+
+    written = []
+    bulk_write_ops = sync_lists.bulk_write_ops
+    monkeypatch.setattr(
+        sync_lists,
+        "bulk_write_ops",
+        lambda operations, ordered: written.extend(operations)
+        or bulk_write_ops(operations, ordered),
+    )
+    redis_handler.client.ltrim("key1", 3, -1)
+    redis_handler.client.rpush("key1", *[f"value{i}" for i in range(11, 16)])
+    sync_lists.sync({"key1": "list"})
+    assert ListODM.objects(key="key1").first().values == [
+        f"value{i}" for i in range(3, 16)
+    ]
+    # one trim and two chunks of appended values, nothing rewritten
+    assert len(written) == 3
+    assert sync_lists.changes_processed == 2
+
+    sync_lists = SyncLists(redis_handler)
+    sync_lists.init({"key1": "list"})
+    redis_handler.client.rpush("key1", "value16")
+    sync_lists.sync({"key1": "list"})
+    assert ListODM.objects(key="key1").first().values == [
+        f"value{i}" for i in range(3, 17)
+    ]
+
+
+def test_oversized_list_offloaded_to_chunks(redis_handler, mongo_handler, monkeypatch):
+    monkeypatch.setitem(redis_handler.config.config, "offload_threshold_bytes", 100)
+    monkeypatch.setitem(redis_handler.config.config, "offload_chunk_bytes", 40)
+    sync_lists = SyncLists(redis_handler)
+    values = [f"value{i}" for i in range(20)]
+    redis_handler.client.rpush("key1", *values)
+    sync_lists.init({"key1": "list"})
+    sync_lists.sync({"key1": "list"})
+    odm_id = sync_lists.odm_ids["key1"]
+    assert ListODM.objects(id=odm_id).first().values == []
+    assert sync_lists.chunk_store.read_value(odm_id) == values
+    assert ValueChunkODM.objects(owner=odm_id).count() > 1
+
+    # appends to an offloaded list rewrite its chunks, also after a restart
+    sync_lists = SyncLists(redis_handler)
+    sync_lists.init({"key1": "list"})
+    redis_handler.client.rpush("key1", "value20")
+    sync_lists.sync({"key1": "list"})
+    assert sync_lists.chunk_store.read_value(odm_id) == values + ["value20"]
+    assert ListODM.objects(id=odm_id).first().values == []
+
+    # back under the threshold the list is stored inline again
+    redis_handler.client.ltrim("key1", -2, -1)
+    sync_lists.sync({"key1": "list"})
+    assert ListODM.objects(id=odm_id).first().values == ["value19", "value20"]
+    assert ValueManifestODM.objects(owner=odm_id).count() == 0
+    assert ValueChunkODM.objects(owner=odm_id).count() == 0
+
+
+def test_large_list_offloaded_in_chunks(redis_handler, mongo_handler, monkeypatch):
+    monkeypatch.setitem(redis_handler.config.config, "large_collection_threshold", 5)
+    monkeypatch.setitem(redis_handler.config.config, "collection_chunk_size", 4)
+    monkeypatch.setitem(redis_handler.config.config, "offload_threshold_bytes", 100)
+    sync_lists = SyncLists(redis_handler)
+    values = [f"value{i}" for i in range(20)]
+    redis_handler.client.rpush("key1", *values)
+    sync_lists.init({"key1": "list"})
+    sync_lists.sync({"key1": "list"})
+    odm_id = sync_lists.odm_ids["key1"]
+    assert ListODM.objects(id=odm_id).first().values == []
+    assert sync_lists.chunk_store.read_value(odm_id) == values
+
+    sync_lists = SyncLists(redis_handler)
+    sync_lists.init({"key1": "list"})
+    sync_lists.sync({"key1": "list"})
+    assert sync_lists.changes_processed == 0
+
+
+def test_offload_threshold_counts_bson_bytes(redis_handler, mongo_handler, monkeypatch):
+    values = ["v"] * 1000
+    # short members take several times their compact JSON size in BSON
+    assert len(ShadowCache.encode(values)) < 6000 < len(bson.encode({"values": values}))
+    monkeypatch.setitem(redis_handler.config.config, "offload_threshold_bytes", 6000)
+    redis_handler.client.rpush("key1", *values)
+    for large_collection_threshold in [0, 500]:
+        monkeypatch.setitem(
+            redis_handler.config.config,
+            "large_collection_threshold",
+            large_collection_threshold,
+        )
+        sync_lists = SyncLists(redis_handler)
+        sync_lists.init({"key1": "list"})
+        sync_lists.sync({"key1": "list"})
+        odm_id = sync_lists.odm_ids["key1"]
+        assert odm_id in sync_lists.offloaded
+        assert sync_lists.chunk_store.read_value(odm_id) == values
+        sync_lists.drop_chunks([odm_id])
+        ListODM.objects(id=odm_id).update_one(set__values=[])
@@ -75,3 +75,131 @@ def test_remove_all_items_one_by_one(sync_sets_fixture, data_dict):
     sync_sets_fixture.redis_handler.client.srem("key1", "new_value2")
     sync_sets_fixture.sync({"key1": "set"})
     assert SetODM.objects(id=odm_id).first().values == []
+
+
+def test_large_set_synced_in_chunks(redis_handler, mongo_handler, monkeypatch):
+    monkeypatch.setitem(redis_handler.config.config, "large_collection_threshold", 5)
+    monkeypatch.setitem(redis_handler.config.config, "collection_chunk_size", 4)
+    sync_sets = SyncSets(redis_handler)
+    members = {f"member{i}" for i in range(50)}
+    redis_handler.client.sadd("key1", *members)
+    key_types = {"key1": "set"}
+    sync_sets.init(key_types)
+    sync_sets.sync(key_types)
+    assert set(SetODM.objects(key="key1").first().values) == members
+
+    redis_handler.client.srem("key1", "member3")
+    sync_sets.sync(key_types)
+    assert set(SetODM.objects(key="key1").first().values) == members - {"member3"}
+
+
+def test_changed_members_are_added_and_pulled(redis_handler, mongo_handler):
+    sync_sets = SyncSets(redis_handler)
+    redis_handler.client.sadd("key1", *[f"member{i}" for i in range(6)])
+    sync_sets.init({"key1": "set"})
+    sync_sets.sync({"key1": "set"})
+    odm_id = sync_sets.odm_ids["key1"]
+
+    redis_handler.client.srem("key1", "member0")
+    redis_handler.client.sadd("key1", "member6", "member7")
+    pull, add = sync_sets._sync()[odm_id]
+    assert pull == {"$pull": {"values": {"$in": ["member0"]}}}
+    assert sorted(add["$addToSet"]["values"]["$each"]) == ["member6", "member7"]
+    sync_sets.changes_processed = 0
+    sync_sets.sync({"key1": "set"})
+    assert sorted(SetODM.objects(id=odm_id).first().values) == [
+        f"member{i}" for i in range(1, 8)
+    ]
+    assert sync_sets.changes_processed == 3
+
+
+def test_member_steps_written_unordered(redis_handler, mongo_handler, monkeypatch):
+    sync_sets = SyncSets(redis_handler)
+    for key in ["key1", "key2"]:
+        redis_handler.client.sadd(key, *[f"member{i}" for i in range(6)])
+    key_types = {"key1": "set", "key2": "set"}
+    sync_sets.init(key_types)
+    sync_sets.sync(key_types)
+
+    redis_handler.client.srem("key1", "member0")
+    redis_handler.client.sadd("key1", "member6")
+    redis_handler.client.sadd("key2", "member6")
+    writes = []
+    bulk_write_ops = sync_sets.bulk_write_ops
+    monkeypatch.setattr(
+        sync_sets,
+        "bulk_write_ops",
+        lambda operations, ordered, odm_override=None: writes.append(
+            (len(operations), ordered)
+        )
+        or bulk_write_ops(operations, ordered, odm_override),
+    )
+    sync_sets.sync(key_types)
+    # key1's $pull, then its $addToSet, key2 only needs one step
+    assert writes == [(2, False), (1, False)]
+    assert sorted(SetODM.objects(key="key1").first().values) == [
+        f"member{i}" for i in range(1, 7)
+    ]
+    assert len(SetODM.objects(key="key2").first().values) == 7
+
+
+def test_large_set_rewritten_in_one_write(redis_handler, mongo_handler, monkeypatch):
+    monkeypatch.setitem(redis_handler.config.config, "large_collection_threshold", 5)
+    sync_sets = SyncSets(redis_handler)
+    members = [f"member{i}" for i in range(10)]
+    redis_handler.client.sadd("key1", *members)
+    # SSCAN returning members twice (e.g. during a rehash)
+    monkeypatch.setattr(
+        redis_handler,
+        "iter_set_chunks",
+        lambda key: iter([members[:6], members[3:]]),
+    )
+    sync_sets.init({"key1": "set"})
+    writes = []
+    bulk_write_ops = sync_sets.bulk_write_ops
+    monkeypatch.setattr(
+        sync_sets,
+        "bulk_write_ops",
+        lambda operations, ordered, odm_override=None: writes.extend(operations)
+        or bulk_write_ops(operations, ordered, odm_override),
+    )
+    sync_sets.sync({"key1": "set"})
+    # the whole value in a single $set, readers never see it emptied or partly written
+    assert len(writes) == 1
+    assert sorted(SetODM.objects(key="key1").first().values) == members
+
+    writes.clear()
+    sync_sets.shadow.clear()
+    sync_sets.changes_processed = 0
+    sync_sets.sync({"key1": "set"})
+    assert writes == []
+    assert sync_sets.changes_processed == 0
+
+
+def test_unchanged_large_set_digest_holds_no_members(
+    redis_handler, mongo_handler, monkeypatch
+):
+    monkeypatch.setitem(redis_handler.config.config, "large_collection_threshold", 5)
+    monkeypatch.setitem(redis_handler.config.config, "collection_chunk_size", 50)
+    sync_sets = SyncSets(redis_handler)
+    redis_handler.client.sadd("key1", *(f"member{i}" for i in range(1000)))
+    sync_sets.init({"key1": "set"})
+    sync_sets.sync({"key1": "set"})
+
+    digests = []
+    new_stream_digest = sync_sets.new_stream_digest
+    monkeypatch.setattr(
+        sync_sets,
+        "new_stream_digest",
+        lambda dedupe=False: digests.append(new_stream_digest(dedupe)) or digests[-1],
+    )
+    for clear_shadow in [False, True]:
+        if clear_shadow:
+            sync_sets.shadow.clear()  # compared against the stored members instead
+        redis_handler.take_round_trips()
+        sync_sets.changes_processed = 0
+        sync_sets.sync({"key1": "set"})
+        assert sync_sets.changes_processed == 0
+        # one SCARD, then a single SSCAN pass without keeping the members seen
+        assert redis_handler.take_round_trips() <= 1 + 1000 // 50 + 1
+    assert digests and all(digest.seen is None for digest in digests)
@@ -0,0 +1,57 @@
+from redis_to_mongo.syncers.shadow_cache import ShadowCache, StreamDigest
+
+
+def test_digest_is_compact_and_stable():
+    digest = ShadowCache.digest({"b": [1, 2], "a": "x"})
+    assert len(digest) == ShadowCache.DIGEST_SIZE
+    assert digest == ShadowCache.digest({"a": "x", "b": [1, 2]})
+    assert digest != ShadowCache.digest({"a": "x", "b": [2, 1]})
+    assert ShadowCache.digest(None) != ShadowCache.digest("")
+
+
+def test_put_get_pop():
+    cache = ShadowCache(max_entries=10)
+    cache.put("key1", ShadowCache.digest("value1"))
+    assert cache.get("key1") == ShadowCache.digest("value1")
+    cache.pop("key1")
+    assert cache.get("key1") is None
+    cache.pop("missing")
+    assert len(cache) == 0
+
+
+def test_memory_cap_keeps_cached_keys():
+    cache = ShadowCache(max_entries=2)
+    cache.put("key1", ShadowCache.digest("value1"))
+    cache.put("key2", ShadowCache.digest("value2"))
+    cache.put("key3", ShadowCache.digest("value3"))
+    assert len(cache) == 2
+    assert cache.get("key3") is None
+    # already cached keys are still updated once the cap is reached
+    cache.put("key1", ShadowCache.digest("new_value1"))
+    assert cache.get("key1") == ShadowCache.digest("new_value1")
+
+
+def test_stream_digest_matches_whole_value():
+    values = [f"member{i}" for i in range(10)]
+    ordered = StreamDigest()
+    ordered.update(values[:3])
+    ordered.update(values[3:])
+    assert ordered.digest() == ShadowCache.digest(values)
+    assert StreamDigest().digest() == ShadowCache.digest([])
+    assert ShadowCache.unordered_digest(values) == ShadowCache.unordered_digest(
+        values[::-1]
+    )
+    assert ShadowCache.unordered_digest(values) != ShadowCache.unordered_digest(
+        values[1:]
+    )
+    # scans may return a member twice, a dedupe digest counts it once
+    unordered = StreamDigest(ordered=False)
+    unordered.update(values[:6])
+    unordered.update(values[4:])
+    assert unordered.count == len(values) + 2
+    assert unordered.seen is None
+    deduped = StreamDigest(ordered=False, dedupe=True)
+    deduped.update(values[:6])
+    assert deduped.update(values[4:]) == values[6:]
+    assert deduped.digest() == ShadowCache.unordered_digest(values)
+    assert deduped.count == len(values)
@@ -7,6 +7,7 @@ from redis_to_mongo.tests.conftest import (
 )
 from redis_to_mongo.mongo_models import StreamODM, StreamMessageODM
 from redis_to_mongo.syncers.sync_stream import SyncStreams
+from redis_to_mongo.syncers.sync_stream_group import SyncStreamsGroup
 
 
 @pytest.fixture
@@ -203,3 +204,128 @@ def test_sync_stream_with_redis_deletion_active_test(
     assert stream_odm.active_now is False
     assert len(stream_odm.activity_history) == 1
     assert stream_odm.activity_history[0]["active_now"] is False
+
+
+def test_sync_drains_backlog_in_one_round(redis_handler, mongo_handler, monkeypatch):
+    monkeypatch.setitem(redis_handler.config.config, "messages_per_stream", 2)
+    for i in range(7):
+        redis_handler.client.xadd("test:stream", {"message": f"message{i}"})
+    syncer = SyncStreams(redis_handler)
+    key_types = redis_handler.get_all_key_types()
+    syncer.init(key_types)
+    syncer.sync(key_types)
+    stream_odm = StreamODM.objects(key="test:stream").first()
+    assert StreamMessageODM.objects(stream=stream_odm).count() == 7
+    assert syncer.backlogs == {}
+
+
+def test_sync_reports_backlog_when_budget_spent(
+    redis_handler, mongo_handler, monkeypatch
+):
+    monkeypatch.setitem(redis_handler.config.config, "messages_per_stream", 2)
+    monkeypatch.setitem(redis_handler.config.config, "stream_drain_max_messages", 4)
+    for i in range(7):
+        redis_handler.client.xadd("test:stream", {"message": f"message{i}"})
+    syncer = SyncStreams(redis_handler)
+    key_types = redis_handler.get_all_key_types()
+    syncer.init(key_types)
+    syncer.sync(key_types)
+    stream_odm = StreamODM.objects(key="test:stream").first()
+    assert StreamMessageODM.objects(stream=stream_odm).count() == 4
+    assert "test:stream" in syncer.backlogs
+    syncer.sync(key_types)
+    assert StreamMessageODM.objects(stream=stream_odm).count() == 7
+    assert syncer.backlogs == {}
+
+
+def test_group_workers_share_messages(redis_handler, mongo_handler, monkeypatch):
+    monkeypatch.setitem(redis_handler.config.config, "messages_per_stream", 2)
+    for i in range(3):
+        redis_handler.client.xadd("test:stream", {"message": f"message{i}"})
+    key_types = redis_handler.get_all_key_types()
+    workers = []
+    for name in ["worker-a", "worker-b"]:
+        monkeypatch.setitem(redis_handler.config.config, "stream_consumer_name", name)
+        worker = SyncStreamsGroup(redis_handler)
+        worker.init(key_types)
+        workers.append(worker)
+    workers[0].sync(key_types)
+    for i in range(3, 5):
+        redis_handler.client.xadd("test:stream", {"message": f"message{i}"})
+    workers[1].sync(key_types)
+    stream_odm = StreamODM.objects(key="test:stream").first()
+    messages = StreamMessageODM.objects(stream=stream_odm)
+    assert messages.count() == 5
+    assert len({message.rid for message in messages}) == 5
+    assert (
+        redis_handler.client.xpending("test:stream", "redis_to_mongo")["pending"] == 0
+    )
+
+
+def test_group_reclaims_pending_of_crashed_worker(
+    redis_handler, mongo_handler, monkeypatch
+):
+    monkeypatch.setitem(redis_handler.config.config, "stream_claim_min_idle_ms", 0)
+    redis_handler.client.xadd("test:stream", {"message": "message0"})
+    key_types = redis_handler.get_all_key_types()
+    syncer = SyncStreamsGroup(redis_handler)
+    syncer.init(key_types)
+    # a crashed worker read the message but never wrote or acked it
+    redis_handler.client.xreadgroup(
+        "redis_to_mongo", "crashed", {"test:stream": ">"}, count=10
+    )
+    syncer.sync(key_types)
+    stream_odm = StreamODM.objects(key="test:stream").first()
+    assert StreamMessageODM.objects(stream=stream_odm).count() == 1
+    assert (
+        redis_handler.client.xpending("test:stream", "redis_to_mongo")["pending"] == 0
+    )
+
+
+def test_resync_after_lost_checkpoint_does_not_duplicate(redis_handler, mongo_handler):
+    for i in range(3):
+        redis_handler.client.xadd("test:stream", {"message": f"message{i}"})
+    syncer = SyncStreams(redis_handler)
+    key_types = redis_handler.get_all_key_types()
+    syncer.init(key_types)
+    syncer.sync(key_types)
+    # a crash before the checkpoint got saved
+    StreamODM.objects(key="test:stream").update_one(set__last_redis_read_id="0-0")
+    syncer = SyncStreams(redis_handler)
+    syncer.init(key_types)
+    syncer.sync(key_types)
+    stream_odm = StreamODM.objects(key="test:stream").first()
+    assert StreamMessageODM.objects(stream=stream_odm).count() == 3
+    assert (
+        stream_odm.last_redis_read_id
+        == redis_handler.client.xrange("test:stream")[-1][0]
+    )
+
+
+def test_checkpoint_stops_before_failed_message(
+    redis_handler, mongo_handler, monkeypatch
+):
+    rids = [
+        redis_handler.client.xadd("test:stream", {"message": f"message{i}"})
+        for i in range(3)
+    ]
+    syncer = SyncStreams(redis_handler)
+    key_types = redis_handler.get_all_key_types()
+    syncer.init(key_types)
+    insert_messages = syncer.insert_messages
+
+    def fail_second_message(documents):
+        failed = [i for i, doc in enumerate(documents) if doc["rid"] == rids[1]]
+        insert_messages([doc for doc in documents if doc["rid"] != rids[1]])
+        return failed
+
+    monkeypatch.setattr(syncer, "insert_messages", fail_second_message)
+    syncer.sync(key_types)
+    stream_odm = StreamODM.objects(key="test:stream").first()
+    assert stream_odm.last_redis_read_id == rids[0]
+    assert StreamMessageODM.objects(stream=stream_odm).count() == 2
+    monkeypatch.undo()
+    syncer.sync(key_types)
+    stream_odm = StreamODM.objects(key="test:stream").first()
+    assert stream_odm.last_redis_read_id == rids[2]
+    assert StreamMessageODM.objects(stream=stream_odm).count() == 3
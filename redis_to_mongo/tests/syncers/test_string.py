@@ -53,3 +53,21 @@ def test_full_cycle(sync_strings_fixture, data_dict):
     # Step 6: Sync again with the original keys and check the value of "key1"
     sync_strings_fixture.sync({"key1": "string", "key2": "list"})
     assert StringODM.objects(key="key1").first().value == "new_value_INVISIBLE"
+
+
+def test_shadow_skips_mongo_reads(mongo_handler, redis_handler, monkeypatch):
+    sync_strings_fixture = SyncStrings(redis_handler)
+    key_types = {"key1": "string"}
+    sync_strings_fixture.redis_handler.client.set("key1", "value1")
+    sync_strings_fixture.init(key_types)
+    sync_strings_fixture.sync(key_types)
+    assert StringODM.objects(key="key1").first().value == "value1"
+
+    def fail_read(odm_ids):
+        raise AssertionError("shadow hit should not read mongo")
+
+    monkeypatch.setattr(sync_strings_fixture, "get_previous_values", fail_read)
+    sync_strings_fixture.sync(key_types)
+    sync_strings_fixture.redis_handler.client.set("key1", "value2")
+    sync_strings_fixture.sync(key_types)
+    assert StringODM.objects(key="key1").first().value == "value2"
@@ -2,7 +2,7 @@ import pytest
 
 from redis_to_mongo.tests.conftest import redis_populate_all, data_dict, mongo_handler
 from redis_to_mongo.syncers import SyncZSets
-from redis_to_mongo.mongo_models import ZSetODM
+from redis_to_mongo.mongo_models import ValueChunkODM, ValueManifestODM, ZSetODM
 
 
 @pytest.fixture
@@ -94,3 +94,97 @@ def test_remove_all_items_one_by_one(sync_zsets_fixture, data_dict):
     sync_zsets_fixture.redis_handler.client.zrem("key1", "new_value2")
     sync_zsets_fixture.sync({"key1": "zset"})
     assert ZSetODM.objects(id=odm_id).first().values == []
+
+
+def test_large_zset_synced_in_chunks(redis_handler, mongo_handler, monkeypatch):
+    monkeypatch.setitem(redis_handler.config.config, "large_collection_threshold", 5)
+    monkeypatch.setitem(redis_handler.config.config, "collection_chunk_size", 4)
+    sync_zsets = SyncZSets(redis_handler)
+    redis_handler.client.zadd("key1", {f"member{i}": i for i in range(10)})
+    key_types = {"key1": "zset"}
+    sync_zsets.init(key_types)
+    sync_zsets.sync(key_types)
+    assert ZSetODM.objects(key="key1").first().values == [
+        {"key": f"member{i}", "score": i} for i in range(10)
+    ]
+    assert sync_zsets.shadow.get("key1") == sync_zsets.value_digest(
+        redis_handler.get_ordered_set("key1")
+    )
+
+
+def test_changed_members_are_pulled_and_pushed_in_order(redis_handler, mongo_handler):
+    sync_zsets = SyncZSets(redis_handler)
+    redis_handler.client.zadd("key1", {f"member{i}": i for i in range(6)})
+    sync_zsets.init({"key1": "zset"})
+    sync_zsets.sync({"key1": "zset"})
+    odm_id = sync_zsets.odm_ids["key1"]
+
+    redis_handler.client.zrem("key1", "member0")
+    redis_handler.client.zadd("key1", {"member5": 1.5, "member6": 2})
+    assert sync_zsets._sync() == {
+        odm_id: [
+            {"$pull": {"values": {"key": {"$in": ["member0", "member5"]}}}},
+            {
+                "$push": {
+                    "values": {
+                        "$each": [
+                            {"key": "member5", "score": 1.5},
+                            {"key": "member6", "score": 2.0},
+                        ],
+                        "$sort": {"score": 1, "key": 1},
+                    }
+                }
+            },
+        ]
+    }
+    sync_zsets.changes_processed = 0
+    sync_zsets.sync({"key1": "zset"})
+    assert ZSetODM.objects(id=odm_id).first().values == [
+        {"key": "member1", "score": 1.0},
+        {"key": "member5", "score": 1.5},
+        {"key": "member2", "score": 2.0},
+        {"key": "member6", "score": 2.0},
+        {"key": "member3", "score": 3.0},
+        {"key": "member4", "score": 4.0},
+    ]
+    assert sync_zsets.changes_processed == 3
+
+
+def test_oversized_zset_offloaded_to_chunks(redis_handler, mongo_handler, monkeypatch):
+    monkeypatch.setitem(redis_handler.config.config, "offload_threshold_bytes", 300)
+    monkeypatch.setitem(redis_handler.config.config, "offload_chunk_bytes", 100)
+    sync_zsets = SyncZSets(redis_handler)
+    redis_handler.client.zadd("key1", {f"member{i}": i for i in range(20)})
+    sync_zsets.init({"key1": "zset"})
+    sync_zsets.sync({"key1": "zset"})
+    odm_id = sync_zsets.odm_ids["key1"]
+    assert ZSetODM.objects(id=odm_id).first().values == []
+    assert sync_zsets.chunk_store.read_value(odm_id) == redis_handler.get_ordered_set(
+        "key1"
+    )
+    assert ValueChunkODM.objects(owner=odm_id).count() > 1
+
+    # member changes of an offloaded zset rewrite its chunks
+    redis_handler.client.zadd("key1", {"member20": 20})
+    sync_zsets.sync({"key1": "zset"})
+    assert sync_zsets.chunk_store.read_value(odm_id) == redis_handler.get_ordered_set(
+        "key1"
+    )
+
+    # large keys streamed in chunks are offloaded the same way
+    monkeypatch.setitem(redis_handler.config.config, "large_collection_threshold", 5)
+    monkeypatch.setitem(redis_handler.config.config, "collection_chunk_size", 4)
+    redis_handler.client.zadd("key1", {"member21": 21})
+    sync_zsets.sync({"key1": "zset"})
+    assert ZSetODM.objects(id=odm_id).first().values == []
+    assert sync_zsets.chunk_store.read_value(odm_id) == redis_handler.get_ordered_set(
+        "key1"
+    )
+
+    redis_handler.client.zremrangebyrank("key1", 0, -3)
+    sync_zsets.sync({"key1": "zset"})
+    assert ZSetODM.objects(id=odm_id).first().values == [
+        {"key": "member20", "score": 20.0},
+        {"key": "member21", "score": 21.0},
+    ]
+    assert ValueManifestODM.objects(owner=odm_id).count() == 0
@@ -0,0 +1,25 @@
+import pytest
+
+from redis_to_mongo.config_loader import RedisConfig, SyncerConfig
+from redis_to_mongo.constants import TEST_CONFIG_ENV
+
+
+@pytest.mark.parametrize(
+    "env_var, config_class, value",
+    [
+        ("SYNC_MODE", SyncerConfig, "notify"),
+        ("STREAM_MODE", SyncerConfig, "group"),
+        ("SYNC_ENGINE", SyncerConfig, "async"),
+        ("KEY_SCAN_MODE", SyncerConfig, "typed"),
+        ("REDIS_MODE", RedisConfig, "cluster"),
+        ("CLUSTER_SCAN_NODES", RedisConfig, "replicas"),
+    ],
+)
+def test_enum_settings_accept_only_their_values(
+    env_var, config_class, value, monkeypatch
+):
+    monkeypatch.setenv(env_var, value)
+    assert config_class(TEST_CONFIG_ENV).config[env_var.lower()] == value
+    monkeypatch.setenv(env_var, value.upper())
+    with pytest.raises(ValueError, match=env_var):
+        config_class(TEST_CONFIG_ENV)
@@ -0,0 +1,37 @@
+from redis_to_mongo.key_filter import KeyFilter, glob_to_regex, parse_patterns
+
+
+def test_parse_patterns():
+    assert parse_patterns(" public:streams:*, cache:* ,,") == [
+        "public:streams:*",
+        "cache:*",
+    ]
+
+
+def test_redis_glob_syntax():
+    def excludes(pattern: str, key: str) -> bool:
+        return KeyFilter(["*"], [pattern]).excluded(key)
+
+    assert excludes("h?llo", "hallo")
+    assert not excludes("h?llo", "hllo")
+    assert excludes("h[^e]llo", "hallo")
+    assert not excludes("h[^e]llo", "hello")
+    assert excludes("x[a-c]y", "xby")
+    assert not excludes("x[a-c]y", "xdy")
+    assert excludes("lit\\*", "lit*")
+    assert not excludes("lit\\*", "literal")
+    # reversed ranges match like the ordered one
+    assert excludes("[z-x]", "y")
+    # regex metacharacters in keys are literal
+    assert glob_to_regex("a.b+c") == "a\\.b\\+c"
+    assert not excludes("a.b", "axb")
+
+
+def test_includes_and_excludes():
+    key_filter = KeyFilter(["public:*", "orders:*"], ["public:cache:*"])
+    assert key_filter.matches("public:streams:1")
+    assert key_filter.matches("orders:42")
+    assert not key_filter.matches("private:1")
+    assert not key_filter.matches("public:cache:1")
+    assert KeyFilter(["a:*", "*"], []).include == ["*"]
+    assert KeyFilter([], []).include == ["*"]
@@ -0,0 +1,53 @@
+from redis_to_mongo.key_scanner import KeyScanner
+from redis_to_mongo.partition import Partition
+from redis_to_mongo.redis_api import ScanCount
+
+
+def test_scan_count_adapts():
+    count = ScanCount(1000)
+    count.update(ScanCount.TARGET_SEC / 10)
+    assert count.value == 2000
+    count.update(ScanCount.TARGET_SEC * 2)
+    assert count.value == 1000
+    count = ScanCount(ScanCount.MIN)
+    count.update(ScanCount.TARGET_SEC * 2)
+    assert count.value == ScanCount.MIN
+
+
+def test_scan_resumes_across_rounds(redis_handler):
+    keys = [f"key{i}" for i in range(50)]
+    for key in keys:
+        redis_handler.client.set(key, "value")
+    scanner = KeyScanner(redis_handler, Partition(0, 1))
+    assert scanner.scan(None)
+    assert scanner.key_types() == {key: "string" for key in keys}
+
+    redis_handler.client.delete("key0")
+    redis_handler.client.hset("new:hash", "field", "value")
+    scanner.start_cycle()
+    for node in scanner.nodes:
+        node.count = ScanCount(10)
+    rounds = 1
+    # a zero budget still scans one page per round
+    while not scanner.scan(0):
+        rounds += 1
+        # until the cycle completes the deleted key stands in from the last one
+        assert "key0" in scanner.key_types()
+        assert "key0" in scanner.unconfirmed_keys()
+    assert rounds > 1
+    assert scanner.cycles == 2
+    key_types = scanner.key_types()
+    assert "key0" not in key_types
+    assert not scanner.unconfirmed_keys()
+    assert key_types["new:hash"] == "hash"
+    assert len(key_types) == len(keys)
+
+
+def test_typed_scan(redis_handler, data_dict, redis_populate_all):
+    scanner = KeyScanner(redis_handler, Partition(0, 1), ["zset", "ReJSON-RL"])
+    assert scanner.scan(None)
+    key_types = scanner.key_types()
+    for key in data_dict["zsets"]:
+        assert key_types[key] == "zset"
+    for key in data_dict["jsons"]:
+        assert key_types[key] == "ReJSON-RL"
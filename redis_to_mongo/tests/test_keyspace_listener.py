@@ -0,0 +1,70 @@
+import time
+import types
+
+import pytest
+
+from redis_to_mongo.keyspace_listener import KeyspaceListener
+
+
+@pytest.fixture
+def keyspace_listener(redis_handler):
+    listener = KeyspaceListener(redis_handler)
+    listener.start()
+    yield listener
+    listener.stop()
+
+
+def wait_for_dirty_keys(listener, expected, timeout=2.0):
+    collected = set()
+    deadline = time.time() + timeout
+    while time.time() < deadline and not expected <= collected:
+        collected |= listener.drain()[0]
+        time.sleep(0.05)
+    return collected
+
+
+def test_collects_touched_keys_once(keyspace_listener, redis_handler):
+    for _ in range(3):
+        redis_handler.client.set("key1", "value")
+    redis_handler.client.rpush("key2", "value")
+    redis_handler.client.delete("key2")
+    dirty_keys = wait_for_dirty_keys(keyspace_listener, {"key1", "key2"})
+    assert dirty_keys == {"key1", "key2"}
+    assert keyspace_listener.drain() == (set(), False)
+
+
+def test_handle_message_strips_channel_prefix(redis_handler):
+    listener = KeyspaceListener(redis_handler)
+    listener.handle_message(
+        {"channel": listener.channel_prefix + "some:key:with:colons", "data": "set"}
+    )
+    assert listener.drain() == ({"some:key:with:colons"}, False)
+
+
+def test_subscribes_every_cluster_primary(redis_handler, monkeypatch):
+    primaries = [types.SimpleNamespace(name=f"node{i}") for i in range(3)]
+    subscribed, configured = [], []
+    pubsub = redis_handler.client.pubsub
+    monkeypatch.setattr(redis_handler, "cluster", True)
+    monkeypatch.setattr(
+        redis_handler.client, "get_primaries", lambda: primaries, raising=False
+    )
+    monkeypatch.setattr(
+        redis_handler,
+        "enable_keyspace_notifications",
+        lambda flags, node=None: configured.append(node),
+    )
+    monkeypatch.setattr(
+        redis_handler.client,
+        "pubsub",
+        lambda node=None, **kwargs: subscribed.append(node) or pubsub(**kwargs),
+    )
+    redis_handler.client.config_set("notify-keyspace-events", "KA")
+    listener = KeyspaceListener(redis_handler)
+    listener.start()
+    try:
+        assert subscribed == configured == primaries
+        redis_handler.client.set("key1", "value")
+        assert wait_for_dirty_keys(listener, {"key1"}) == {"key1"}
+    finally:
+        listener.stop()
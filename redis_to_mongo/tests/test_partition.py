@@ -0,0 +1,40 @@
+from binascii import crc_hqx
+import pytest
+
+from redis_to_mongo.mongo_models import StringODM
+from redis_to_mongo.partition import HASH_SLOTS, Partition, key_hash_slot
+from redis_to_mongo.syncers.sync_string import SyncStrings
+
+
+def test_key_hash_slot_matches_redis_cluster():
+    assert key_hash_slot("foo") == 12182
+    assert key_hash_slot("{user1000}.following") == key_hash_slot("user1000")
+    # empty hash tags hash the whole key
+    assert key_hash_slot("foo{}bar") == crc_hqx(b"foo{}bar", 0) % HASH_SLOTS
+
+
+def test_partitions_split_slots_without_overlap():
+    partitions = [Partition(index, 3) for index in range(3)]
+    assert partitions[0].first_slot == 0
+    assert partitions[-1].last_slot == HASH_SLOTS - 1
+    for previous, partition in zip(partitions, partitions[1:]):
+        assert partition.first_slot == previous.last_slot + 1
+    keys = [f"key{i}" for i in range(100)]
+    for key in keys:
+        assert sum(partition.owns(key) for partition in partitions) == 1
+    with pytest.raises(ValueError):
+        Partition(3, 3)
+
+
+def test_workers_keep_other_partitions_active(redis_handler, mongo_handler):
+    keys = [f"key{i}" for i in range(20)]
+    for key in keys:
+        redis_handler.client.set(key, "value")
+    key_types = redis_handler.get_all_key_types()
+    for index in range(2):
+        syncer = SyncStrings(redis_handler)
+        syncer.partition = Partition(index, 2)
+        syncer.init(syncer.partition.filter_key_types(key_types))
+        syncer.sync(syncer.partition.filter_key_types(key_types))
+        assert all(syncer.partition.owns(key) for key in syncer.odm_ids)
+    assert StringODM.objects(active_now=True).count() == len(keys)
@@ -1,6 +1,13 @@
+import asyncio
+import threading
+import time
+import types
 import pytest
 
 from redis_to_mongo.tests.conftest import redis_handler, NUMBER_OF_ITEMS
+from redis_to_mongo.async_redis_api import AsyncRedisHandler
+from redis_to_mongo.key_filter import KeyFilter
+from redis_to_mongo.partition import key_hash_slot
 
 
 def test_all(redis_populate_all):
@@ -99,3 +106,164 @@ def test_get_types(redis_handler, redis_populate_all, all_keys_fixture):
 def test_get_all_key_types(redis_handler, redis_populate_all, all_keys_fixture):
     key_types = redis_handler.get_all_key_types()
     assert len(key_types) == len(all_keys_fixture)
+
+
+def test_iter_types_batches(redis_handler, redis_populate_all, all_keys_fixture):
+    all_keys = redis_handler.get_all_keys()
+    redis_handler.take_round_trips()
+    key_types = dict(redis_handler.iter_types(all_keys, batch_size=4))
+    # one pipelined round trip per batch of 4 keys
+    assert redis_handler.take_round_trips() == -(-len(all_keys) // 4)
+    assert key_types == redis_handler.get_types(all_keys)
+
+
+def test_get_key_types_by_type(redis_handler, redis_populate_all, data_dict):
+    redis_handler.client.hset("some:hash", "field", "value")
+    key_types = redis_handler.get_key_types_by_type(["zset", "list"])
+    assert set(key_types) == set(data_dict["zsets"] + data_dict["lists"])
+    assert set(key_types.values()) == {"zset", "list"}
+
+
+def test_key_filter_routes_scans(redis_handler):
+    for key in ["public:streams:1", "public:streams:2", "public:cache:1", "private:1"]:
+        redis_handler.client.set(key, "value")
+    redis_handler.client.hset("orders:1", "field", "value")
+    redis_handler.key_filter = KeyFilter(["public:*", "orders:*"], ["public:cache:*"])
+    assert set(redis_handler.get_all_keys()) == {
+        "public:streams:1",
+        "public:streams:2",
+        "orders:1",
+    }
+    assert redis_handler.get_key_types_by_type(["hash"]) == {"orders:1": "hash"}
+    redis_handler.take_round_trips()
+    redis_handler.get_all_key_types()
+    # one SCAN per include pattern on this small keyspace, one TYPE pipeline for the kept keys
+    assert redis_handler.take_round_trips() == 3
+
+
+def test_get_key_types_by_type_module_fallback(
+    redis_handler, redis_populate_all, data_dict
+):
+    key_types = redis_handler.get_key_types_by_type(["string", "ReJSON-RL"])
+    for json_key in data_dict["jsons"]:
+        assert key_types[json_key] == "ReJSON-RL"
+    for string_key in data_dict["strings"]:
+        assert key_types[string_key] == "string"
+
+
+def test_batch_getters_match_single_key_getters(
+    redis_handler, redis_populate_all, data_dict
+):
+    assert redis_handler.get_strings(data_dict["strings"]) == [
+        redis_handler.get_string(key) for key in data_dict["strings"]
+    ]
+    assert redis_handler.get_jsons(data_dict["jsons"]) == [
+        redis_handler.get_json(key) for key in data_dict["jsons"]
+    ]
+    assert redis_handler.get_lists(data_dict["lists"]) == [
+        redis_handler.get_list(key) for key in data_dict["lists"]
+    ]
+    assert redis_handler.get_ordered_sets(data_dict["zsets"]) == [
+        redis_handler.get_ordered_set(key) for key in data_dict["zsets"]
+    ]
+    for members, key in zip(
+        redis_handler.get_sets(data_dict["sets"]), data_dict["sets"]
+    ):
+        assert sorted(members) == sorted(redis_handler.get_set(key))
+
+
+def test_async_getters_match_redis_handler(
+    redis_handler, redis_populate_all, data_dict
+):
+    async def read_all():
+        async_handler = AsyncRedisHandler(redis_handler.config)
+        try:
+            return await asyncio.gather(
+                async_handler.get_strings(data_dict["strings"]),
+                async_handler.get_jsons(data_dict["jsons"]),
+                async_handler.get_lists(data_dict["lists"]),
+                async_handler.get_ordered_sets(data_dict["zsets"]),
+                async_handler.get_sets(data_dict["sets"]),
+                async_handler.get_collection_sizes(data_dict["lists"], "list"),
+                async_handler.read_messages(
+                    {stream: "0" for stream in data_dict["streams"]}
+                ),
+            )
+        finally:
+            await async_handler.close()
+
+    strings, jsons, lists, zsets, sets, sizes, messages = asyncio.run(read_all())
+    assert strings == redis_handler.get_strings(data_dict["strings"])
+    assert jsons == redis_handler.get_jsons(data_dict["jsons"])
+    assert lists == redis_handler.get_lists(data_dict["lists"])
+    assert zsets == redis_handler.get_ordered_sets(data_dict["zsets"])
+    assert [sorted(members) for members in sets] == [
+        sorted(members) for members in redis_handler.get_sets(data_dict["sets"])
+    ]
+    assert sizes == [NUMBER_OF_ITEMS] * len(data_dict["lists"])
+    assert messages == redis_handler.read_messages(
+        {stream: "0" for stream in data_dict["streams"]}
+    )
+
+
+def test_iter_value_batches(redis_handler, redis_populate_string, data_dict):
+    redis_handler.take_round_trips()
+    batches = list(
+        redis_handler.iter_value_batches(
+            data_dict["strings"] + ["missing"], redis_handler.get_strings, 2
+        )
+    )
+    assert [len(batch) for batch in batches] == [2, 2]
+    assert redis_handler.take_round_trips() == 2
+    assert batches[-1]["missing"] is None
+    for key in data_dict["strings"]:
+        assert any(
+            batch.get(key) == f"string_test_value{NUMBER_OF_ITEMS - 1}"
+            for batch in batches
+        )
+
+
+def test_multi_key_reads_across_hash_slots(redis_handler):
+    # keys spread over many hash slots, and so over all nodes when run against a cluster
+    keys = [f"string:{i}" for i in range(50)] + ["{tag}:a", "{tag}:b"]
+    for key in keys:
+        redis_handler.client.set(key, f"value:{key}")
+    assert redis_handler.get_strings(keys + ["missing"]) == [
+        f"value:{key}" for key in keys
+    ] + [None]
+    streams = [f"stream:{i}" for i in range(5)]
+    for stream in streams:
+        redis_handler.client.xadd(stream, {"message": stream})
+    read_ids = {stream: "0-0" for stream in streams}
+    messages = redis_handler.read_messages(read_ids)
+    assert set(messages) == set(streams)
+    assert all(read_ids[stream] == messages[stream][-1][0] for stream in streams)
+    assert redis_handler.read_messages(read_ids, block=10) == {}
+    assert set(redis_handler.scan_keys(match="stream:*")) == set(streams)
+
+
+def test_blocking_read_across_slots_returns_first_messages(redis_handler, monkeypatch):
+    streams = [f"stream:{i}" for i in range(8)]
+    for stream in streams:
+        redis_handler.client.xadd(stream, {"message": stream})
+    read_ids = {
+        stream: redis_handler.client.xinfo_stream(stream)["last-generated-id"]
+        for stream in streams
+    }
+    # routes the reads as on a three node cluster
+    monkeypatch.setattr(redis_handler, "cluster", True)
+    monkeypatch.setattr(redis_handler.client, "keyslot", key_hash_slot, raising=False)
+    monkeypatch.setattr(
+        redis_handler.client,
+        "get_node_from_key",
+        lambda key: types.SimpleNamespace(name=f"node{key_hash_slot(key) % 3}"),
+        raising=False,
+    )
+    threading.Timer(
+        0.05, lambda: redis_handler.client.xadd(streams[1], {"message": "new"})
+    ).start()
+    start = time.monotonic()
+    messages = redis_handler.read_messages(read_ids, block=5000)
+    # the idle slots don't hold up the one with messages
+    assert time.monotonic() - start < 1
+    assert list(messages) == [streams[1]]
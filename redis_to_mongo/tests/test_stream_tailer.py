@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+from redis_to_mongo.mongo_models import StreamODM, StreamMessageODM
+from redis_to_mongo.stream_tailer import StreamTailer
+from redis_to_mongo.syncers.sync_stream import SyncStreams
+
+
+@pytest.fixture
+def stream_tailer(mongo_handler, redis_handler):
+    syncer = SyncStreams(redis_handler)
+    tailer = StreamTailer(syncer, block_ms=100, flush_size=2, flush_interval_ms=20)
+    yield tailer
+    tailer.stop()
+
+
+def wait_for_messages(count, timeout=2.0):
+    deadline = time.time() + timeout
+    while StreamMessageODM.objects.count() < count and time.time() < deadline:
+        time.sleep(0.01)
+    return StreamMessageODM.objects.count()
+
+
+def test_tailer_writes_messages_between_rounds(stream_tailer, redis_handler):
+    redis_handler.client.xadd("test:stream", {"message": "first"})
+    key_types = redis_handler.get_all_key_types()
+    stream_tailer.syncer.init(key_types)
+    stream_tailer.start()
+    assert wait_for_messages(1) == 1
+
+    # the polling round only reconciles structure while the tailer is running
+    stream_tailer.syncer.sync(key_types)
+    assert StreamMessageODM.objects.count() == 1
+
+    last_id = None
+    for i in range(5):
+        last_id = redis_handler.client.xadd("test:stream", {"message": f"next{i}"})
+    assert wait_for_messages(6) == 6
+    stream_tailer.stop()
+    assert StreamODM.objects(key="test:stream").first().last_redis_read_id == last_id
+
+
+def test_flush_keeps_buffer_on_failure(stream_tailer, redis_handler, monkeypatch):
+    redis_handler.client.xadd("test:stream", {"message": "first"})
+    stream_tailer.syncer.init(redis_handler.get_all_key_types())
+    stream_tailer.tail_once()
+    assert stream_tailer.buffered == 1
+
+    def failing_write(*args, **kwargs):
+        raise RuntimeError("mongo down")
+
+    monkeypatch.setattr(stream_tailer.syncer, "write_messages", failing_write)
+    with pytest.raises(RuntimeError):
+        stream_tailer.flush()
+    assert stream_tailer.buffered == 1
+    monkeypatch.undo()
+    stream_tailer.flush()
+    assert stream_tailer.buffered == 0
+    assert StreamMessageODM.objects.count() == 1
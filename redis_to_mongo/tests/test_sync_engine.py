@@ -1,6 +1,12 @@
+import asyncio
+import time
 import pytest
 from redis_to_mongo.tests.conftest import NUMBER_OF_CONTAINERS, NUMBER_OF_ITEMS
 from redis_to_mongo.mongo_models import *
+from redis_to_mongo.sync_engine import SyncEngine
+from redis_to_mongo.async_sync_engine import AsyncSyncEngine
+from redis_to_mongo.redis_api import ScanCount
+from redis_to_mongo.constants import TEST_CONFIG_ENV
 
 
 def test_redis_all_iterations(
@@ -85,3 +91,194 @@ def test_redis_all_iterations(
         assert (
             actual_messages == expected_messages
         ), f"StreamMessageODM content mismatch for stream {stream_key}"
+
+
+def test_thread_pool_syncs_all_types(
+    mongo_handler, data_dict, redis_populate_all, monkeypatch
+):
+    monkeypatch.setenv("SYNC_ENGINE", "threads")
+    sync_engine = SyncEngine(TEST_CONFIG_ENV)
+    sync_engine.sync()
+    for string_key in data_dict["strings"]:
+        assert (
+            StringODM.objects(key=string_key).first().value
+            == f"string_test_value{NUMBER_OF_ITEMS - 1}"
+        )
+    for set_key in data_dict["sets"]:
+        assert set(SetODM.objects(key=set_key).first().values) == {
+            f"set_test_member{j}" for j in range(NUMBER_OF_ITEMS)
+        }
+    for stream_key in data_dict["streams"]:
+        stream_odm = StreamODM.objects(key=stream_key).first()
+        assert StreamMessageODM.objects(stream=stream_odm).count() == NUMBER_OF_ITEMS
+    assert all(
+        sync_engine.changes_processed[key_type] > 0
+        for key_type in ["ReJSON-RL", "list", "set", "stream", "string", "zset"]
+    )
+    sync_engine.shutdown()
+
+
+def test_thread_pool_isolates_failing_syncer(
+    mongo_handler, data_dict, redis_populate_all, monkeypatch
+):
+    monkeypatch.setenv("SYNC_ENGINE", "threads")
+    sync_engine = SyncEngine(TEST_CONFIG_ENV)
+    assert len(set(sync_engine.get_redis_handlers())) == len(sync_engine.syncers) + 1
+    failing = next(s for s in sync_engine.syncers if s.TYPE == "set")
+
+    def failing_sync(key_types):
+        raise RuntimeError("set syncer down")
+
+    monkeypatch.setattr(failing, "sync", failing_sync)
+    sync_engine.sync()
+    for string_key in data_dict["strings"]:
+        assert StringODM.objects(key=string_key).first().value == (
+            f"string_test_value{NUMBER_OF_ITEMS - 1}"
+        )
+    assert sync_engine.changes_processed["set"] == 0
+    assert sync_engine.changes_processed["string"] > 0
+    sync_engine.shutdown()
+
+
+def test_async_engine_syncs_all_types(
+    mongo_handler, data_dict, redis_populate_all, monkeypatch
+):
+    monkeypatch.setenv("SYNC_INTERVAL_SEC", "0")
+    sync_engine = AsyncSyncEngine(TEST_CONFIG_ENV)
+    sync_engine.sync()
+    for string_key in data_dict["strings"]:
+        assert (
+            StringODM.objects(key=string_key).first().value
+            == f"string_test_value{NUMBER_OF_ITEMS - 1}"
+        )
+    for zset_key in data_dict["zsets"]:
+        assert ZSetODM.objects(key=zset_key).first().values == [
+            {"key": f"zset_test_member{j}", "score": j} for j in range(NUMBER_OF_ITEMS)
+        ]
+    for stream_key in data_dict["streams"]:
+        stream_odm = StreamODM.objects(key=stream_key).first()
+        assert StreamMessageODM.objects(stream=stream_odm).count() == NUMBER_OF_ITEMS
+    assert all(
+        sync_engine.changes_processed[key_type] > 0
+        for key_type in ["ReJSON-RL", "list", "set", "stream", "string", "zset"]
+    )
+
+    client = sync_engine.redis_handler.client
+    client.set(data_dict["strings"][0], "changed")
+    client.ltrim(data_dict["lists"][0], 1, -1)
+    client.rpush(data_dict["lists"][0], "appended")
+    client.srem(data_dict["sets"][0], "set_test_member0")
+    client.xadd(data_dict["streams"][0], {"message": "new"})
+    sync_engine.sync()
+    assert StringODM.objects(key=data_dict["strings"][0]).first().value == "changed"
+    assert ListODM.objects(key=data_dict["lists"][0]).first().values == [
+        *(f"list_test_member{j}" for j in range(1, NUMBER_OF_ITEMS)),
+        "appended",
+    ]
+    assert (
+        "set_test_member0"
+        not in SetODM.objects(key=data_dict["sets"][0]).first().values
+    )
+    stream_odm = StreamODM.objects(key=data_dict["streams"][0]).first()
+    assert StreamMessageODM.objects(stream=stream_odm).count() == NUMBER_OF_ITEMS + 1
+    sync_engine.shutdown()
+
+
+def test_async_engine_bounds_batches_in_flight(
+    mongo_handler, data_dict, redis_populate_all, monkeypatch
+):
+    monkeypatch.setenv("SYNC_CONCURRENCY", "2")
+    monkeypatch.setenv("VALUE_BATCH_SIZE", "1")
+    sync_engine = AsyncSyncEngine(TEST_CONFIG_ENV)
+    in_flight, most_in_flight = [0], [0]
+    for syncer in sync_engine.syncers:
+
+        async def fetch_values_async(keys, fetch=syncer.fetch_values_async):
+            in_flight[0] += 1
+            most_in_flight[0] = max(most_in_flight[0], in_flight[0])
+            await asyncio.sleep(0.01)
+            try:
+                return await fetch(keys)
+            finally:
+                in_flight[0] -= 1
+
+        monkeypatch.setattr(syncer, "fetch_values_async", fetch_values_async)
+    sync_engine.sync()
+    # batches of different keys and syncers overlap, never more than SYNC_CONCURRENCY
+    assert most_in_flight[0] == 2
+    for list_key in data_dict["lists"]:
+        assert ListODM.objects(key=list_key).first().values == [
+            f"list_test_member{j}" for j in range(NUMBER_OF_ITEMS)
+        ]
+    sync_engine.shutdown()
+
+
+def test_async_engine_isolates_failing_syncer(
+    mongo_handler, data_dict, redis_populate_all, monkeypatch
+):
+    sync_engine = AsyncSyncEngine(TEST_CONFIG_ENV)
+    failing = next(s for s in sync_engine.syncers if s.TYPE == "set")
+
+    async def failing_sync(key_types):
+        raise RuntimeError("set syncer down")
+
+    monkeypatch.setattr(failing, "sync_async", failing_sync)
+    sync_engine.sync()
+    assert StringODM.objects(key=data_dict["strings"][0]).first().value == (
+        f"string_test_value{NUMBER_OF_ITEMS - 1}"
+    )
+    assert sync_engine.changes_processed["set"] == 0
+    assert sync_engine.changes_processed["string"] > 0
+    sync_engine.shutdown()
+
+
+def test_syncers_run_on_their_own_deadlines(
+    mongo_handler, data_dict, redis_populate_all, monkeypatch
+):
+    monkeypatch.setenv("STRING_SYNC_INTERVAL_SEC", "0")
+    sync_engine = SyncEngine(TEST_CONFIG_ENV)
+    scans = []
+    get_key_types = sync_engine.get_key_types
+    monkeypatch.setattr(
+        sync_engine,
+        "get_key_types",
+        lambda types=None: scans.append(types) or get_key_types(types),
+    )
+    sync_engine.sync()
+    assert len(scans) == 1
+    assert sync_engine.next_deadline() <= time.time()
+
+    string_key, list_key = data_dict["strings"][0], data_dict["lists"][0]
+    sync_engine.redis_handler.client.set(string_key, "changed")
+    sync_engine.redis_handler.client.rpush(list_key, "changed")
+    sync_engine.sync()
+    assert len(scans) == 2
+    assert StringODM.objects(key=string_key).first().value == "changed"
+    # the list syncer is only due again after SYNC_INTERVAL_SEC
+    assert "changed" not in ListODM.objects(key=list_key).first().values
+    assert sync_engine.deadlines["list"] > time.time()
+    sync_engine.shutdown()
+
+
+def test_budgeted_scan_deactivates_on_completed_cycles(mongo_handler, monkeypatch):
+    monkeypatch.setenv("KEY_SCAN_BUDGET_MS", "1")
+    monkeypatch.setenv("STRING_SYNC_INTERVAL_SEC", "0")
+    keys = [f"key{i}" for i in range(500)]
+    sync_engine = SyncEngine(TEST_CONFIG_ENV)
+    sync_engine.redis_handler.client.mset({key: "value" for key in keys})
+    sync_engine.sync()
+    assert sync_engine.key_scanner.cycles == 2
+    assert StringODM.objects(active_now=True).count() == len(keys)
+
+    monkeypatch.setattr(ScanCount, "START", 10)
+    monkeypatch.setattr(ScanCount, "MAX", 10)
+    sync_engine.redis_handler.client.delete(keys[0])
+    while sync_engine.key_scanner.cycles == 2:
+        # the cycle in progress deactivates nothing, nor syncs the deleted key's value
+        odm = StringODM.objects(key=keys[0]).first()
+        assert odm.active_now
+        assert odm.value == "value"
+        sync_engine.sync()
+    assert not StringODM.objects(key=keys[0]).first().active_now
+    assert StringODM.objects(active_now=True).count() == len(keys) - 1
+    sync_engine.shutdown()